@@ -0,0 +1,93 @@
+"""
+Prefix lookup of users by name and email.
+
+Every user has UserSearchKey rows holding their first name, last name, full
+name and email, normalized: accents stripped, case folded and whitespace
+collapsed. Queries are normalized alike and matched as prefixes with a range
+over the key index, which plain B-tree indexes serve on every database,
+unlike the case-insensitive LIKE of `istartswith`.
+"""
+import unicodedata
+from django.db.models import Exists, OuterRef, Q
+from rest_framework import filters
+from .models import User, UserSearchKey
+
+KEY_MAX_LENGTH = 254
+# Keys of one user, so that a page of keys holds enough distinct users.
+KEYS_PER_USER = 4
+INDEXED_FIELDS = frozenset({'first_name', 'last_name', 'email'})
+# Matching keys up to which searches sort the matches; past it, users are
+# read in page order and the first matches fill the page sooner.
+SEARCH_SORT_LIMIT = 1000
+
+
+def normalize(value: str) -> str:
+    value = ''.join(
+        char for char in unicodedata.normalize('NFKD', value) if not unicodedata.combining(char)
+        )
+    return ' '.join(value.casefold().split())[:KEY_MAX_LENGTH]
+
+
+def search_keys(user) -> list:
+    names = (user.first_name, user.last_name, f'{user.first_name} {user.last_name}', user.email)
+    return [key for key in dict.fromkeys(normalize(name) for name in names) if key]
+
+
+def index_users(users) -> None:
+    """
+    Replaces the search keys of the users.
+    """
+    UserSearchKey.objects.filter(user__in=[user.pk for user in users]).delete()
+    UserSearchKey.objects.bulk_create(
+        [UserSearchKey(user_id=user.pk, key=key) for user in users for key in search_keys(user)],
+        batch_size=1000,
+        )
+
+
+def matching_keys(prefix: str):
+    """
+    Returns the search keys that start with `prefix`, a normalized query.
+    The range is what the index serves; `startswith` keeps it exact under
+    collations that do not sort by code point.
+    """
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return UserSearchKey.objects.filter(key__gte=prefix, key__lt=upper, key__startswith=prefix)
+
+
+def autocomplete(query: str, limit: int, work_space=None) -> list:
+    """
+    Returns up to `limit` active users with a name or email that starts with
+    `query`, ordered by the matching key, optionally among the owner and the
+    members of a workspace.
+    """
+    prefix = normalize(query)
+    if not prefix:
+        return []
+    keys = matching_keys(prefix).filter(user__is_active=True)
+    if work_space is not None:
+        memberships = User.member_work_spaces.through.objects.filter(workspace=work_space.pk, user=OuterRef('user'))
+        keys = keys.filter(Q(user=work_space.owner_id) | Exists(memberships))
+    user_ids = list(dict.fromkeys(
+        keys.order_by('key', 'user').values_list('user', flat=True)[:limit * KEYS_PER_USER]
+        ))[:limit]
+    users = User.objects.in_bulk(user_ids)
+    return [users[pk] for pk in user_ids if pk in users]
+
+
+class UserLookupFilter(filters.SearchFilter):
+    """
+    SearchFilter over the search keys of users: every term of `search` must
+    start a name or the email of the user. Terms with few matches select
+    them through the index; common ones are checked per user instead,
+    which costs one indexed probe per user read.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        for term in self.get_search_terms(request):
+            if prefix := normalize(term):
+                keys = matching_keys(prefix)
+                if keys[:SEARCH_SORT_LIMIT].count() < SEARCH_SORT_LIMIT:
+                    queryset = queryset.filter(pk__in=keys.values('user'))
+                else:
+                    queryset = queryset.filter(Exists(keys.filter(user=OuterRef('pk'))))
+        return queryset
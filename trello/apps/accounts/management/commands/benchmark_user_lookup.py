@@ -0,0 +1,88 @@
+import random
+from statistics import quantiles
+from time import perf_counter
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework import filters
+from rest_framework.test import APIRequestFactory, force_authenticate
+from trello.apps.accounts.lookup import search_keys
+from trello.apps.accounts.models import User, UserSearchKey
+from trello.apps.accounts.views import UserViewSet
+from trello.apps.dashboards.models import WorkSpace
+
+SYLLABLES = ['al', 'an', 'ar', 'be', 'ca', 'da', 'el', 'en', 'fa', 'ga', 'ha', 'is', 'jo', 'ka', 'la', 'li',
+             'ma', 'mi', 'na', 'ne', 'no', 'or', 'pa', 'ra', 're', 'ri', 'sa', 'se', 'ta', 'th', 'to', 'va']
+
+
+class ScanUserViewSet(UserViewSet):
+    """
+    The user search as it was before search keys.
+    """
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['^first_name', '^last_name', '^email']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark user search and autocomplete against istartswith scans. All rows are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--members', type=int, default=1_000, help='Members of the scoped workspace.')
+        parser.add_argument('--queries', type=int, default=200)
+
+    def handle(self, *args, users, members, queries, **options):
+        random.seed(0)
+        first_names = [self._name(2) for _ in range(500)]
+        last_names = [self._name(3) for _ in range(5_000)]
+        endpoints = {
+            'istartswith search': ScanUserViewSet.as_view({'get': 'list'}),
+            'indexed search': UserViewSet.as_view({'get': 'list'}),
+            'autocomplete': UserViewSet.as_view({'get': 'autocomplete'}),
+        }
+        with transaction.atomic():
+            start = perf_counter()
+            created = self._generate(users, first_names, last_names)
+            owner = created[0]
+            work_space = WorkSpace.objects.create(title='Benchmark', owner=owner)
+            work_space.members.add(*random.sample(created, min(members, len(created))))
+            self.stdout.write(f'{users} users created in {perf_counter() - start:.1f}s')
+            prefixes = [
+                random.choice(first_names + last_names)[:random.randint(1, 8)] for _ in range(queries)
+                ]
+            cases = [(label, 'q' if label == 'autocomplete' else 'search', {}) for label in endpoints]
+            cases.append(('autocomplete', 'q', {'work_space': work_space.pk}))
+            for label, param, params in cases:
+                timings = []
+                for prefix in prefixes:
+                    request = APIRequestFactory().get('/accounts/', {param: prefix, **params})
+                    force_authenticate(request, user=owner)
+                    start = perf_counter()
+                    response = endpoints[label](request).render()
+                    timings.append(perf_counter() - start)
+                    if response.status_code != 200:
+                        raise CommandError(f'{label} of {prefix!r} returned {response.status_code}')
+                percentiles = quantiles(timings, n=100)
+                scope = ' in a workspace' if params else ''
+                self.stdout.write(
+                    f'{label}{scope}: p50 {percentiles[49] * 1000:.1f}ms, p95 {percentiles[94] * 1000:.1f}ms, '
+                    f'max {max(timings) * 1000:.1f}ms'
+                    )
+            transaction.set_rollback(True)
+
+    def _name(self, length: int) -> str:
+        return ''.join(random.choices(SYLLABLES, k=length)).capitalize()
+
+    def _generate(self, size, first_names, last_names) -> list:
+        created = []
+        for index in range(0, size, 10_000):
+            users = User.objects.bulk_create([
+                User(email=f'user{number}@example.com', password='!', first_name=random.choice(first_names),
+                     last_name=random.choice(last_names))
+                for number in range(index, min(index + 10_000, size))
+                ])
+            UserSearchKey.objects.bulk_create(
+                [UserSearchKey(user_id=user.pk, key=key) for user in users for key in search_keys(user)],
+                batch_size=5_000,
+                )
+            created += users
+        return created
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.3 on 2026-10-18 10:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import unicodedata
+
+
+def normalize(value):
+    value = ''.join(
+        char for char in unicodedata.normalize('NFKD', value) if not unicodedata.combining(char)
+        )
+    return ' '.join(value.casefold().split())[:254]
+
+
+def backfill_search_keys(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    UserSearchKey = apps.get_model('accounts', 'UserSearchKey')
+    keys = []
+    for user in User.objects.only('first_name', 'last_name', 'email').iterator(chunk_size=1000):
+        names = (user.first_name, user.last_name, f'{user.first_name} {user.last_name}', user.email)
+        keys += [
+            UserSearchKey(user_id=user.pk, key=key)
+            for key in dict.fromkeys(normalize(name) for name in names) if key
+            ]
+        if len(keys) >= 1000:
+            UserSearchKey.objects.bulk_create(keys)
+            keys = []
+    UserSearchKey.objects.bulk_create(keys)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchKey',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=254, verbose_name='key')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_keys', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'user search key',
+                'verbose_name_plural': 'user search keys',
+                'indexes': [models.Index(fields=['key', 'user'], name='accounts_us_key_f3d83b_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_search_keys, migrations.RunPython.noop),
+    ]
@@ -175,7 +175,7 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.assigned_tasks.exclude(end_date__lt= timezone.now()) 
 
     def activities_on_board(self, other) -> QuerySet:
-        return self.doer_activity.all().filter(task__status__board=other)
+        return self.doer_activity.all().filter(board=other)
 
     def teammates_in_workspace(self, other) -> QuerySet:
         if other.owner == self:
@@ -236,6 +236,34 @@ class User(AbstractBaseUser, PermissionsMixin):
         return errors
 
 
+class UserSearchKey(models.Model):
+    """
+    A normalized name, full name or email of a user, which user lookups
+    match by prefix with a range scan of the index; see `lookup`.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        User,
+        verbose_name=_("user"),
+        on_delete=models.CASCADE,
+        related_name='search_keys'
+        )
+    key = models.CharField(
+        _("key"),
+        max_length=254
+        )
+
+    class Meta:
+        verbose_name = _("user search key")
+        verbose_name_plural = _("user search keys")
+        indexes = [
+            models.Index(fields=['key', 'user']),
+        ]
+
+    def __str__(self) -> str:
+        return self.key
+
+
 class RecycleManager(UserManager):
     def get_queryset(self):
         return SoftQuerySet(model=self.model, using=self._db, hints=self._hints).all().filter(is_active=False)
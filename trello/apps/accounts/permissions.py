@@ -4,7 +4,7 @@ from rest_framework import permissions
 class UserPermission(permissions.BasePermission):
 
     def has_permission(self, request, view):
-        if view.action in ['list', 'retrieve', 'update', 'partial_update', 'softdestroy', 'change_password']:
+        if view.action in ['list', 'autocomplete', 'retrieve', 'update', 'partial_update', 'softdestroy', 'change_password']:
             return request.user and request.user.is_authenticated 
         elif view.action == 'create':
             return True
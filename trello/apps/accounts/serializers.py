@@ -3,6 +3,7 @@ from.models import User, _
 import traceback
 # from rest_framework.utils import model_meta
 from rest_framework.validators import UniqueValidator
+from trello.apps.core.serializers import ValuesListSerializer
 from trello.apps.dashboards.models import WorkSpace
 
 
@@ -11,6 +12,7 @@ class UserListSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'first_name', 'last_name', 'email', 'avatar', ]
+        list_serializer_class = ValuesListSerializer
 
 class WorkspacelistSerializer(serializers.ModelSerializer):
     members = UserListSerializer(many=True, read_only = True)
@@ -97,4 +99,9 @@ class UserPasswordSerializer(serializers.Serializer):
         if attrs['password_confirm'] != attrs['password']:
             raise serializers.ValidationError('Passwords does not match.')
         return super().validate(attrs)
-    
+
+
+class UserAutocompleteSerializer(serializers.Serializer):
+    q = serializers.CharField()
+    work_space = serializers.UUIDField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .lookup import INDEXED_FIELDS, index_users
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def index_user_search_keys(sender, instance, update_fields, raw=False, **kwargs):
+    """
+    Refreshes the search keys of a user whose names or email may have changed.
+    """
+    if raw or (update_fields is not None and not INDEXED_FIELDS & set(update_fields)):
+        return
+    index_users([instance])
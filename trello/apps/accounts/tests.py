@@ -4,6 +4,12 @@ from .models import User, UserRecycle
 from trello.apps.dashboards.models import *
 from django.core import mail
 from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from unittest import mock
+from .lookup import SEARCH_SORT_LIMIT
+from .serializers import UserListSerializer
 # Create your tests here.
 
 
@@ -157,4 +163,109 @@ class UserRecycleTestCase(TestCase):
         self.assertCountEqual(UserRecycle.objects.all(), [])
         self.user_ata.archive()
         self.assertCountEqual(UserRecycle.objects.all(), [self.user_ata])
-        
+
+
+class UserListAPITestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.users = [
+            User.objects.create_user(email=f'user{i}@example.com', password='1234', first_name=f'User {i}',
+                                     avatar=None if i % 2 else f'uploads/avatars/{i}.jpg')
+            for i in range(7)
+            ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def test_pages_render_like_the_model_serializer(self):
+        results, response = [], self.client.get('/accounts/')
+        while True:
+            self.assertEqual(response.status_code, 200)
+            results += response.data['results']
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+        expected = serializers.ListSerializer(
+            child=UserListSerializer(), context={'request': response.wsgi_request}
+            ).to_representation(User.objects.order_by('email'))
+        self.assertEqual(JSONRenderer().render(results), JSONRenderer().render(expected))
+
+    def test_search_reads_one_page_of_rows(self):
+        # The matching keys are counted, up to a limit, then the page is read.
+        with self.assertNumQueries(2):
+            response = self.client.get('/accounts/', {'search': 'user3'})
+        self.assertEqual([user['email'] for user in response.data['results']], ['user3@example.com'])
+
+
+class UserLookupAPITestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.owner = User.objects.create_user(email='owner@example.com', password='1234', first_name='Olga',
+                                              last_name='Smith')
+        self.zoe = User.objects.create_user(email='zoe@example.com', password='1234', first_name='Zoë',
+                                            last_name='Jones')
+        self.joan = User.objects.create_user(email='joan@example.com', password='1234', first_name='Joan',
+                                             last_name='Smithers')
+        self.john = User.objects.create_user(email='jsmith@example.com', password='1234', first_name='John',
+                                             last_name='Smith')
+        self.work_space = WorkSpace.objects.create(title='Workspace', owner=self.owner)
+        self.work_space.members.add(self.zoe, self.john)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = '/accounts/autocomplete/'
+
+    def _emails(self, q, **params) -> list:
+        response = self.client.get(self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [user['email'] for user in response.data]
+
+    def test_autocomplete(self):
+        self.assertEqual(self._emails('jo'), ['joan@example.com', 'jsmith@example.com', 'zoe@example.com'])
+        self.assertEqual(self._emails('  JOHN   sm'), ['jsmith@example.com'])
+        self.assertEqual(self._emails('zoe'), ['zoe@example.com'])
+        # Users are ordered by the key they match.
+        emails = self._emails('smith')
+        self.assertEqual(set(emails[:2]), {'jsmith@example.com', 'owner@example.com'})
+        self.assertEqual(emails[2:], ['joan@example.com'])
+        self.assertEqual(self._emails('smithe', limit=1), ['joan@example.com'])
+        self.assertEqual(len(self._emails('smith', limit=2)), 2)
+        self.assertEqual(self._emails('%'), [])
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    def test_autocomplete_reads_keys_and_users_once(self):
+        with self.assertNumQueries(2):
+            self._emails('smith')
+
+    def test_work_space_scope(self):
+        self.assertEqual(
+            set(self._emails('smith', work_space=self.work_space.pk)), {'jsmith@example.com', 'owner@example.com'}
+            )
+        self.client.force_authenticate(self.joan)
+        response = self.client.get(self.url, {'q': 'smith', 'work_space': self.work_space.pk})
+        self.assertEqual(response.status_code, 403)
+
+    def test_archived_work_space_scope(self):
+        self._emails('smith', work_space=self.work_space.pk)
+        # Archived without the signals that drop the cached workspaces of its users.
+        WorkSpace.original_objects.filter(pk=self.work_space.pk).update(is_active=False)
+        response = self.client.get(self.url, {'q': 'smith', 'work_space': self.work_space.pk})
+        self.assertEqual(response.status_code, 404)
+
+    def test_keys_follow_users(self):
+        self.joan.last_name = 'Baker'
+        self.joan.save()
+        self.assertEqual(self._emails('baker'), ['joan@example.com'])
+        self.assertEqual(self._emails('smithers'), [])
+        self.john.archive()
+        self.assertEqual(self._emails('john'), [])
+        with self.assertNumQueries(1):
+            self.zoe.save(update_fields=['last_login'])
+
+    def test_list_search_uses_the_keys(self):
+        for sort_limit in (SEARCH_SORT_LIMIT, 1):
+            with self.subTest(sort_limit=sort_limit), mock.patch('trello.apps.accounts.lookup.SEARCH_SORT_LIMIT', sort_limit):
+                response = self.client.get('/accounts/', {'search': 'zoe'})
+                self.assertEqual([user['email'] for user in response.data['results']], ['zoe@example.com'])
+                response = self.client.get('/accounts/', {'search': 'smith jo'})
+                self.assertEqual(
+                    [user['email'] for user in response.data['results']], ['joan@example.com', 'jsmith@example.com']
+                    )
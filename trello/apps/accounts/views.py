@@ -1,14 +1,20 @@
 from rest_framework.viewsets import mixins, GenericViewSet
 from rest_framework import status, filters
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from .paginations import UserResultsSetPagination
 from .models import User
-from .serializers import UserListSerializer, UserSerializer, UserPasswordSerializer, WorkSpace
+from .serializers import UserAutocompleteSerializer, UserListSerializer, UserSerializer, UserPasswordSerializer, \
+    WorkSpace
 from .permissions import UserPermission
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
 from rest_framework.decorators import action
 from drf_spectacular.utils import extend_schema
 from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from trello.apps.core.views import ConditionalRetrieveMixin
+from trello.apps.dashboards.permissions import has_work_spaces_access
+from .lookup import UserLookupFilter, autocomplete
 
 
 class SoftDestroyModelMixin:
@@ -26,6 +32,7 @@ class SoftDestroyModelMixin:
 
 
 class UserViewSet(SoftDestroyModelMixin, 
+                    ConditionalRetrieveMixin,
                     mixins.CreateModelMixin,
                     mixins.RetrieveModelMixin,
                     mixins.UpdateModelMixin,
@@ -36,6 +43,7 @@ class UserViewSet(SoftDestroyModelMixin,
     """
     
     permission_classes = [UserPermission, ]
+    conditional_relations = ('owner_work_spaces', 'owner_work_spaces__members')
     queryset = User.objects.all().prefetch_related(
         Prefetch(
             'owner_work_spaces', 
@@ -44,8 +52,7 @@ class UserViewSet(SoftDestroyModelMixin,
         )
     
     serializer_class = UserSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['^first_name', '^last_name', '^email']
+    filter_backends = [UserLookupFilter, filters.OrderingFilter]
     ordering_fields = ['email', 'first_name', 'last_name',]
     ordering = ['email']
     pagination_class = UserResultsSetPagination
@@ -54,10 +61,35 @@ class UserViewSet(SoftDestroyModelMixin,
         match self.action:
             case  'change_password':
                 return UserPasswordSerializer
-            case 'list':
+            case 'list' | 'autocomplete':
                 return UserListSerializer
         return super().get_serializer_class()
 
+    def paginate_queryset(self, queryset):
+        if self.action == 'list':
+            # Pages are read as values() rows, which UserListSerializer renders directly.
+            queryset = self.get_serializer(many=True).values(queryset)
+        return super().paginate_queryset(queryset)
+
+    @extend_schema(parameters=[UserAutocompleteSerializer], responses=UserListSerializer(many=True))
+    @action(detail=False, filter_backends=[], pagination_class=None)
+    def autocomplete(self, request, *args, **kwargs):
+        """
+        Returns the first active users whose first name, last name, full name
+        or email starts with `q`, optionally among the owner and the members
+        of a workspace the requesting user can access.
+        """
+        params = UserAutocompleteSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        work_space = params.validated_data.get('work_space')
+        if work_space is not None:
+            if not has_work_spaces_access(request.user, [work_space]):
+                raise PermissionDenied()
+            # The acl cache may still list a workspace archived meanwhile.
+            work_space = get_object_or_404(WorkSpace.objects.only('owner'), pk=work_space)
+        users = autocomplete(params.validated_data['q'], params.validated_data['limit'], work_space)
+        return Response(self.get_serializer(users, many=True).data)
+
     @extend_schema(responses={'200': {'status': 'password set'}})
     @action(methods=['post'], detail=True, url_path='change-password')
     def change_password(self, request, *args, **kwargs):
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'trello.apps.core'
+
+    def ready(self):
+        from . import blobs
+        blobs.connect()
@@ -0,0 +1,138 @@
+"""
+Reference counting of the files of content-addressed storages.
+
+The rows of models whose file fields use a ContentAddressedStorage hold
+references to their blobs: a reference is added when a row is saved with a
+new file and dropped when the row is deleted or its file is replaced.
+Archived rows keep their references, since they can be restored.
+
+Files are never deleted with their last reference: another transaction may
+be saving the same content at that moment, and it cannot be seen until it
+commits. `sweep` deletes the files nothing references once they were not
+written for a grace period; storing content that already exists refreshes
+the file's modification time, so files being shared again are kept.
+
+Bulk inserts, updates and deletes bypass the model signals and are not
+counted; `sweep` also removes files that were stored without any reference.
+"""
+import os
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import F, FileField
+from django.db.models.signals import post_delete, post_init, post_save
+from .storage import BLOB_DIRECTORY, ContentAddressedStorage, is_blob
+
+# Content-addressed file fields of the models that hold blobs.
+_blob_fields = {}
+
+
+def _name(value) -> str | None:
+    return getattr(value, 'name', value)
+
+
+def add_reference(name: str) -> None:
+    from .models import Blob
+    if not is_blob(name):
+        return
+    if Blob.objects.filter(name=name).update(references=F('references') + 1):
+        return
+    try:
+        with transaction.atomic():
+            Blob.objects.create(name=name, references=1)
+    except IntegrityError:
+        # Created concurrently.
+        Blob.objects.filter(name=name).update(references=F('references') + 1)
+
+
+def drop_reference(name: str) -> None:
+    from .models import Blob
+    if not is_blob(name):
+        return
+    # Unreferenced blobs are kept for `sweep`.
+    Blob.objects.filter(name=name, references__gt=0).update(references=F('references') - 1)
+
+
+def blob_fields(model) -> list:
+    """
+    Returns the file fields of `model` that store content-addressed files.
+    """
+    return [
+        field for field in model._meta.concrete_fields
+        if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)
+        ]
+
+
+def remember_blobs(sender, instance, **kwargs):
+    # Deferred fields are left out; they were not loaded, so they cannot change.
+    instance._blob_names = {
+        field.attname: _name(instance.__dict__[field.attname])
+        for field in _blob_fields[sender] if field.attname in instance.__dict__
+        }
+
+
+def count_saved_blobs(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    for field in _blob_fields[sender]:
+        if field.attname not in instance.__dict__ or (update_fields is not None and field.name not in update_fields):
+            continue
+        name = _name(instance.__dict__[field.attname])
+        previous = None if created else instance._blob_names.get(field.attname)
+        if name != previous:
+            add_reference(name)
+            drop_reference(previous)
+            instance._blob_names[field.attname] = name
+
+
+def count_deleted_blobs(sender, instance, **kwargs):
+    for field in _blob_fields[sender]:
+        drop_reference(instance._blob_names.get(field.attname))
+
+
+def connect() -> None:
+    """
+    Counts the references of every model with content-addressed file fields.
+    """
+    for model in apps.get_models():
+        if fields := blob_fields(model):
+            _blob_fields[model] = fields
+            post_init.connect(remember_blobs, sender=model)
+            post_save.connect(count_saved_blobs, sender=model)
+            post_delete.connect(count_deleted_blobs, sender=model)
+
+
+def sweep(storage, before: float) -> int:
+    """
+    Removes the files of `storage` last written before the timestamp `before`
+    that no row references, with their blobs. Returns how many were removed.
+    """
+    from .models import Blob
+    removed = 0
+    for directory, _, files in os.walk(storage.path(BLOB_DIRECTORY)):
+        paths = {
+            os.path.relpath(os.path.join(directory, file), storage.location).replace(os.sep, '/'):
+            os.path.join(directory, file)
+            for file in files
+            }
+        stale = [name for name, path in paths.items() if _written_before(path, before)]
+        with transaction.atomic():
+            # Locked, so references added meanwhile wait until the files are checked again.
+            references = dict(
+                Blob.objects.select_for_update().filter(name__in=stale).values_list('name', 'references')
+                )
+            deleted = [
+                name for name in stale
+                if not references.get(name) and _written_before(paths[name], before)
+                ]
+            for name in deleted:
+                storage.delete(name)
+            Blob.objects.filter(name__in=deleted, references=0).delete()
+            removed += len(deleted)
+    return removed
+
+
+def _written_before(path: str, before: float) -> bool:
+    try:
+        return os.path.getmtime(path) < before
+    except FileNotFoundError:
+        return False
@@ -0,0 +1,15 @@
+import time
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from trello.apps.core.blobs import sweep
+
+
+class Command(BaseCommand):
+    help = 'Delete stored blobs that no row references and that were not written for a while.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--age', type=int, default=3600, help='Seconds since a blob was last written.')
+
+    def handle(self, *args, age, **options):
+        removed = sweep(default_storage, time.time() - age)
+        self.stdout.write(f'removed {removed} unreferenced blobs')
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.3 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Name of the file in the storage', max_length=100, unique=True, verbose_name='Name')),
+                ('references', models.PositiveIntegerField(default=0, help_text='Rows that hold the file', verbose_name='References')),
+            ],
+            options={
+                'verbose_name': 'Blob',
+                'verbose_name_plural': 'Blobs',
+            },
+        ),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from uuid import uuid4
+from .signals import pre_set_active
 
 
 class BaseModel(models.Model):
@@ -16,10 +18,69 @@ class BaseModel(models.Model):
 
 class SoftQuerySet(models.QuerySet):
     def archive(self):
-        return self.update(is_active= False)
+        return self.set_active(is_active=False)
     
     def restore(self):
-        return self.update(is_active= True)
+        return self.set_active(is_active=True)
+
+    def set_active(self, is_active: bool, now=None, cascaded: bool = False) -> int:
+        """
+        Archive or restore the rows of the queryset that are not in the requested
+        state yet, giving the model a chance to adjust denormalized data first.
+        `cascaded` tells receivers of pre_set_active that the rows are children
+        in a cascade whose root is changed too.
+        """
+        changed = self.exclude(is_active=is_active)
+        values = {'is_active': is_active}
+        if any(field.name == 'update_at' for field in self.model._meta.concrete_fields):
+            values['update_at'] = now or timezone.now()
+        with transaction.atomic(using=self.db, savepoint=False):
+            if pre_soft_delete := getattr(self.model, 'pre_soft_delete', None):
+                pre_soft_delete(changed, is_active)
+            pre_set_active.send(sender=self.model, queryset=changed, is_active=is_active, cascaded=cascaded)
+            return changed.update(**values)
+
+    def cascade_archive(self) -> dict:
+        """
+        Archive the rows of the queryset and their whole soft-delete subtree.
+        Returns the number of rows touched per model label.
+        """
+        return self._cascade(is_active=False)
+
+    def cascade_restore(self) -> dict:
+        """
+        Restore the rows of the queryset and their whole soft-delete subtree.
+        Returns the number of rows touched per model label.
+        """
+        return self._cascade(is_active=True)
+
+    def cascade_plan(self) -> list:
+        """
+        Returns (model, queryset) pairs for the queryset and every model reachable
+        through `soft_delete_cascade`, parents before children.
+        Children are selected with nested subqueries, so nothing is evaluated here.
+        """
+        plan = [(self.model, self)]
+        for model, queryset in plan:
+            for accessor in getattr(model, 'soft_delete_cascade', ()):
+                relation = model._meta.get_field(accessor)
+                child_qs = relation.related_model.original_objects.filter(
+                    **{f'{relation.field.name}__in': queryset.values('pk')}
+                    )
+                plan.append((relation.related_model, child_qs))
+        return plan
+
+    def _cascade(self, is_active: bool) -> dict:
+        touched = {}
+        now = timezone.now()
+        with transaction.atomic(using=self.db):
+            # Children first: their subqueries still see the parents' old state.
+            for model, queryset in reversed(self.cascade_plan()):
+                label = model._meta.label
+                touched[label] = touched.get(label, 0) + queryset.set_active(
+                    is_active, now, cascaded=queryset is not self
+                    )
+        return touched
     
 class HardManager(models.Manager):
     def get_queryset(self):
@@ -36,15 +97,41 @@ class SoftDeleteMixin(models.Model):
     objects = SoftManager()
     original_objects = HardManager()
 
-    def archive(self):
+    # Reverse relation accessors archived and restored together with the object.
+    soft_delete_cascade = ()
+
+    def archive(self) -> dict:
+        touched = self.__class__.original_objects.filter(pk=self.pk).cascade_archive()
         self.is_active = False
-        self.save()
+        return touched
 
-    def restore(self):
+    def restore(self) -> dict:
+        touched = self.__class__.original_objects.filter(pk=self.pk).cascade_restore()
         self.is_active= True
-        self.save()
+        return touched
+
+    @classmethod
+    def pre_soft_delete(cls, queryset, is_active: bool) -> None:
+        """
+        Called before the rows of `queryset` are archived or restored in bulk.
+        """
 
     class Meta:
         abstract = True
 
 
+
+
+class Blob(models.Model):
+    """
+    A file of the content-addressed storage and the number of rows that hold it.
+    """
+    name = models.CharField(_("Name"), max_length=100, unique=True, help_text='Name of the file in the storage')
+    references = models.PositiveIntegerField(_("References"), default=0, help_text='Rows that hold the file')
+
+    class Meta:
+        verbose_name = _("Blob")
+        verbose_name_plural = _("Blobs")
+
+    def __str__(self) -> str:
+        return self.name
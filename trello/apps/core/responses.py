@@ -0,0 +1,87 @@
+"""
+JSON responses that are encoded while they are sent.
+
+Arrays of rows are read from the database in chunks and rendered one chunk
+at a time, so the memory a response holds does not grow with its rows.
+Rows are encoded with orjson when it is installed.
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Rows read, rendered and encoded at a time.
+STREAM_CHUNK_SIZE = 2000
+
+_encoder = JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_encoder.default)
+    return _encoder.encode(value).encode()
+
+
+class JSONStream:
+    """
+    A JSON array of the rows of `queryset`, rendered by the list serializer
+    `serializer` chunk by chunk. Serializers with a `values()` read path,
+    like ValuesListSerializer, read rows instead of model instances.
+    """
+
+    def __init__(self, serializer, queryset, chunk_size: int = STREAM_CHUNK_SIZE) -> None:
+        self.serializer = serializer
+        self.queryset = queryset
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        values = getattr(self.serializer, 'values', None)
+        rows = values(self.queryset) if values is not None else self.queryset
+        chunk = []
+        for row in rows.iterator(chunk_size=self.chunk_size):
+            chunk.append(row)
+            if len(chunk) == self.chunk_size:
+                yield self.serializer.to_representation(chunk)
+                chunk = []
+        if chunk:
+            yield self.serializer.to_representation(chunk)
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """
+    Streams `data`, a dict whose JSONStream values are encoded chunk by chunk.
+    ASGI requests get an asynchronous stream, since Django buffers whole
+    synchronous streams before serving them asynchronously.
+    """
+
+    def __init__(self, data: dict, request=None, **kwargs) -> None:
+        kwargs.setdefault('content_type', 'application/json')
+        content = self._encode(data)
+        if isinstance(getattr(request, '_request', request), ASGIRequest):
+            content = self._encode_async(content)
+        super().__init__(content, **kwargs)
+
+    def _encode(self, data: dict):
+        yield b'{'
+        for index, (key, value) in enumerate(data.items()):
+            yield (b',' if index else b'') + dumps(key) + b':'
+            if not isinstance(value, JSONStream):
+                yield dumps(value)
+                continue
+            separator = b'['
+            for rows in value:
+                # One call per chunk, without the brackets of the list.
+                yield separator + dumps(rows)[1:-1]
+                separator = b','
+            yield b'[]' if separator == b'[' else b']'
+        yield b'}'
+
+    async def _encode_async(self, content):
+        # Database access runs in the thread of the sync views, chunk by chunk.
+        while (chunk := await sync_to_async(next)(content, None)) is not None:
+            yield chunk
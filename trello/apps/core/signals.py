@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent by SoftQuerySet.set_active before rows are archived or restored with a
+# single UPDATE, which bypasses post_save. Receivers get the rows that will
+# change as `queryset`, their new `is_active` and `cascaded`, which is true for
+# the children of a cascading archive or restore.
+pre_set_active = Signal()
@@ -0,0 +1,100 @@
+"""
+Content-addressed file storage.
+
+Files are stored once per content, under the SHA-256 digest of their bytes
+in a tree sharded by its first characters, like blobs/3f/a2/3fa2...c1.pdf.
+The digest is computed while the file is written, or taken from the
+`content_hash` of files that were hashed as they were received, like
+uploads of the hashing upload handlers.
+
+Stored files are shared by every row that holds the same content, so they
+are reference counted by Blob rows instead of being deleted with a row;
+see `trello.apps.core.blobs`. Names that are not blobs, like the default
+images, are served as usual and never counted or deleted.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Directory of blobs in the storage.
+BLOB_DIRECTORY = 'blobs'
+# Levels of the tree and characters of the digest each level is named after.
+BLOB_SHARD_LEVELS = 2
+BLOB_SHARD_WIDTH = 2
+# Extensions longer than this are dropped, to keep names within FileField limits.
+BLOB_MAX_EXTENSION = 16
+
+_BLOB_NAME = re.compile(
+    rf'^{BLOB_DIRECTORY}/(?:[0-9a-f]{{{BLOB_SHARD_WIDTH}}}/){{{BLOB_SHARD_LEVELS}}}[0-9a-f]{{64}}(?:\.\w+)?$'
+    )
+
+
+def blob_name(digest: str, filename: str) -> str:
+    """
+    Returns the name of the blob of the SHA-256 `digest`, keeping the extension of `filename`.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if len(extension) > BLOB_MAX_EXTENSION or not extension[1:].isalnum():
+        extension = ''
+    shards = [digest[level * BLOB_SHARD_WIDTH:(level + 1) * BLOB_SHARD_WIDTH] for level in range(BLOB_SHARD_LEVELS)]
+    return '/'.join([BLOB_DIRECTORY, *shards, digest + extension])
+
+
+def is_blob(name: str | None) -> bool:
+    return bool(name) and _BLOB_NAME.match(name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    A file system storage that names files after the digest of their content.
+    Saving content that is already stored returns the stored name and writes
+    nothing.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Names are decided by the content, in _save, and never conflict.
+        return name
+
+    def _save(self, name, content):
+        digest = getattr(content, 'content_hash', None)
+        if digest is not None and hasattr(content, 'temporary_file_path'):
+            return self._store(digest, name, content.temporary_file_path())
+        directory = self.path(BLOB_DIRECTORY)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            # One pass: every chunk is hashed as it is written.
+            hasher = hashlib.sha256()
+            with os.fdopen(descriptor, 'wb') as file:
+                for chunk in content.chunks():
+                    chunk = chunk.encode() if isinstance(chunk, str) else chunk
+                    hasher.update(chunk)
+                    file.write(chunk)
+            return self._store(hasher.hexdigest(), name, path)
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _store(self, digest: str, name: str, path: str) -> str:
+        """
+        Moves the file at `path` to the blob of `digest`, unless it is stored already.
+        """
+        stored = blob_name(digest, name)
+        if self.exists(stored):
+            try:
+                # Marks the file as in use for sweeps, until its reference is saved.
+                os.utime(self.path(stored))
+                return stored
+            except FileNotFoundError:
+                # Swept meanwhile: stored again below.
+                pass
+        os.makedirs(os.path.dirname(self.path(stored)), exist_ok=True)
+        file_move_safe(path, self.path(stored), allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(self.path(stored), self.file_permissions_mode)
+        return stored
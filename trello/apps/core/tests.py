@@ -1,3 +1,140 @@
-from django.test import TestCase
+import hashlib
+import os
+import tempfile
+import time
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import StopFutureHandlers
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from trello.apps.accounts.models import User
+from trello.apps.core import blobs
+from trello.apps.core.models import Blob
+from trello.apps.core.storage import blob_name, is_blob
+from trello.apps.core.uploadhandlers import HashingMemoryFileUploadHandler, HashingTemporaryFileUploadHandler
+from trello.apps.dashboards.models import Attachment, Board, Task, TaskList, WorkSpace
 
-# Create your tests here.
+
+class ContentAddressedStorageTestCase(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.task = Task.objects.create(title="Task", status=self.task_list)
+
+    def _attach(self, content: bytes, name: str = 'report.pdf') -> Attachment:
+        return Attachment.create(ContentFile(content, name=name), self.task, self.owner)
+
+    def _references(self, name: str) -> int | None:
+        return Blob.objects.filter(name=name).values_list('references', flat=True).first()
+
+    def test_same_content_is_stored_once(self):
+        first, second = self._attach(b'minutes'), self._attach(b'minutes', 'copy.PDF')
+        other = self._attach(b'agenda')
+        name = blob_name(hashlib.sha256(b'minutes').hexdigest(), 'report.pdf')
+        self.assertEqual((first.file.name, second.file.name), (name, name))
+        self.assertEqual((first.name, second.name), ('report.pdf', 'copy.PDF'))
+        self.assertTrue(is_blob(name))
+        self.assertNotEqual(other.file.name, name)
+        self.assertEqual((self._references(name), self._references(other.file.name)), (2, 1))
+        with default_storage.open(name) as file:
+            self.assertEqual(file.read(), b'minutes')
+        self.assertEqual(sorted(os.listdir(os.path.dirname(default_storage.path(name)))), [os.path.basename(name)])
+
+    def _age(self, name: str) -> None:
+        expired = time.time() - 120
+        os.utime(default_storage.path(name), (expired, expired))
+
+    def test_unreferenced_files_are_swept(self):
+        first, second = self._attach(b'minutes'), self._attach(b'minutes')
+        name = first.file.name
+        first.delete()
+        self.assertEqual(self._references(name), 1)
+        second.archive()
+        self._age(name)
+        # Archived attachments can be restored, so they keep their file.
+        self.assertEqual(blobs.sweep(default_storage, time.time() - 60), 0)
+        Attachment.original_objects.get(pk=second.pk).delete()
+        self.assertEqual(self._references(name), 0)
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(blobs.sweep(default_storage, time.time() - 60), 1)
+        self.assertIsNone(self._references(name))
+        self.assertFalse(default_storage.exists(name))
+
+    def test_content_stored_again_after_its_last_reference_is_kept(self):
+        first = self._attach(b'minutes')
+        name = first.file.name
+        self._age(name)
+        # The last reference is dropped while the same content is being saved.
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+            second = self._attach(b'minutes')
+        self.assertEqual(self._references(name), 1)
+        self.assertEqual(blobs.sweep(default_storage, time.time() - 60), 0)
+        with second.file.open('rb') as file:
+            self.assertEqual(file.read(), b'minutes')
+        # Until its reference is saved, the refreshed file outlives the grace period.
+        second.delete()
+        self.assertEqual(blobs.sweep(default_storage, time.time() - 60), 0)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_replaced_files_move_their_reference(self):
+        default_background = self.board.background_image.name
+        self.board.background_image = ContentFile(b'blue', name='blue.jpg')
+        self.board.save()
+        blue = self.board.background_image.name
+        self.assertEqual(self._references(blue), 1)
+        self.assertFalse(Blob.objects.filter(name=default_background).exists())
+        board = Board.objects.get(pk=self.board.pk)
+        board.background_image = ContentFile(b'green', name='green.jpg')
+        board.save()
+        self.assertEqual(self._references(board.background_image.name), 1)
+        self.assertEqual(self._references(blue), 0)
+        # Saves of other fields leave references alone.
+        board.title = 'Renamed'
+        board.save(update_fields=['title'])
+        Board.objects.only('title').get(pk=board.pk).save(update_fields=['title'])
+        self.assertEqual(self._references(board.background_image.name), 1)
+
+    def test_uploads_are_hashed_while_received(self):
+        content = b'x' * 1000
+        for handler_class in (HashingMemoryFileUploadHandler, HashingTemporaryFileUploadHandler):
+            with self.subTest(handler=handler_class.__name__):
+                handler = handler_class()
+                handler.handle_raw_input(None, {}, len(content), 'boundary')
+                try:
+                    handler.new_file('file', 'scan.png', 'image/png', len(content))
+                except StopFutureHandlers:
+                    pass
+                for start in range(0, len(content), 300):
+                    handler.receive_data_chunk(content[start:start + 300], start)
+                file = handler.file_complete(len(content))
+                self.assertEqual(file.content_hash, hashlib.sha256(content).hexdigest())
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.post(
+            reverse('dashboards:attachment-list'),
+            {'task': self.task.pk, 'file': ContentFile(content, name='scan.png')},
+            format='multipart',
+            )
+        self.assertEqual(response.status_code, 201)
+        attachment = Attachment.objects.get(pk=response.data['id'])
+        self.assertEqual(attachment.file.name, blob_name(hashlib.sha256(content).hexdigest(), 'scan.png'))
+        self.assertEqual(attachment.name, 'scan.png')
+
+    def test_sweep_removes_unreferenced_files(self):
+        kept = self._attach(b'minutes').file.name
+        lost = default_storage.save('uploads/attachments/lost.pdf', ContentFile(b'lost'))
+        self.assertTrue(default_storage.exists(lost))
+        self.assertEqual(blobs.sweep(default_storage, time.time() - 60), 0)
+        self.assertEqual(blobs.sweep(default_storage, time.time() + 60), 1)
+        self.assertFalse(default_storage.exists(lost))
+        self.assertTrue(default_storage.exists(kept))
@@ -0,0 +1,38 @@
+"""
+Upload handlers that hash files while they are received, so the
+content-addressed storage does not read them again to name them.
+"""
+import hashlib
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class HashingUploadHandlerMixin:
+    """
+    Sets the SHA-256 hex digest of the files the handler receives as their `content_hash`.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Created first, as the memory handler stops the other handlers in new_file.
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        passed = super().receive_data_chunk(raw_data, start)
+        if passed is None:
+            # Kept by this handler rather than passed on to the next one.
+            self.hasher.update(raw_data)
+        return passed
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.content_hash = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadHandlerMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadHandlerMixin, TemporaryFileUploadHandler):
+    pass
@@ -1,4 +1,9 @@
-from django.shortcuts import render
+import hashlib
+from django.shortcuts import get_object_or_404, render
+from django.db.models import Count, Max, OuterRef, Subquery, prefetch_related_objects
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
 
 # Create your views here.
 
@@ -7,4 +12,106 @@ from django.template import Template
 
 class HomeVeiw(View):
     def get(self, request):
-        return render(request, 'core/home.html')
\ No newline at end of file
+        return render(request, 'core/home.html')
+
+
+class ConditionalRetrieveMixin:
+    """
+    Answers retrieve with 304 Not Modified while the ETag or Last-Modified
+    sent by the client still match, without loading relations or serializing.
+
+    The validators come from the row of the object and, for every relation in
+    `conditional_relations`, the latest `update_at` and the number of related
+    rows. Relations may span models, like `owner_work_spaces__members`. They
+    are annotated on the query that loads the object for the permission check,
+    so a hit costs that single query.
+    """
+    conditional_relations = ()
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        instance = self.get_conditional_object(queryset.prefetch_related(None))
+        etag, last_modified = self.get_validators(instance)
+        response = Response(headers={'ETag': etag})
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        conditional = get_conditional_response(request, etag=etag, last_modified=last_modified, response=response)
+        if conditional is not response:
+            return conditional
+        response.data = self.get_retrieve_data(instance, queryset, etag)
+        return response
+
+    def get_retrieve_data(self, instance, queryset, etag: str):
+        """
+        Loads the relations of `queryset` onto the object and serializes it.
+        """
+        prefetch_related_objects([instance], *queryset._prefetch_related_lookups)
+        return self.get_serializer(instance).data
+
+    def get_conditional_object(self, queryset):
+        """
+        Same as `get_object`, with the validator annotations on the query.
+        """
+        queryset = self.filter_queryset(queryset).annotate(**self.get_validator_annotations(queryset.model))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def get_conditional_relations(self) -> tuple:
+        """
+        Returns the relations whose changes alter the representation.
+        """
+        return self.conditional_relations
+
+    def get_validator_annotations(self, model) -> dict:
+        """
+        Returns one correlated subquery per relation aggregate, so that the
+        relations are never joined with each other.
+        """
+        annotations = {}
+        for relation in self.get_conditional_relations():
+            rows = model._base_manager.filter(pk=OuterRef('pk')).order_by().values('pk')
+            related_model = model
+            for name in relation.split('__'):
+                related_model = related_model._meta.get_field(name).related_model
+            if any(field.name == 'update_at' for field in related_model._meta.concrete_fields):
+                annotations[f'conditional_{relation}_modified'] = Subquery(
+                    rows.annotate(value=Max(f'{relation}__update_at')).values('value')
+                    )
+            annotations[f'conditional_{relation}_count'] = Subquery(
+                rows.annotate(value=Count(relation)).values('value')
+                )
+        return annotations
+
+    def get_variant(self) -> str:
+        """
+        Returns what shapes the representation besides the object, such as the
+        query parameters that select its fields. It is part of the ETag.
+        """
+        return ''
+
+    def get_validators(self, instance) -> tuple:
+        """
+        Returns the weak ETag and the Last-Modified timestamp of the object.
+        Relations can lose rows without any `update_at` moving, so objects
+        validated by relation counts have no Last-Modified.
+        """
+        deferred = instance.get_deferred_fields()
+        fields = [
+            getattr(instance, field.attname) for field in instance._meta.concrete_fields
+            if field.attname not in deferred
+            ]
+        annotations = [
+            getattr(instance, f'conditional_{relation}_{aggregate}', None)
+            for relation in self.get_conditional_relations()
+            for aggregate in ('modified', 'count')
+            ]
+        digest = hashlib.blake2b(
+            repr([instance._meta.label, fields, annotations, self.get_variant()]).encode(), digest_size=16
+            )
+        if self.get_conditional_relations():
+            return f'W/"{digest.hexdigest()}"', None
+        modified = getattr(instance, 'update_at', None)
+        last_modified = int(modified.timestamp()) if modified is not None else None
+        return f'W/"{digest.hexdigest()}"', last_modified
@@ -0,0 +1,56 @@
+"""
+Cross-request cache of the workspaces each user owns or is a member of.
+
+Entries live in the `acl` cache, which bounds their number and lifetime.
+Each entry is tagged with the version token of its user, read before the
+rows. Signal handlers and `WorkSpace.pre_soft_delete` drop the tokens of
+every user whose access changed, once right away and once more when the
+transaction commits, so an entry built by a concurrent request from the old
+rows no longer matches the token of its user and is never served.
+"""
+from uuid import uuid4
+from django.core.cache import caches
+from django.db import transaction
+
+ACL_CACHE_ALIAS = 'acl'
+
+
+def _key(user_id) -> str:
+    return f'work_spaces:{user_id}'
+
+
+def _version_key(user_id) -> str:
+    return f'work_spaces_version:{user_id}'
+
+
+def get_work_spaces(user_id) -> tuple:
+    """
+    Returns the version token of the user and their cached (owned, membered)
+    workspace id sets, or None when there are none for that token.
+    The token is passed on to `set_work_spaces` with the rows read after it.
+    """
+    cache = caches[ACL_CACHE_ALIAS]
+    entries = cache.get_many([_version_key(user_id), _key(user_id)])
+    if (version := entries.get(_version_key(user_id))) is None:
+        cache.add(_version_key(user_id), uuid4().hex)
+        # Another request may have added its token first.
+        version = cache.get(_version_key(user_id)) or uuid4().hex
+    entry = entries.get(_key(user_id))
+    if entry is not None and entry[0] == version:
+        return version, entry[1:]
+    return version, None
+
+
+def set_work_spaces(user_id, version: str, owned: frozenset, membered: frozenset) -> None:
+    caches[ACL_CACHE_ALIAS].set(_key(user_id), (version, owned, membered))
+
+
+def invalidate_work_spaces(user_ids) -> None:
+    """
+    Drops the version tokens and cached workspaces of the given users.
+    """
+    keys = [key for user_id in set(user_ids) if user_id is not None for key in (_version_key(user_id), _key(user_id))]
+    if not keys:
+        return
+    caches[ACL_CACHE_ALIAS].delete_many(keys)
+    transaction.on_commit(lambda: caches[ACL_CACHE_ALIAS].delete_many(keys))
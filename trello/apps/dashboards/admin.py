@@ -16,12 +16,12 @@ class CustomModelAdmin(admin.ModelAdmin):
 
     @admin.action(description=f'Archive Selected Items')
     def archive(self, request, queryset):
-        queryset.archive()
+        queryset.cascade_archive()
         
 
     @admin.action(description='Restore Selected Items')
     def restore(self, request, queryset):
-        queryset.restore()
+        queryset.cascade_restore()
 
     def get_queryset(self, request: HttpRequest) -> QuerySet[Any]:
         qs = self.model.original_objects.get_queryset()
@@ -148,9 +148,9 @@ class ActivityAdmin(admin.ModelAdmin):
         (None, {'fields': ('id', 'message', 'task', 'doer', )}),
         (_("Important dates"), {"fields": ("create_at",)})
     )
-    list_display = ('doer', 'task', 'message', )
-    list_filter = ('message',)
-    search_fields = ('doer__email', 'task__status__board__work_space__title')
+    list_display = ('doer', 'task', 'event_type', 'message', )
+    list_filter = ('event_type',)
+    search_fields = ('doer__email', 'work_space__title')
     ordering = ('task',)
     readonly_fields = ('message', 'task', 'doer', "create_at", 'id')
     def has_add_permission(self, request, obj=None):
@@ -160,6 +160,22 @@ class ActivityAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(Change)
+class ChangeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'action', 'model', 'object_id', 'work_space', 'create_at', )
+    list_filter = ('action', 'model',)
+    search_fields = ('object_id', 'work_space__title')
+    readonly_fields = ('id', 'work_space', 'board', 'model', 'object_id', 'action', 'create_at')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(Task)
 class TaskAdmin(CustomModelAdmin):
     fieldsets = (
@@ -199,7 +215,7 @@ class CommentAdmin(CustomModelAdmin):
     def get_form(self, request: Any, obj: Any | None = ..., change: bool = ..., **kwargs: Any) -> Any:
         form = super().get_form(request, obj, change, **kwargs)
         if obj:
-            form.base_fields['task'].queryset = Task.objects.filter(status__board=obj.task.status.board)
+            form.base_fields['task'].queryset = Task.objects.filter(board=obj.board)
             form.base_fields['parent'].queryset = Comment.objects.filter(task=obj.task)
             form.base_fields['author'].queryset =\
                 User.objects.filter(Q(member_work_spaces=obj.task.status.board.work_space)\
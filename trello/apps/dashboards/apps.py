@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DashboardsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'trello.apps.dashboards'
+
+    def ready(self):
+        from . import signals  # noqa: F401
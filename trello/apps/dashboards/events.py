@@ -0,0 +1,63 @@
+"""
+Activity event types, the parser that recovers them from legacy messages and
+the actions of the change log.
+"""
+import re
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class EventType(models.TextChoices):
+    OTHER = 'other', _('Other')
+    TASK_CREATED = 'task_created', _('Task created')
+    TASK_TITLE_CHANGED = 'task_title_changed', _('Task title changed')
+    TASK_DESCRIPTION_CHANGED = 'task_description_changed', _('Task description changed')
+    TASK_STATUS_CHANGED = 'task_status_changed', _('Task status changed')
+    TASK_START_DATE_CHANGED = 'task_start_date_changed', _('Task start date changed')
+    TASK_END_DATE_CHANGED = 'task_end_date_changed', _('Task end date changed')
+    TASK_ASSIGNED = 'task_assigned', _('Task assigned')
+    TASK_UNASSIGNED = 'task_unassigned', _('Task unassigned')
+    COMMENT_CREATED = 'comment_created', _('Comment created')
+    COMMENT_REPLIED = 'comment_replied', _('Comment replied')
+    COMMENT_UPDATED = 'comment_updated', _('Comment updated')
+    COMMENT_DELETED = 'comment_deleted', _('Comment deleted')
+    ATTACHMENT_CREATED = 'attachment_created', _('Attachment created')
+    ATTACHMENT_DELETED = 'attachment_deleted', _('Attachment deleted')
+
+
+class ChangeAction(models.TextChoices):
+    CREATED = 'created', _('Created')
+    UPDATED = 'updated', _('Updated')
+    ARCHIVED = 'archived', _('Archived')
+    RESTORED = 'restored', _('Restored')
+    DELETED = 'deleted', _('Deleted')
+
+
+MESSAGE_PATTERNS = [
+    (EventType.TASK_CREATED, re.compile(r"^Task '(?P<title>.*)' was created\.$", re.S)),
+    (EventType.TASK_CREATED, re.compile(r"created a new task")),
+    (EventType.TASK_TITLE_CHANGED, re.compile(r"^Task title was changed to (?P<title>.*)\.$", re.S)),
+    (EventType.TASK_DESCRIPTION_CHANGED, re.compile(r"^Task description was changed\.$")),
+    (EventType.TASK_STATUS_CHANGED, re.compile(r"^Task status was changed to (?P<title>.*)\.$", re.S)),
+    (EventType.TASK_START_DATE_CHANGED, re.compile(r"^Task start date was changed to (?P<date>.*)\.$")),
+    (EventType.TASK_END_DATE_CHANGED, re.compile(r"^Task end date was changed to (?P<date>.*)\.$")),
+    (EventType.TASK_ASSIGNED, re.compile(r"^Task assined to (?P<user>.*)\.$")),
+    (EventType.TASK_UNASSIGNED, re.compile(r"^(?P<user>.*) removed from task assigness\.$")),
+    (EventType.COMMENT_REPLIED, re.compile(r" replied to a comment on task ")),
+    (EventType.COMMENT_CREATED, re.compile(r" added a new comment on task ")),
+    (EventType.COMMENT_UPDATED, re.compile(r" updated a comment on task ")),
+    (EventType.COMMENT_DELETED, re.compile(r" deleted a comment on task ")),
+    (EventType.ATTACHMENT_CREATED, re.compile(r" attached a new file\.$")),
+    (EventType.ATTACHMENT_DELETED, re.compile(r" deleted a attachment on task ")),
+]
+
+
+def parse_message(message: str) -> tuple:
+    """
+    Returns the event type and payload of a free-text activity message.
+    Unknown messages are typed as OTHER with an empty payload.
+    """
+    for event_type, pattern in MESSAGE_PATTERNS:
+        if match := pattern.search(message):
+            return event_type.value, match.groupdict()
+    return EventType.OTHER.value, {}
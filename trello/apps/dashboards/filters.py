@@ -0,0 +1,39 @@
+from django_filters import rest_framework as filters
+from .events import EventType
+from .models import Activity, SearchEntry
+from .search import search
+
+
+class ActivityFilter(filters.FilterSet):
+    """
+    Filters activities by doer, event types and a (from_date, to_date] interval,
+    like `Activity.from_to_date_on_board`.
+    """
+    doer = filters.UUIDFilter(field_name='doer')
+    event = filters.MultipleChoiceFilter(field_name='event_type', choices=EventType.choices)
+    from_date = filters.IsoDateTimeFilter(field_name='create_at', lookup_expr='gt')
+    to_date = filters.IsoDateTimeFilter(field_name='create_at', lookup_expr='lte')
+
+    class Meta:
+        model = Activity
+        fields = ['doer', 'event', 'from_date', 'to_date']
+
+
+class SearchFilter(filters.FilterSet):
+    """
+    Searches entries for the words of `q`, optionally within a workspace, a
+    board or one kind of object.
+    """
+    q = filters.CharFilter(method='filter_query', required=True)
+    work_space = filters.UUIDFilter(field_name='task__work_space')
+    board = filters.UUIDFilter(field_name='task__board')
+    model = filters.ChoiceFilter(
+        field_name='model', choices=[(name, name) for name in ('task', 'comment', 'attachment')]
+        )
+
+    class Meta:
+        model = SearchEntry
+        fields = ['q', 'work_space', 'board', 'model']
+
+    def filter_query(self, queryset, name, value):
+        return search(queryset, value)
@@ -0,0 +1,131 @@
+"""
+Read-through cache of serialized board, task list and task payloads.
+
+Fragments live in the `fragments` cache alias. Their keys embed a version
+token for the workspace and for the board the object belongs to. Signal
+handlers invalidate a scope by dropping its token: the next read draws a new
+random token, so old fragments are never reached again and simply expire.
+Invalidation runs right away and again on commit, so a request that rebuilt
+a fragment from the old rows in between cannot keep it alive.
+
+Misses are coalesced: per key, one thread of the process builds while the
+others wait for it, and the builder holds a lock in the cache so that other
+workers poll for its result instead of building the same payload.
+"""
+import threading
+from collections import Counter
+from time import monotonic, sleep
+from uuid import uuid4
+from django.core.cache import caches
+from django.db import transaction
+
+FRAGMENT_CACHE_ALIAS = 'fragments'
+# Seconds a builder may hold the lock of a key before others take over.
+FRAGMENT_LOCK_TIMEOUT = 10
+# Seconds to wait for another builder before building anyway.
+FRAGMENT_WAIT_TIMEOUT = 5
+FRAGMENT_POLL_INTERVAL = 0.05
+
+stats = Counter(hits=0, misses=0, coalesced=0)
+
+_stats_lock = threading.Lock()
+_flights_lock = threading.Lock()
+_flights = {}
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        stats[name] += 1
+
+
+def _version_key(kind: str, pk) -> str:
+    return f'version:{kind}:{pk}'
+
+
+def scope_version(work_space_id, board_id=None) -> str:
+    """
+    Returns the current version token of the workspace and, if given, the board.
+    """
+    cache = caches[FRAGMENT_CACHE_ALIAS]
+    keys = [_version_key('work_space', work_space_id)]
+    if board_id is not None:
+        keys.append(_version_key('board', board_id))
+    versions = cache.get_many(keys)
+    if missing := [key for key in keys if key not in versions]:
+        for key in missing:
+            cache.add(key, uuid4().hex, timeout=None)
+        # Another request may have added its token first.
+        versions.update(cache.get_many(missing))
+    return ':'.join(versions.get(key, '') for key in keys)
+
+
+def invalidate(work_space_ids=(), board_ids=()) -> None:
+    """
+    Drops the version tokens of the given workspaces and boards.
+    """
+    keys = [_version_key('work_space', pk) for pk in set(work_space_ids) if pk is not None]
+    keys += [_version_key('board', pk) for pk in set(board_ids) if pk is not None]
+    if not keys:
+        return
+    caches[FRAGMENT_CACHE_ALIAS].delete_many(keys)
+    transaction.on_commit(lambda: caches[FRAGMENT_CACHE_ALIAS].delete_many(keys))
+
+
+def get_or_build(key: str, build, wait: float = FRAGMENT_WAIT_TIMEOUT):
+    """
+    Returns the cached fragment of `key`, building and storing it on a miss
+    unless another thread or worker is already building it.
+    """
+    cache = caches[FRAGMENT_CACHE_ALIAS]
+    data = cache.get(key)
+    if data is not None:
+        _count('hits')
+        return data
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = threading.Event()
+    if not leader:
+        flight.wait(wait)
+        data = cache.get(key)
+        if data is not None:
+            _count('coalesced')
+            return data
+        return _build(cache, key, build)
+    try:
+        return _build_once(cache, key, build, wait)
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.set()
+
+
+def _build_once(cache, key: str, build, wait: float):
+    """
+    Builds the fragment under the cache lock of `key`, or waits for the worker
+    holding it.
+    """
+    lock_key = f'lock:{key}'
+    if cache.add(lock_key, 1, timeout=FRAGMENT_LOCK_TIMEOUT):
+        try:
+            return _build(cache, key, build)
+        finally:
+            cache.delete(lock_key)
+    deadline = monotonic() + wait
+    while monotonic() < deadline:
+        sleep(FRAGMENT_POLL_INTERVAL)
+        data = cache.get(key)
+        if data is not None:
+            _count('coalesced')
+            return data
+        if lock_key not in cache:
+            break
+    return _build(cache, key, build)
+
+
+def _build(cache, key: str, build):
+    _count('misses')
+    data = build()
+    cache.set(key, data)
+    return data
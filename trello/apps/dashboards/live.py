@@ -0,0 +1,108 @@
+"""
+In-process hub that pushes change log entries to the live event streams of boards.
+
+Each stream subscribes with a bounded buffer owned by its event loop. Writers
+publish after commit from any thread; entries are handed to the loop of each
+subscriber, so idle streams cost a buffer and no thread. A stream that falls
+behind has its buffer dropped and receives a single `resync` event, after
+which the client reads the change feed from its last cursor.
+
+The hub only reaches streams served by the same process: run the streams in
+one ASGI worker or add a broker before scaling them out.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+# Entries buffered per stream before it is told to resync.
+LIVE_BUFFER_SIZE = 100
+
+RESYNC = {'event': 'resync'}
+
+
+class Subscription:
+    """
+    The buffer of one live stream. It must be created and read on the loop of
+    the stream.
+    """
+
+    def __init__(self, work_space_id, board_id, size: int = LIVE_BUFFER_SIZE) -> None:
+        self.work_space_id = work_space_id
+        self.board_id = board_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=size)
+        self.behind = False
+
+    def push(self, entries: list) -> None:
+        """
+        Buffers entries, or replaces the buffer with a resync event when full.
+        Runs on the loop of the stream.
+        """
+        if self.behind:
+            return
+        for entry in entries:
+            try:
+                self.queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                while not self.queue.empty():
+                    self.queue.get_nowait()
+                self.queue.put_nowait(RESYNC)
+                self.behind = True
+                return
+
+    async def get(self) -> dict:
+        entry = await self.queue.get()
+        if entry is RESYNC:
+            self.behind = False
+        return entry
+
+
+class Hub:
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._boards = defaultdict(set)
+        self._work_spaces = defaultdict(set)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._work_spaces.values())
+
+    def subscribe(self, work_space_id, board_id, size: int = LIVE_BUFFER_SIZE) -> Subscription:
+        subscription = Subscription(work_space_id, board_id, size)
+        with self._lock:
+            self._work_spaces[work_space_id].add(subscription)
+            self._boards[board_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for index, key in ((self._work_spaces, subscription.work_space_id), (self._boards, subscription.board_id)):
+                index[key].discard(subscription)
+                if not index[key]:
+                    del index[key]
+
+    def publish(self, entries: list) -> None:
+        """
+        Hands change log entries to the streams of their boards. Entries
+        without a board, like workspace updates, go to every stream of the
+        workspace.
+        """
+        targets = defaultdict(list)
+        with self._lock:
+            for entry in entries:
+                if entry['board'] is None:
+                    subscriptions = self._work_spaces.get(entry['work_space'], ())
+                else:
+                    subscriptions = self._boards.get(entry['board'], ())
+                for subscription in subscriptions:
+                    targets[subscription].append(entry)
+        for subscription, subscription_entries in targets.items():
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, subscription_entries)
+            except RuntimeError:
+                # The loop of the stream is closed.
+                self.unsubscribe(subscription)
+
+
+hub = Hub()
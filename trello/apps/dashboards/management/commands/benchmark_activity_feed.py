@@ -0,0 +1,72 @@
+from time import perf_counter
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from trello.apps.accounts.models import User
+from trello.apps.dashboards.models import Activity, Board, Task, TaskList, WorkSpace
+from trello.apps.dashboards.pagination import KeysetPagination
+from trello.apps.dashboards.permissions import user_work_spaces
+from trello.apps.dashboards.views.activity_views import ActivityFeedView
+
+
+class Command(BaseCommand):
+    help = 'Benchmark deep pages of the board activity feed. All rows are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, nargs='+', default=[1, 100, 10_000])
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, pages, page_size, repeat, **options):
+        view = ActivityFeedView.as_view(scope='board')
+        with transaction.atomic():
+            owner = User.objects.create_user(email='benchmark-owner@example.com', password=None)
+            work_space = WorkSpace.objects.create(title='Benchmark', owner=owner)
+            board = Board.objects.create(title='Benchmark', work_space=work_space)
+            user_work_spaces(owner)
+            self._generate(owner, board, max(pages) * page_size)
+            url = f'/dashboards/boards/{board.pk}/activities/'
+            paginator = KeysetPagination()
+            for page in pages:
+                params = {'page_size': page_size}
+                if page > 1:
+                    last = Activity.objects.filter(board=board).order_by(
+                        '-create_at', '-id'
+                        ).values_list('create_at', 'pk')[(page - 1) * page_size - 1]
+                    params['cursor'] = paginator.encode_cursor(last)
+                timings = []
+                for _ in range(repeat):
+                    request = APIRequestFactory().get(url, params)
+                    force_authenticate(request, user=owner)
+                    queries = []
+                    with connection.execute_wrapper(self._count(queries)):
+                        start = perf_counter()
+                        response = view(request, pk=board.pk).render()
+                        timings.append(perf_counter() - start)
+                    if response.status_code != 200 or len(response.data['results']) != page_size:
+                        raise CommandError(f'Page {page} returned {response.status_code}')
+                self.stdout.write(
+                    f'page {page}: best {min(timings) * 1000:.1f}ms, '
+                    f'mean {sum(timings) / repeat * 1000:.1f}ms, {len(queries)} queries'
+                    )
+            transaction.set_rollback(True)
+
+    def _generate(self, owner, board, size):
+        task = Task.objects.create(title='Task', status=TaskList.objects.create(title='List', board=board))
+        activities = Activity.objects.bulk_create(
+            [Activity(task=task, doer=owner, message='...', board=board, work_space=board.work_space)
+             for _ in range(size)],
+            batch_size=5_000,
+            )
+        # Spread the rows over time, with ties, as a busy board would have them.
+        now = timezone.now()
+        for index in range(0, size, 5_000):
+            chunk = [activity.pk for activity in activities[index:index + 5_000]]
+            Activity.objects.filter(pk__in=chunk).update(create_at=now - timezone.timedelta(seconds=index))
+
+    def _count(self, queries):
+        def wrapper(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+        return wrapper
@@ -0,0 +1,76 @@
+from time import perf_counter
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from trello.apps.accounts.models import User
+from trello.apps.dashboards.models import Board, Comment, Task, TaskList, WorkSpace
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark cascading archive/restore of a generated workspace and fail if either issues more '
+        'statements than for a one-task workspace. All rows are rolled back.'
+        )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100_000)
+        parser.add_argument('--boards', type=int, default=10)
+        parser.add_argument('--lists', type=int, default=10, help='Task lists per board')
+        parser.add_argument('--comments', type=int, default=1, help='Comments per task')
+        parser.add_argument('--batch-size', type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # The statement counts of a one-task workspace are the reference:
+            # archive and restore must not issue more for a larger one.
+            reference = self._generate('reference', **{**options, 'tasks': 1, 'boards': 1, 'lists': 1})
+            expected = {
+                'archive': self._measure('archive', reference.archive),
+                'restore': self._measure('restore', reference.restore),
+                }
+            workspace = self._generate('benchmark', **options)
+            for name, method in (('archive', workspace.archive), ('restore', workspace.restore)):
+                statements = self._measure(name, method)
+                if statements != expected[name]:
+                    raise CommandError(
+                        f'{name} issued {statements} statements, {expected[name]} for a one-task workspace'
+                        )
+            transaction.set_rollback(True)
+
+    def _generate(self, name, tasks, boards, lists, comments, batch_size, **kwargs):
+        start = perf_counter()
+        owner = User.objects.create_user(email=f'{name}-owner@example.com', password=None)
+        workspace = WorkSpace.objects.create(title='Benchmark', owner=owner)
+        board_objs = Board.objects.bulk_create(
+            [Board(title=f'Board {i}', work_space=workspace) for i in range(boards)]
+            )
+        list_objs = TaskList.objects.bulk_create(
+            [TaskList(title=f'List {i}', board=board) for board in board_objs for i in range(lists)]
+            )
+        task_objs = Task.objects.bulk_create(
+            (Task(title=f'Task {i}', description='', status=list_objs[i % len(list_objs)], order=i,
+                  board_id=list_objs[i % len(list_objs)].board_id, work_space=workspace)
+             for i in range(tasks)),
+            batch_size=batch_size,
+            )
+        Comment.objects.bulk_create(
+            (Comment(body='...', task=task, author=owner, board_id=task.board_id, work_space=workspace)
+             for task in task_objs for _ in range(comments)),
+            batch_size=batch_size,
+            )
+        TaskList.repair_tasks_count()
+        self.stdout.write(
+            f'generated {boards} boards, {len(list_objs)} lists, {tasks} tasks, '
+            f'{tasks * comments} comments in {perf_counter() - start:.2f}s'
+            )
+        return workspace
+
+    def _measure(self, name, method):
+        with CaptureQueriesContext(connection) as queries:
+            start = perf_counter()
+            touched = method()
+            elapsed = perf_counter() - start
+        self.stdout.write(f'{name}: {elapsed:.3f}s, {len(queries)} statements')
+        for label, count in touched.items():
+            self.stdout.write(f'    {label}: {count} rows')
+        return len(queries)
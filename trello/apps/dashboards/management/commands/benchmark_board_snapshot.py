@@ -0,0 +1,84 @@
+from time import perf_counter
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+from trello.apps.accounts.models import User
+from trello.apps.dashboards.models import Attachment, Board, Comment, Label, Task, TaskList, WorkSpace
+from trello.apps.dashboards.permissions import user_work_spaces
+from trello.apps.dashboards.views.board_views import BoardModelViewSet
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the board snapshot endpoint on boards of growing size. All rows are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, nargs='+', default=[50, 500, 5_000])
+        parser.add_argument('--lists', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, cards, lists, repeat, **options):
+        view = BoardModelViewSet.as_view({'get': 'snapshot'})
+        query_counts = set()
+        with transaction.atomic():
+            owner = User.objects.create_user(email='benchmark-owner@example.com', password=None)
+            work_space = WorkSpace.objects.create(title='Benchmark', owner=owner)
+            # Measure with a warm acl cache, as a client opening boards would see it.
+            user_work_spaces(owner)
+            for size in cards:
+                board = self._generate(owner, work_space, size, lists)
+                timings = []
+                for _ in range(repeat):
+                    request = APIRequestFactory().get(f'/boards/{board.pk}/snapshot/')
+                    force_authenticate(request, user=owner)
+                    queries = []
+                    with connection.execute_wrapper(self._count(queries)):
+                        start = perf_counter()
+                        response = view(request, pk=board.pk).render()
+                        timings.append(perf_counter() - start)
+                    if response.status_code != 200:
+                        raise CommandError(f'Snapshot returned {response.status_code}')
+                    query_counts.add(len(queries))
+                self.stdout.write(
+                    f'{size} cards: best {min(timings) * 1000:.1f}ms, '
+                    f'mean {sum(timings) / repeat * 1000:.1f}ms, {len(queries)} queries, '
+                    f'{len(response.content) / 1024:.0f}KiB'
+                    )
+            transaction.set_rollback(True)
+        if len(query_counts) != 1:
+            raise CommandError(f'Query count depends on the board size: {sorted(query_counts)}')
+
+    def _generate(self, owner, work_space, size, lists):
+        board = Board.objects.create(title=f'Board {size}', work_space=work_space)
+        labels = Label.objects.bulk_create([Label(title=f'Label {i}', board=board) for i in range(5)])
+        task_lists = TaskList.objects.bulk_create(
+            [TaskList(title=f'List {i}', board=board) for i in range(lists)]
+            )
+        tasks = Task.objects.bulk_create(
+            [Task(title=f'Task {i}', description='', status=task_lists[i % lists], board=board,
+                  work_space=work_space, rank=f'{i:06d}') for i in range(size)],
+            batch_size=1_000,
+            )
+        Task.labels.through.objects.bulk_create(
+            [Task.labels.through(task=task, label=labels[i % len(labels)]) for i, task in enumerate(tasks)],
+            batch_size=1_000,
+            )
+        Task.assigned_to.through.objects.bulk_create(
+            [Task.assigned_to.through(task=task, user=owner) for task in tasks],
+            batch_size=1_000,
+            )
+        Comment.objects.bulk_create(
+            [Comment(body='...', task=task, author=owner, board=board, work_space=work_space) for task in tasks],
+            batch_size=1_000,
+            )
+        Attachment.objects.bulk_create(
+            [Attachment(task=task, owner=owner, board=board, work_space=work_space) for task in tasks[::2]],
+            batch_size=1_000,
+            )
+        TaskList.repair_tasks_count()
+        return board
+
+    def _count(self, queries):
+        def wrapper(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+        return wrapper
@@ -0,0 +1,77 @@
+from time import perf_counter
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from trello.apps.accounts.models import User
+from trello.apps.dashboards.models import Board, Label, Task, TaskList, WorkSpace
+from trello.apps.dashboards.serializers import BoardListSerializer, TaskListListSerializer, \
+    TaskModelListSerializer, UserListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the values() read path of list serializers against ModelSerializer. All rows are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, rows, repeat, **options):
+        context = {'request': APIRequestFactory().get('/')}
+        with transaction.atomic():
+            querysets = self._generate(rows)
+            for serializer_class, queryset in querysets.items():
+                model_serializer = lambda data: serializers.ListSerializer(
+                    child=serializer_class(), instance=data, context=context
+                    )
+                values_serializer = lambda data: serializer_class(data, many=True, context=context)
+                expected = JSONRenderer().render(model_serializer(queryset.all()).data)
+                if JSONRenderer().render(values_serializer(queryset.all()).data) != expected:
+                    raise CommandError(f'{serializer_class.__name__} renders differently')
+                loaded = list(queryset.prefetch_related(
+                    *[field for field in ('labels', 'assigned_to') if field in serializer_class.Meta.fields]
+                    ))
+                timings = {
+                    'model': self._time(lambda: model_serializer(queryset.all()).data, repeat),
+                    'values': self._time(lambda: values_serializer(queryset.all()).data, repeat),
+                    'model, loaded': self._time(lambda: model_serializer(loaded).data, repeat),
+                    'values, loaded': self._time(lambda: values_serializer(loaded).data, repeat),
+                }
+                self.stdout.write(f'{serializer_class.__name__} ({rows} rows):')
+                for name, best in timings.items():
+                    self.stdout.write(f'  {name}: {best * 1000:.1f}ms, {rows / best:,.0f} rows/s')
+            transaction.set_rollback(True)
+
+    def _generate(self, rows):
+        owner = User.objects.create_user(email='benchmark-owner@example.com', password=None)
+        User.objects.bulk_create(
+            [User(email=f'benchmark-{i}@example.com', first_name='First', last_name='Last') for i in range(rows)]
+            )
+        work_space = WorkSpace.objects.create(title='Benchmark', owner=owner)
+        boards = Board.objects.bulk_create([Board(title=f'Board {i}', work_space=work_space) for i in range(rows)])
+        board = boards[0]
+        labels = Label.objects.bulk_create([Label(title=f'Label {i}', board=board) for i in range(5)])
+        task_lists = TaskList.objects.bulk_create([TaskList(title=f'List {i}', board=board) for i in range(rows)])
+        tasks = Task.objects.bulk_create([
+            Task(title=f'Task {i}', description='...', status=task_lists[i], rank='i', board=board, work_space=work_space)
+            for i in range(rows)
+            ])
+        Task.labels.through.objects.bulk_create([
+            Task.labels.through(task=task, label=label) for task in tasks for label in labels[:2]
+            ])
+        Task.assigned_to.through.objects.bulk_create([Task.assigned_to.through(task=task, user=owner) for task in tasks])
+        return {
+            UserListSerializer: User.objects.filter(email__startswith='benchmark-').order_by('email'),
+            BoardListSerializer: Board.objects.filter(work_space=work_space),
+            TaskListListSerializer: TaskList.objects.filter(board=board),
+            TaskModelListSerializer: Task.objects.filter(board=board),
+        }
+
+    def _time(self, serialize, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            serialize()
+            timings.append(perf_counter() - start)
+        return min(timings)
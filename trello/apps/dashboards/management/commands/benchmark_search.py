@@ -0,0 +1,76 @@
+import random
+from itertools import accumulate
+from time import perf_counter
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+from trello.apps.accounts.models import User
+from trello.apps.dashboards.models import Board, Comment, SearchEntry, Task, TaskList, WorkSpace
+from trello.apps.dashboards.permissions import user_work_spaces
+from trello.apps.dashboards.search import search
+from trello.apps.dashboards.views.search_views import SearchView
+
+
+class Command(BaseCommand):
+    help = 'Benchmark full-text search against LIKE scans over many comments. All rows are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--words', type=int, default=20_000, help='Size of the vocabulary of the comments.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, comments, words, repeat, **options):
+        random.seed(0)
+        # Zipf-like frequencies, as in natural text: the first words are common.
+        vocabulary = [f'word{index}' for index in range(words)]
+        weights = list(accumulate(1 / (rank + 1) for rank in range(words)))
+        view = SearchView.as_view()
+        with transaction.atomic():
+            owner = User.objects.create_user(email='benchmark-owner@example.com', password=None)
+            work_space = WorkSpace.objects.create(title='Benchmark', owner=owner)
+            board = Board.objects.create(title='Benchmark', work_space=work_space)
+            user_work_spaces(owner)
+            start = perf_counter()
+            self._generate(owner, board, comments, vocabulary, weights)
+            self.stdout.write(f'{comments} comments created in {perf_counter() - start:.1f}s')
+            start = perf_counter()
+            SearchEntry.index_queryset(Comment.objects.filter(board=board))
+            self.stdout.write(f'indexed in {perf_counter() - start:.1f}s')
+            queries = {
+                'common word': vocabulary[0],
+                'rare word': vocabulary[-1],
+                'two words': f'{vocabulary[1]} {vocabulary[50]}',
+                'prefix': vocabulary[123][:-1],
+            }
+            for label, query in queries.items():
+                timings = []
+                for _ in range(repeat):
+                    request = APIRequestFactory().get('/dashboards/search/', {'q': query})
+                    force_authenticate(request, user=owner)
+                    start = perf_counter()
+                    response = view(request).render()
+                    timings.append(perf_counter() - start)
+                    if response.status_code != 200:
+                        raise CommandError(f'Search for {query!r} returned {response.status_code}')
+                matches = search(SearchEntry.objects.all(), query).count()
+                scan = perf_counter()
+                Comment.objects.filter(work_space=work_space, body__icontains=query.split()[0]).order_by(
+                    '-create_at'
+                    )[:20].count()
+                scan = perf_counter() - scan
+                self.stdout.write(
+                    f'{label}: {matches} matches, best {min(timings) * 1000:.1f}ms, '
+                    f'mean {sum(timings) / repeat * 1000:.1f}ms; LIKE scan {scan * 1000:.1f}ms'
+                    )
+            transaction.set_rollback(True)
+
+    def _generate(self, owner, board, size, vocabulary, weights):
+        task_list = TaskList.objects.create(title='List', board=board)
+        tasks = [Task.objects.create(title=f'Task {index}', status=task_list) for index in range(100)]
+        for index in range(0, size, 10_000):
+            Comment.objects.bulk_create(
+                [Comment(body=' '.join(random.choices(vocabulary, cum_weights=weights, k=12)), task=task,
+                         author=owner, board=board, work_space=board.work_space)
+                 for task in random.choices(tasks, k=min(10_000, size - index))],
+                batch_size=5_000,
+                )
@@ -0,0 +1,74 @@
+from time import perf_counter
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+from trello.apps.accounts.models import User
+from trello.apps.dashboards import fragments
+from trello.apps.dashboards.models import Activity, Attachment, Board, Comment, Label, Task, TaskList, WorkSpace
+from trello.apps.dashboards.permissions import user_work_spaces
+from trello.apps.dashboards.views.task_views import TaskViewSet
+
+
+class Command(BaseCommand):
+    help = 'Benchmark full and sparse task payloads. All rows are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--related', type=int, default=200, help='Comments, attachments and activities per task.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--fields', default='id,title,order')
+
+    def handle(self, *args, related, repeat, fields, **options):
+        view = TaskViewSet.as_view({'get': 'retrieve'})
+        variants = {'full': {}, 'sparse': {'fields': fields}, 'expand': {'fields': fields, 'expand': 'obj_labels'}}
+        with transaction.atomic():
+            owner = User.objects.create_user(email='benchmark-owner@example.com', password=None)
+            task = self._generate(owner, related)
+            user_work_spaces(owner)
+            url = f'/dashboards/tasks/{task.pk}/'
+            for name, params in variants.items():
+                timings = []
+                for _ in range(repeat):
+                    # Measure building the payload, not serving it from the fragment cache.
+                    caches[fragments.FRAGMENT_CACHE_ALIAS].clear()
+                    request = APIRequestFactory().get(url, params)
+                    force_authenticate(request, user=owner)
+                    queries = []
+                    with connection.execute_wrapper(self._count(queries)):
+                        start = perf_counter()
+                        response = view(request, pk=task.pk).render()
+                        timings.append(perf_counter() - start)
+                    if response.status_code != 200:
+                        raise CommandError(f'{name} returned {response.status_code}')
+                self.stdout.write(
+                    f'{name}: best {min(timings) * 1000:.1f}ms, mean {sum(timings) / repeat * 1000:.1f}ms, '
+                    f'{len(queries)} queries, {len(response.content)} bytes'
+                    )
+            transaction.set_rollback(True)
+
+    def _generate(self, owner, related):
+        work_space = WorkSpace.objects.create(title='Benchmark', owner=owner)
+        board = Board.objects.create(title='Benchmark', work_space=work_space)
+        task = Task.objects.create(
+            title='Task', description='...' * 1000, status=TaskList.objects.create(title='List', board=board)
+            )
+        task.labels.add(*Label.objects.bulk_create([Label(title=f'Label {i}', board=board) for i in range(10)]))
+        task.assigned_to.add(owner)
+        Comment.objects.bulk_create(
+            [Comment(body='...' * 100, task=task, author=owner, board=board, work_space=work_space)
+             for _ in range(related)]
+            )
+        Attachment.objects.bulk_create(
+            [Attachment(task=task, owner=owner, board=board, work_space=work_space) for _ in range(related)]
+            )
+        Activity.objects.bulk_create(
+            [Activity(task=task, doer=owner, message='...', board=board, work_space=work_space)
+             for _ in range(related)]
+            )
+        return task
+
+    def _count(self, queries):
+        def wrapper(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+        return wrapper
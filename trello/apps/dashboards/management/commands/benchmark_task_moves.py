@@ -0,0 +1,81 @@
+import random
+from time import perf_counter
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from trello.apps.accounts.models import User
+from trello.apps.dashboards.models import Board, Task, WorkSpace
+
+
+class Command(BaseCommand):
+    help = 'Benchmark random task moves and check how many task rows each move writes. All rows are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1_000)
+        parser.add_argument('--lists', type=int, default=4)
+        parser.add_argument('--moves', type=int, default=10_000)
+        parser.add_argument('--appends', type=int, default=1_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, tasks, lists, moves, appends, seed, **options):
+        rng = random.Random(seed)
+        with transaction.atomic():
+            owner = User.objects.create_user(email='benchmark-owner@example.com', password=None)
+            board = Board.objects.create(
+                title='Benchmark', work_space=WorkSpace.objects.create(title='Benchmark', owner=owner)
+                )
+            task_lists = [board.add_tasklist(f'List {i}') for i in range(lists)]
+            task_objs = [
+                Task.objects.create(title=f'Task {i}', description='', status=task_lists[i % lists])
+                for i in range(tasks)
+                ]
+            writes, rebalances, rebalanced_rows, elapsed = [], 0, 0, 0.0
+            for _ in range(moves):
+                task, neighbour = rng.sample(task_objs, 2)
+                neighbour.refresh_from_db(fields=['rank', 'status'])
+                place = {'before': neighbour} if rng.random() < 0.5 else {'after': neighbour}
+                rows = []
+                with connection.execute_wrapper(self._task_writes(rows)):
+                    start = perf_counter()
+                    task.move(doer=owner, **place)
+                    elapsed += perf_counter() - start
+                if sum(rows) > 1:
+                    rebalances += 1
+                    rebalanced_rows += sum(rows)
+                else:
+                    writes.append(sum(rows))
+            append_rows, append_rebalances, append_rebalanced_rows = 0, 0, 0
+            for i in range(appends):
+                rows = []
+                with connection.execute_wrapper(self._task_writes(rows)):
+                    Task.create_task(doer=owner, title=f'Appended {i}', status=task_lists[0])
+                if len(rows) > 1:
+                    append_rebalances += 1
+                    append_rebalanced_rows += sum(rows[1:])
+                append_rows += rows[0]
+            key_length = max(len(rank) for rank in Task.objects.filter(status__board=board).values_list('rank', flat=True))
+            transaction.set_rollback(True)
+        self.stdout.write(
+            f'{moves} moves in {elapsed:.2f}s ({elapsed / moves * 1000:.2f}ms per move), '
+            f'{rebalances} rebalances rewriting {rebalanced_rows} rows, longest rank {key_length}'
+            )
+        self.stdout.write(f'task rows written per move: max {max(writes)}, total {sum(writes)}')
+        self.stdout.write(
+            f'{appends} appends: {append_rows} rows inserted, '
+            f'{append_rebalances} rebalances rewriting {append_rebalanced_rows} rows'
+            )
+        if max(writes) != 1:
+            raise CommandError('A move without rebalance wrote more than one task row')
+
+    def _task_writes(self, rows):
+        """
+        Collects the number of task rows each INSERT or UPDATE statement wrote,
+        so a bulk update of a rebalance counts every row it rewrote.
+        """
+        prefixes = (f'INSERT INTO "{Task._meta.db_table}"', f'UPDATE "{Task._meta.db_table}"')
+
+        def wrapper(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if sql.startswith(prefixes):
+                rows.append(context['cursor'].rowcount)
+            return result
+        return wrapper
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from trello.apps.dashboards.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = 'Delete upload sessions that received no chunk for a day, with their partial files.'
+
+    def handle(self, *args, **options):
+        purged = UploadSession.purge_expired()
+        self.stdout.write(f'purged {purged} upload sessions')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from trello.apps.dashboards.models import TaskList
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored task counters of task lists that drifted from the real count.'
+
+    def handle(self, *args, **options):
+        repaired = TaskList.repair_tasks_count()
+        self.stdout.write(f'repaired {repaired} task list counters')
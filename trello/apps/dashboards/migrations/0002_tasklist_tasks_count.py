@@ -0,0 +1,30 @@
+# Generated by Django 4.2.3 on 2026-10-18 08:28
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_tasks_count(apps, schema_editor):
+    TaskList = apps.get_model('dashboards', 'TaskList')
+    Task = apps.get_model('dashboards', 'Task')
+    active_tasks = Task.objects.filter(
+        status=OuterRef('pk'), is_active=True
+        ).order_by().values('status').annotate(count=Count('pk')).values('count')
+    TaskList.objects.update(tasks_count=Coalesce(Subquery(active_tasks), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasklist',
+            name='tasks_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of active tasks in the Tasklist', verbose_name='Tasks count'),
+        ),
+        migrations.RunPython(populate_tasks_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.3 on 2026-10-18 08:31
+
+from django.db import migrations, models
+from string import ascii_lowercase, digits
+
+DIGITS = digits + ascii_lowercase
+
+
+def spread_keys(count):
+    width = 1
+    while len(DIGITS) ** width <= count:
+        width += 1
+    step = len(DIGITS) ** width // (count + 1)
+    keys = []
+    for position in range(1, count + 1):
+        value = step * position
+        key = ''
+        for _ in range(width):
+            value, digit = divmod(value, len(DIGITS))
+            key = DIGITS[digit] + key
+        keys.append(key.rstrip(DIGITS[0]))
+    return keys
+
+
+def populate_rank(apps, schema_editor):
+    TaskList = apps.get_model('dashboards', 'TaskList')
+    Task = apps.get_model('dashboards', 'Task')
+    for status_id in TaskList.objects.values_list('pk', flat=True).iterator():
+        tasks = list(
+            Task.objects.filter(status_id=status_id)
+            .order_by('order', 'create_at').only('id', 'rank')
+            )
+        for task, rank in zip(tasks, spread_keys(len(tasks))):
+            task.rank = rank
+        Task.objects.bulk_update(tasks, ['rank'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0002_tasklist_tasks_count'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['rank'], 'verbose_name': 'Task', 'verbose_name_plural': 'Tasks'},
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='rank',
+            field=models.CharField(default='', editable=False, help_text='Sortable position of the task in its task list', max_length=32, verbose_name='Rank'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'rank'], name='dashboards__status__a78e24_idx'),
+        ),
+        migrations.RunPython(populate_rank, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,141 @@
+# Generated by Django 4.2.3 on 2026-10-18 08:39
+
+from collections import defaultdict
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+BACKFILL_CHUNK_SIZE = 2000
+
+# Legacy messages carry titles, dates and user names but no ids: payloads get
+# the keys of live writes that can be recovered from them. Task lists and users
+# are resolved to pks by title and name within the board or workspace of the
+# task, when exactly one matches; comment and attachment ids are left out.
+MESSAGE_PATTERNS = [
+    ('task_created', re.compile(r"^Task '(?P<title>.*)' was created\.$", re.S)),
+    ('task_created', re.compile(r"created a new task")),
+    ('task_title_changed', re.compile(r"^Task title was changed to (?P<title>.*)\.$", re.S)),
+    ('task_description_changed', re.compile(r"^Task description was changed\.$")),
+    ('task_status_changed', re.compile(r"^Task status was changed to (?P<title>.*)\.$", re.S)),
+    ('task_start_date_changed', re.compile(r"^Task start date was changed to (?P<date>.*)\.$")),
+    ('task_end_date_changed', re.compile(r"^Task end date was changed to (?P<date>.*)\.$")),
+    ('task_assigned', re.compile(r"^Task assined to (?P<user>.*)\.$")),
+    ('task_unassigned', re.compile(r"^(?P<user>.*) removed from task assigness\.$")),
+    ('comment_replied', re.compile(r" replied to a comment on task ")),
+    ('comment_created', re.compile(r" added a new comment on task ")),
+    ('comment_updated', re.compile(r" updated a comment on task ")),
+    ('comment_deleted', re.compile(r" deleted a comment on task ")),
+    ('attachment_created', re.compile(r" attached a new file\.$")),
+    ('attachment_deleted', re.compile(r" deleted a attachment on task ")),
+]
+
+
+def parse_message(message):
+    for event_type, pattern in MESSAGE_PATTERNS:
+        if match := pattern.search(message):
+            return event_type, match.groupdict()
+    return 'other', {}
+
+
+def display_name(first_name, last_name, email):
+    return f'{first_name} {last_name}'.strip() or email
+
+
+def unique_matches(rows):
+    """
+    Maps (scope, name) to the pk of the only row with that name in its scope.
+    """
+    matches = defaultdict(set)
+    for scope, name, pk in rows:
+        matches[scope, name].add(pk)
+    return {key: str(pks.pop()) for key, pks in matches.items() if len(pks) == 1}
+
+
+def resolve_payloads(apps, parsed):
+    """
+    Turns the titles of task lists and the names of users in the parsed
+    payloads into the pks live writes store, and drops what does not resolve.
+    """
+    TaskList = apps.get_model('dashboards', 'TaskList')
+    WorkSpace = apps.get_model('dashboards', 'WorkSpace')
+    User = apps.get_model('accounts', 'User')
+    board_ids = {board_id for event_type, payload, board_id, work_space_id in parsed if 'title' in payload}
+    statuses = unique_matches(TaskList.objects.filter(board__in=board_ids).values_list('board', 'title', 'pk'))
+    work_space_ids = {work_space_id for event_type, payload, board_id, work_space_id in parsed if 'user' in payload}
+    people = defaultdict(set)
+    for pk, owner_id in WorkSpace.objects.filter(pk__in=work_space_ids).values_list('pk', 'owner'):
+        people[pk].add(owner_id)
+    for pk, user_id in WorkSpace.members.through.objects.filter(
+        workspace__in=work_space_ids
+        ).values_list('workspace', 'user'):
+        people[pk].add(user_id)
+    names = {
+        pk: display_name(first_name, last_name, email)
+        for pk, first_name, last_name, email in User.objects.filter(
+            pk__in=set().union(*people.values())
+            ).values_list('pk', 'first_name', 'last_name', 'email')
+        }
+    users = unique_matches(
+        (work_space_id, names[user_id], user_id)
+        for work_space_id, user_ids in people.items() for user_id in user_ids if user_id in names
+        )
+    payloads = []
+    for event_type, payload, board_id, work_space_id in parsed:
+        if event_type == 'task_status_changed' and (board_id, payload['title']) in statuses:
+            payload = {'status': statuses[board_id, payload['title']], 'title': payload['title']}
+        elif 'user' in payload:
+            user = users.get((work_space_id, payload['user']))
+            payload = {'user': user} if user else {}
+        payloads.append((event_type, payload))
+    return payloads
+
+
+def backfill_event_type(apps, schema_editor):
+    Activity = apps.get_model('dashboards', 'Activity')
+    last_pk = None
+    while True:
+        chunk = Activity.objects.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        rows = list(chunk.values_list(
+            'pk', 'message', 'task__status__board', 'task__status__board__work_space'
+            )[:BACKFILL_CHUNK_SIZE])
+        if not rows:
+            break
+        parsed = [(*parse_message(message), board_id, work_space_id) for pk, message, board_id, work_space_id in rows]
+        activities = [
+            Activity(pk=row[0], event_type=event_type, payload=payload, board_id=row[2])
+            for row, (event_type, payload) in zip(rows, resolve_payloads(apps, parsed))
+            ]
+        Activity.objects.bulk_update(activities, ['event_type', 'payload', 'board'])
+        last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0003_task_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='board',
+            field=models.ForeignKey(editable=False, help_text='Board of the task when the activity happened', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='board_activity', to='dashboards.board', verbose_name='Board'),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='event_type',
+            field=models.CharField(choices=[('other', 'Other'), ('task_created', 'Task created'), ('task_title_changed', 'Task title changed'), ('task_description_changed', 'Task description changed'), ('task_status_changed', 'Task status changed'), ('task_start_date_changed', 'Task start date changed'), ('task_end_date_changed', 'Task end date changed'), ('task_assigned', 'Task assigned'), ('task_unassigned', 'Task unassigned'), ('comment_created', 'Comment created'), ('comment_replied', 'Comment replied'), ('comment_updated', 'Comment updated'), ('comment_deleted', 'Comment deleted'), ('attachment_created', 'Attachment created'), ('attachment_deleted', 'Attachment deleted')], default='other', help_text='Type of the activity', max_length=32, verbose_name='Event type'),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict, help_text='Structured details of the activity', verbose_name='Payload'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['board', 'event_type', 'create_at'], name='dashboards__board_i_8bd717_idx'),
+        ),
+        migrations.RunPython(backfill_event_type, migrations.RunPython.noop),
+    ]
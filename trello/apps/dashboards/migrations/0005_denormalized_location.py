@@ -0,0 +1,88 @@
+# Generated by Django 4.2.3 on 2026-10-18 08:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_location(apps, schema_editor):
+    TaskList = apps.get_model('dashboards', 'TaskList')
+    Task = apps.get_model('dashboards', 'Task')
+    task_lists = TaskList.objects.filter(pk=OuterRef('status'))
+    Task.objects.update(
+        board=Subquery(task_lists.values('board')[:1]),
+        work_space=Subquery(task_lists.values('board__work_space')[:1]),
+        )
+    tasks = Task.objects.filter(pk=OuterRef('task'))
+    for model_name in ('Comment', 'Attachment', 'Activity'):
+        apps.get_model('dashboards', model_name).objects.update(
+            board=Subquery(tasks.values('board')[:1]),
+            work_space=Subquery(tasks.values('work_space')[:1]),
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0004_activity_event_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='work_space',
+            field=models.ForeignKey(editable=False, help_text='Work space of the task of the activity', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='work_space_activity', to='dashboards.workspace', verbose_name='Workspace'),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='board',
+            field=models.ForeignKey(editable=False, help_text='Board of the task of the attachment', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='board_attachments', to='dashboards.board', verbose_name='Board'),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='work_space',
+            field=models.ForeignKey(editable=False, help_text='Work space of the task of the attachment', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='work_space_attachments', to='dashboards.workspace', verbose_name='Workspace'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='board',
+            field=models.ForeignKey(editable=False, help_text='Board of the task of the comment', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='board_comments', to='dashboards.board', verbose_name='Board'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='work_space',
+            field=models.ForeignKey(editable=False, help_text='Work space of the task of the comment', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='work_space_comments', to='dashboards.workspace', verbose_name='Workspace'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='board',
+            field=models.ForeignKey(editable=False, help_text='Board of the task list of the task', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='board_tasks', to='dashboards.board', verbose_name='Board'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='work_space',
+            field=models.ForeignKey(editable=False, help_text='Work space of the board of the task', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='work_space_tasks', to='dashboards.workspace', verbose_name='Workspace'),
+        ),
+        migrations.AlterField(
+            model_name='activity',
+            name='board',
+            field=models.ForeignKey(editable=False, help_text='Board of the task of the activity', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='board_activity', to='dashboards.board', verbose_name='Board'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['board', 'create_at'], name='dashboards__board_i_298ea2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['doer', 'board'], name='dashboards__doer_id_f9adea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(fields=['board', 'owner'], name='dashboards__board_i_f0b057_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['board', 'author'], name='dashboards__board_i_f66f32_idx'),
+        ),
+        migrations.RunPython(backfill_location, migrations.RunPython.noop),
+    ]
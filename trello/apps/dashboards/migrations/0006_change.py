@@ -0,0 +1,32 @@
+# Generated by Django 4.2.3 on 2026-10-18 12:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0005_denormalized_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(help_text='Model name of the changed object', max_length=32, verbose_name='Model')),
+                ('object_id', models.UUIDField(help_text='Id of the changed object', verbose_name='Object id')),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('archived', 'Archived'), ('restored', 'Restored'), ('deleted', 'Deleted')], help_text='What happened to the object', max_length=16, verbose_name='Action')),
+                ('create_at', models.DateTimeField(auto_now_add=True, verbose_name='Create at')),
+                ('board', models.ForeignKey(db_constraint=False, help_text='Board of the changed object', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='board_changes', to='dashboards.board', verbose_name='Board')),
+                ('work_space', models.ForeignKey(db_constraint=False, help_text='Work space of the changed object', on_delete=django.db.models.deletion.DO_NOTHING, related_name='work_space_changes', to='dashboards.workspace', verbose_name='Workspace')),
+            ],
+            options={
+                'verbose_name': 'Change',
+                'verbose_name_plural': 'Changes',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['work_space', 'id'], name='dashboards__work_sp_2f8bbd_idx'), models.Index(fields=['board', 'id'], name='dashboards__board_i_65e9e2_idx')],
+            },
+        ),
+    ]
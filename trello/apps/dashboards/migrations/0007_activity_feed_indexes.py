@@ -0,0 +1,41 @@
+# Generated by Django 4.2.3 on 2026-10-18 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0006_change'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='activity',
+            name='dashboards__board_i_8bd717_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='activity',
+            name='dashboards__board_i_298ea2_idx',
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['board', 'event_type', 'create_at', 'id'], name='dashboards__board_i_cdf96a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['board', 'create_at', 'id'], name='dashboards__board_i_b611c5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['task', 'create_at', 'id'], name='dashboards__task_id_349b76_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['work_space', 'create_at', 'id'], name='dashboards__work_sp_0e0879_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['doer', 'create_at', 'id'], name='dashboards__doer_id_5b7845_idx'),
+        ),
+    ]
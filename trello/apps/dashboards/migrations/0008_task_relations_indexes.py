@@ -0,0 +1,21 @@
+# Generated by Django 4.2.3 on 2026-10-18 09:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0007_activity_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(fields=['task', 'create_at', 'id'], name='dashboards__task_id_106335_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['task', 'create_at', 'id'], name='dashboards__task_id_660367_idx'),
+        ),
+    ]
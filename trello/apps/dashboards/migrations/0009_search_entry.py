@@ -0,0 +1,105 @@
+# Generated by Django 4.2.3 on 2026-10-18 09:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+import os
+
+SQLITE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE dashboards_searchentry_fts USING fts5(
+        title, body, content='dashboards_searchentry', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER dashboards_searchentry_fts_insert AFTER INSERT ON dashboards_searchentry BEGIN
+        INSERT INTO dashboards_searchentry_fts (rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER dashboards_searchentry_fts_delete AFTER DELETE ON dashboards_searchentry BEGIN
+        INSERT INTO dashboards_searchentry_fts (dashboards_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER dashboards_searchentry_fts_update AFTER UPDATE OF title, body ON dashboards_searchentry BEGIN
+        INSERT INTO dashboards_searchentry_fts (dashboards_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO dashboards_searchentry_fts (rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+SQLITE_DROP_INDEX = ['DROP TABLE dashboards_searchentry_fts']
+
+POSTGRES_INDEX = [
+    """
+    ALTER TABLE dashboards_searchentry ADD COLUMN document tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', body), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX dashboards_searchentry_document ON dashboards_searchentry USING GIN (document)',
+]
+
+POSTGRES_DROP_INDEX = ['ALTER TABLE dashboards_searchentry DROP COLUMN document']
+
+
+def create_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_INDEX, 'postgresql': POSTGRES_INDEX}
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_DROP_INDEX, 'postgresql': POSTGRES_DROP_INDEX}
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def backfill_entries(apps, schema_editor):
+    SearchEntry = apps.get_model('dashboards', 'SearchEntry')
+    documents = {
+        'Task': lambda task: (task.pk, task.title, task.description),
+        'Comment': lambda comment: (comment.task_id, '', comment.body),
+        'Attachment': lambda attachment: (attachment.task_id, os.path.basename(attachment.file.name or ''), ''),
+    }
+    for model_name, document in documents.items():
+        model = apps.get_model('dashboards', model_name)
+        entries = []
+        for instance in model.objects.filter(is_active=True).iterator(chunk_size=1000):
+            task_id, title, body = document(instance)
+            entries.append(SearchEntry(
+                model=model_name.lower(), object_id=instance.pk, task_id=task_id, title=title[:300], body=body
+                ))
+            if len(entries) == 1000:
+                SearchEntry.objects.bulk_create(entries)
+                entries = []
+        SearchEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0008_task_relations_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(help_text='Model name of the indexed object', max_length=32, verbose_name='Model')),
+                ('object_id', models.UUIDField(help_text='Id of the indexed object', unique=True, verbose_name='Object id')),
+                ('title', models.CharField(blank=True, help_text='Indexed title of the object', max_length=300, verbose_name='Title')),
+                ('body', models.TextField(blank=True, help_text='Indexed body of the object', verbose_name='Body')),
+                ('task', models.ForeignKey(help_text='The indexed task, or the task of the indexed object', on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='dashboards.task', verbose_name='Task')),
+            ],
+            options={
+                'verbose_name': 'Search entry',
+                'verbose_name_plural': 'Search entries',
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+        migrations.RunPython(backfill_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.3 on 2026-10-18 10:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+MAX_DEPTH = 8
+PATH_STEP = 16
+
+
+def backfill_threads(apps, schema_editor):
+    Comment = apps.get_model('dashboards', 'Comment')
+    comments = {
+        pk: (parent_id, create_at)
+        for pk, parent_id, create_at in Comment.objects.values_list('id', 'parent_id', 'create_at').iterator()
+    }
+    placed = {}
+
+    def place(pk):
+        # Parents are placed before their replies, without recursing down deep threads.
+        pending = [pk]
+        while pending[-1] not in placed:
+            parent_id = comments[pending[-1]][0]
+            if parent_id is None or parent_id in placed:
+                pk = pending.pop()
+                step = f'{int(comments[pk][1].timestamp() * 1_000_000):013x}{pk.hex[:PATH_STEP - 13]}'
+                if parent_id is None:
+                    placed[pk] = (pk, 0, step)
+                else:
+                    thread_id, depth, path = placed[parent_id]
+                    placed[pk] = (thread_id, depth + 1, path[:(MAX_DEPTH - 1) * PATH_STEP] + step)
+                if not pending:
+                    break
+            else:
+                pending.append(parent_id)
+
+    updates = []
+    for pk in comments:
+        place(pk)
+        thread_id, depth, path = placed[pk]
+        updates.append(Comment(id=pk, thread_id=thread_id, depth=depth, path=path))
+        if len(updates) == 1000:
+            Comment.objects.bulk_update(updates, ['thread', 'depth', 'path'])
+            updates = []
+    Comment.objects.bulk_update(updates, ['thread', 'depth', 'path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0009_search_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Number of comments above the comment in its thread', verbose_name='Depth'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, help_text='Path of the comment in its thread, in reading order', max_length=128, verbose_name='Path'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='thread',
+            field=models.ForeignKey(editable=False, help_text='Top-level comment of the thread of the comment', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='thread_comments', to='dashboards.comment', verbose_name='Thread'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['thread', 'path'], name='dashboards__thread__c88bb2_idx'),
+        ),
+        migrations.RunPython(backfill_threads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.3 on 2026-10-18 10:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('dashboards', '0010_comment_thread'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('create_at', models.DateTimeField(auto_now_add=True, verbose_name='Create at')),
+                ('update_at', models.DateTimeField(auto_now=True, verbose_name='Update at')),
+                ('filename', models.CharField(help_text='Name of the uploaded file', max_length=100, verbose_name='Filename')),
+                ('size', models.BigIntegerField(help_text='Size of the uploaded file in bytes', verbose_name='Size')),
+                ('checksum', models.CharField(help_text='SHA-256 hex digest of the uploaded file', max_length=64, verbose_name='Checksum')),
+                ('received', models.BigIntegerField(default=0, help_text='Bytes received from the start of the file', verbose_name='Received')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='Owner')),
+                ('task', models.ForeignKey(help_text='Task the uploaded file is attached to', on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='dashboards.task', verbose_name='Task')),
+            ],
+            options={
+                'verbose_name': 'Upload session',
+                'verbose_name_plural': 'Upload sessions',
+                'indexes': [models.Index(fields=['update_at'], name='dashboards__update__c1a154_idx')],
+            },
+        ),
+    ]
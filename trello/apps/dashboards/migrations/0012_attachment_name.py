@@ -0,0 +1,32 @@
+# Generated by Django 4.2.3 on 2026-10-18 10:49
+
+from django.db import migrations, models
+import os
+
+
+def backfill_names(apps, schema_editor):
+    Attachment = apps.get_model('dashboards', 'Attachment')
+    attachments = []
+    for attachment in Attachment.objects.exclude(file='').only('file').iterator(chunk_size=1000):
+        attachment.name = os.path.basename(attachment.file.name)[:255]
+        attachments.append(attachment)
+        if len(attachments) == 1000:
+            Attachment.objects.bulk_update(attachments, ['name'])
+            attachments = []
+    Attachment.objects.bulk_update(attachments, ['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0011_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='name',
+            field=models.CharField(blank=True, editable=False, help_text='Name of the file as it was uploaded', max_length=255, verbose_name='Name'),
+        ),
+        migrations.RunPython(backfill_names, migrations.RunPython.noop),
+    ]
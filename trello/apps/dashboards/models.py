@@ -1,10 +1,34 @@
+import os
+from collections import defaultdict
+from datetime import timedelta
+from contextlib import nullcontext
+from contextvars import ContextVar
 from django.conf import settings
-from django.db import models
+from django.contrib.auth import get_user_model
+from django.db import connections, models, transaction
+from django.db.models import Case, Count, F, OuterRef, Prefetch, Subquery, UUIDField, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest, NullIf, Replace
 from trello.apps.core.models import BaseModel, SoftDeleteMixin
 from django.db.models.query import QuerySet
 from django.utils.translation import gettext as _
-from django.core.exceptions import ValidationError
+from django.core.exceptions import EmptyResultSet, ValidationError
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from . import fragments, live, uploads
+from .acl import invalidate_work_spaces
+from .events import ChangeAction, EventType, parse_message
+from .ranks import RANK_MAX_LENGTH, RANK_REBALANCE_LENGTH, key_between, keys_between, spread_keys
+
+# Comments, attachments and activities embedded in a task; the rest are paginated.
+TASK_RECENT_LIMIT = 10
+# Levels of a comment thread, the top-level comment included.
+COMMENT_MAX_DEPTH = 8
+# Characters each level adds to the path of a comment.
+COMMENT_PATH_STEP = 16
+# Advisory lock class of the per work space locks that order the commits of change log entries.
+CHANGE_LOG_LOCK = 0x63686e67
+# Time after its last chunk an unfinished upload session is purged.
+UPLOAD_SESSION_TTL = timedelta(days=1)
 
 class WorkSpace(BaseModel, SoftDeleteMixin):
     title = models.CharField(
@@ -26,6 +50,8 @@ class WorkSpace(BaseModel, SoftDeleteMixin):
         related_name='owner_work_spaces'
         )
 
+    soft_delete_cascade = ('work_space_boards',)
+
     class Meta:
         verbose_name = _("WorkSpace")
         verbose_name_plural = _("WorkSpaces")
@@ -34,6 +60,24 @@ class WorkSpace(BaseModel, SoftDeleteMixin):
     def __str__(self) -> str:
         return f'{self.title} - owned by {self.owner}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_access = (instance.__dict__.get('owner_id'), instance.__dict__.get('is_active'))
+        return instance
+
+    @classmethod
+    def pre_soft_delete(cls, queryset, is_active: bool) -> None:
+        """
+        Drops the cached workspaces of the owners and members of the archived
+        or restored workspaces.
+        """
+        invalidate_work_spaces(
+            user_id
+            for users in queryset.values_list('owner', 'members')
+            for user_id in users
+            )
+
     def add_member(self, member):
         """
         Add new member to the work space.
@@ -70,34 +114,6 @@ class WorkSpace(BaseModel, SoftDeleteMixin):
         """
         return self.members.all()
     
-    def archive(self) -> None:
-        board_qs = self.work_space_boards.all()
-        list_qs = TaskList.objects.filter(
-            board__in = board_qs
-            )
-        task_qs = Task.objects.filter(
-            status__in = list_qs
-            )
-        task_qs.archive()
-        list_qs.archive()
-        board_qs.archive()
-        return super().archive()
-    
-    def restore(self) -> None:
-        board_qs = self.work_space_boards(
-            manager = 'original_objects'
-            ).all()
-        list_qs = TaskList.original_objects.filter(
-            board__in = board_qs
-            )
-        task_qs = Task.original_objects.filter(
-            status__in = list_qs
-            )
-        task_qs.restore()
-        list_qs.restore()
-        board_qs.restore()
-        return super().restore()
-
     def clean(self) -> None:
         """
         check wether the owner is in members list.
@@ -126,6 +142,8 @@ class Board(BaseModel, SoftDeleteMixin):
         default='uploads/backgrounds/default_background.jpg'
         )
 
+    soft_delete_cascade = ('board_Tasklists',)
+
     class Meta:
         verbose_name = _("Board")
         verbose_name_plural = _("Boards")
@@ -134,6 +152,50 @@ class Board(BaseModel, SoftDeleteMixin):
     def __str__(self) -> str:
         return f'{self.title} - related work space: {self.work_space}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_work_space_id = instance.__dict__.get('work_space_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the board and moves everything on it along when its work space changes.
+        """
+        previous_work_space_id = getattr(self, '_loaded_work_space_id', None)
+        relocated = previous_work_space_id not in (None, self.work_space_id)
+        with transaction.atomic() if relocated else nullcontext():
+            super().save(*args, **kwargs)
+            if relocated:
+                _relocate(
+                    {model: {'board': self} for model in (Task, Comment, Attachment, Activity)},
+                    work_space_id=self.work_space_id,
+                    )
+                for model in (TaskList, Label):
+                    Change.record_queryset(model._base_manager.filter(board=self), ChangeAction.UPDATED)
+        self._loaded_work_space_id = self.work_space_id
+
+    def load_snapshot(self) -> 'Board':
+        """
+        Prefetches the task lists, their ordered tasks with labels, assignees and
+        comment/attachment counts, and the labels of the board.
+        The number of queries does not depend on the size of the board.
+        """
+        tasks = Task.objects.annotate(
+            comments_count=_count_per_task(Comment),
+            attachments_count=_count_per_task(Attachment),
+            ).order_by('rank')
+        assignees = get_user_model().objects.only('id', 'first_name', 'last_name', 'email', 'avatar')
+        models.prefetch_related_objects(
+            [self],
+            Prefetch('board_Tasklists', queryset=TaskList.objects.order_by('create_at')),
+            Prefetch('board_Tasklists__status_tasks', queryset=tasks),
+            'board_Tasklists__status_tasks__labels',
+            Prefetch('board_Tasklists__status_tasks__assigned_to', queryset=assignees),
+            'board_labels',
+            )
+        return self
+
     def add_tasklist(self, title: str) -> QuerySet:
         """
         Add new task list to the board.
@@ -159,26 +221,6 @@ class Board(BaseModel, SoftDeleteMixin):
             board=self
             )
 
-    def archive(self) -> None:
-        list_qs = self.board_Tasklists.all()
-        task_qs = Task.objects.filter(
-            status__in = list_qs
-            )
-        task_qs.archive()
-        list_qs.archive()
-        return super().archive()
-    
-    def restore(self) -> None:
-        list_qs = self.board_Tasklists(
-            manager = 'original_objects'
-            ).all()
-        task_qs = Task.original_objects.filter(
-            status__in = list_qs
-            )
-        task_qs.restore()
-        list_qs.restore()
-        return super().restore()
-
 
 class TaskList(BaseModel, SoftDeleteMixin):
     title = models.CharField(
@@ -192,6 +234,14 @@ class TaskList(BaseModel, SoftDeleteMixin):
         help_text='Board associated with the Tasklist', 
         related_name='board_Tasklists'
         )
+    tasks_count = models.PositiveIntegerField(
+        _("Tasks count"),
+        default=0,
+        editable=False,
+        help_text='Number of active tasks in the Tasklist'
+        )
+
+    soft_delete_cascade = ('status_tasks',)
 
     class Meta:
         verbose_name = _("TaskList")
@@ -201,6 +251,36 @@ class TaskList(BaseModel, SoftDeleteMixin):
     def __str__(self) -> str:
         return f'{self.title} - related board: {self.board}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_board_id = instance.__dict__.get('board_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the task list and moves its tasks along when its board changes.
+        """
+        previous_board_id = getattr(self, '_loaded_board_id', None)
+        relocated = previous_board_id not in (None, self.board_id)
+        with transaction.atomic() if relocated else nullcontext():
+            super().save(*args, **kwargs)
+            if relocated:
+                work_space_id = Board.original_objects.values_list(
+                    'work_space', flat=True
+                    ).get(pk=self.board_id)
+                _relocate(
+                    {
+                        Task: {'status': self},
+                        Comment: {'task__status': self},
+                        Attachment: {'task__status': self},
+                        Activity: {'task__status': self},
+                    },
+                    board_id=self.board_id,
+                    work_space_id=work_space_id,
+                    )
+        self._loaded_board_id = self.board_id
+
     def add_task(self, doer, title: str, description: str ='',
          start_date=None, end_date=None):
         """
@@ -215,20 +295,60 @@ class TaskList(BaseModel, SoftDeleteMixin):
             end_date=end_date,
         )
 
-    def task_count(self) -> QuerySet:
+    def task_count(self) -> int:
         """
         Returns the count of tasks that associated with the task list.
         """
-        return self.status_tasks.all().count()
+        return self.tasks_count
+
+    @classmethod
+    def repair_tasks_count(cls) -> int:
+        """
+        Recomputes the stored task counters that drifted from the real count.
+        Returns the number of repaired task lists.
+        """
+        actual = Coalesce(
+            Subquery(
+                Task.objects.filter(status=OuterRef('pk'))
+                .order_by().values('status')
+                .annotate(count=Count('pk')).values('count')
+                ),
+            0,
+            )
+        return cls.original_objects.annotate(
+            actual_count=actual
+            ).exclude(
+            tasks_count=F('actual_count')
+            ).update(tasks_count=actual)
+
+    def rebalance_ranks(self) -> int:
+        """
+        Rewrites the ranks of all tasks in the task list with short, evenly spaced keys.
+        """
+        tasks = list(
+            Task.original_objects.filter(status=self)
+            .order_by('rank', 'order', 'create_at').only('id', 'rank', 'board', 'work_space')
+            )
+        for task, rank in zip(tasks, spread_keys(len(tasks))):
+            task.rank = rank
+        Change.record_many(tasks, ChangeAction.UPDATED)
+        return Task.original_objects.bulk_update(tasks, ['rank'], batch_size=1000)
+
+    @classmethod
+    def shift_tasks_count(cls, deltas: dict) -> None:
+        """
+        Adds the given delta to the counter of every task list id in `deltas`.
+        """
+        deltas = {pk: delta for pk, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        cls.original_objects.filter(pk__in=deltas).update(
+            tasks_count=F('tasks_count') + Case(
+                *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+                default=Value(0),
+                )
+            )
 
-    def archive(self) -> None:
-        self.status_tasks.all().archive()
-        return super().archive()
-    
-    def restore(self) -> None:
-        self.status_tasks(manager = 'original_objects').all().restore()
-        return super().restore()
-    
 
 class Label(BaseModel):
     title = models.CharField(
@@ -293,6 +413,13 @@ class Task(BaseModel, SoftDeleteMixin):
         verbose_name=_('Order'), 
         help_text='Order of the task',
         default=1)
+    rank = models.CharField(
+        verbose_name=_('Rank'),
+        max_length=RANK_MAX_LENGTH,
+        default='',
+        editable=False,
+        help_text='Sortable position of the task in its task list'
+        )
     labels = models.ManyToManyField(
         Label, verbose_name=_('Label'), 
         help_text='Label associated with the task', 
@@ -315,32 +442,311 @@ class Task(BaseModel, SoftDeleteMixin):
         help_text='User assigned to the task', 
         related_name='assigned_tasks'
         )
+    board = models.ForeignKey(
+        Board, 
+        verbose_name=_('Board'), 
+        on_delete=models.CASCADE, 
+        null=True, 
+        editable=False, 
+        help_text='Board of the task list of the task', 
+        related_name='board_tasks'
+        )
+    work_space = models.ForeignKey(
+        WorkSpace, 
+        verbose_name=_('Workspace'), 
+        on_delete=models.CASCADE, 
+        null=True, 
+        editable=False, 
+        help_text='Work space of the board of the task', 
+        related_name='work_space_tasks'
+        )
+
+    soft_delete_cascade = ('task_comments', 'task_attachments')
 
     class Meta:
         verbose_name =_('Task')
         verbose_name_plural =_('Tasks')
+        ordering = ['rank']
+        indexes = [
+            models.Index(fields=['status', 'rank']),
+        ]
 
     def __str__(self) -> str:
         return f'Task {self.title}'
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status_id = instance.__dict__.get('status_id')
+        instance._loaded_board_id = instance.__dict__.get('board_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the task and keeps the task counters of its task lists, and the
+        board and work space copied onto it and its children, in step.
+        """
+        previous_status_id = getattr(self, '_loaded_status_id', None)
+        moved = previous_status_id not in (None, self.status_id)
+        deltas = {}
+        if self.is_active and self._state.adding:
+            deltas[self.status_id] = 1
+        elif self.is_active and moved:
+            deltas[previous_status_id] = -1
+            deltas[self.status_id] = 1
+        previous_board_id = self.board_id
+        if self._state.adding or moved or self.board_id is None:
+            self._locate()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'board', 'work_space'}
+        relocated = not self._state.adding and previous_board_id != self.board_id
+        ranked = self._state.adding and not self.rank
+        with transaction.atomic() if deltas or relocated or ranked else nullcontext():
+            # Shifting the counters first locks the task list rows, which
+            # serializes concurrent appends to the same list.
+            TaskList.shift_tasks_count(deltas)
+            if ranked:
+                self.rank = key_between(self._rank_neighbour(self.status_id))
+            super().save(*args, **kwargs)
+            if ranked:
+                self._rebalance_long_rank()
+            if relocated:
+                _relocate(
+                    {model: {'task': self} for model in (Comment, Attachment, Activity)},
+                    board_id=self.board_id,
+                    work_space_id=self.work_space_id,
+                    )
+        if deltas and Task.status.is_cached(self):
+            self.status.tasks_count += 1
+        self._loaded_status_id = self.status_id
+        self._loaded_board_id = self.board_id
+
+    def _locate(self) -> None:
+        """
+        Copies the board and work space of the task list onto the task.
+        """
+        if Task.status.is_cached(self) and TaskList.board.is_cached(self.status):
+            self.board_id = self.status.board_id
+            self.work_space_id = self.status.board.work_space_id
+        else:
+            self.board_id, self.work_space_id = TaskList.original_objects.values_list(
+                'board', 'board__work_space'
+                ).get(pk=self.status_id)
+
+    def _rebalance_long_rank(self) -> None:
+        """
+        Rebalances the task list of the task once its rank grows too long,
+        which appends and moves to the same spot do a character at a time.
+        """
+        if len(self.rank) > RANK_REBALANCE_LENGTH:
+            TaskList(pk=self.status_id).rebalance_ranks()
+            self.refresh_from_db(fields=['rank'])
+
+    def _rank_neighbour(self, status, rank: str | None = None, previous: bool = True) -> str | None:
+        """
+        Returns the rank next to `rank` in the task list, ignoring this task.
+        Without `rank`, returns the last rank of the list.
+        """
+        ranks = Task.original_objects.filter(
+            status=status
+            ).exclude(pk=self.pk).values_list('rank', flat=True)
+        if rank is None:
+            return ranks.order_by('-rank').first() or ''
+        if previous:
+            return ranks.filter(rank__lt=rank).order_by('-rank').first() or ''
+        return ranks.filter(rank__gt=rank).order_by('rank').first()
+
+    def _move_bounds(self, status, before, after) -> tuple:
+        if before is not None:
+            lower = before.rank
+            upper = after.rank if after is not None else self._rank_neighbour(status, lower, previous=False)
+        elif after is not None:
+            upper = after.rank
+            lower = self._rank_neighbour(status, upper)
+        else:
+            lower, upper = self._rank_neighbour(status), None
+        return lower, upper
+
+    def move(self, doer, before=None, after=None, status=None) -> None:
+        """
+        Moves the task between the `before` and `after` tasks, or to the end of `status`.
+        Only the task row is written unless its new rank grows too long,
+        in which case the whole task list is rebalanced.
+        """
+        neighbour = before or after
+        status = neighbour.status if neighbour is not None else status or self.status
+        with transaction.atomic():
+            lower, upper = self._move_bounds(status, before, after)
+            if upper is not None and not lower < upper:
+                status.rebalance_ranks()
+                for task in (before, after):
+                    if task is not None:
+                        task.refresh_from_db(fields=['rank'])
+                lower, upper = self._move_bounds(status, before, after)
+            self.rank = key_between(lower, upper)
+            status_changed = status.pk != self.status_id
+            self.status = status
+            self.save(update_fields=['rank', 'status', 'update_at'])
+            if status_changed:
+                ActivityRecorder.record(
+                    task=self,
+                    doer=doer,
+                    message=f"Task status was changed to {status.title}.",
+                    event_type=EventType.TASK_STATUS_CHANGED,
+                    payload={'status': str(status.pk), 'title': status.title}
+                    )
+            self._rebalance_long_rank()
+
+    @classmethod
+    def pre_soft_delete(cls, queryset, is_active: bool) -> None:
+        sign = 1 if is_active else -1
+        deltas = queryset.order_by().values('status').annotate(count=Count('pk'))
+        TaskList.shift_tasks_count(
+            {row['status']: sign * row['count'] for row in deltas}
+            )
+
+    @classmethod
+    def bulk_move(cls, doer, moves: list) -> list:
+        """
+        Moves many tasks in one transaction with a fixed number of queries.
+        `moves` holds (task, status, position) tuples, where position is the
+        0-based index of the task in its target task list after the move.
+        """
+        now = timezone.now()
+        moved_ids = {task.pk for task, status, position in moves}
+        targets = {status.pk: status for task, status, position in moves}
+        incoming = defaultdict(list)
+        for task, status, position in sorted(moves, key=lambda move: move[2]):
+            incoming[status.pk].append((position, task))
+        locations = {
+            pk: (status.board_id, status.board.work_space_id)
+            for pk, status in targets.items() if TaskList.board.is_cached(status)
+            }
+        with transaction.atomic(), ActivityRecorder():
+            if missing := targets.keys() - locations.keys():
+                for pk, board_id, work_space_id in TaskList.original_objects.filter(
+                    pk__in=missing
+                    ).values_list('pk', 'board', 'board__work_space'):
+                    locations[pk] = (board_id, work_space_id)
+            # Archived tasks keep their ranks, so they are loaded to stay
+            # between the same active neighbours, but positions only count active tasks.
+            remaining = defaultdict(list)
+            for status_id, pk, rank, board_id, work_space_id, is_active in cls.original_objects.filter(
+                status__in=targets
+                ).exclude(pk__in=moved_ids).order_by('status', 'rank').values_list(
+                'status', 'pk', 'rank', 'board', 'work_space', 'is_active'
+                ):
+                remaining[status_id].append(cls(
+                    pk=pk, rank=rank, board_id=board_id, work_space_id=work_space_id, is_active=is_active
+                    ))
+            moved, respaced = [], []
+            for status_id, tasks in incoming.items():
+                sequence = remaining[status_id]
+                for position, task in tasks:
+                    indexes = [index for index, other in enumerate(sequence) if other.is_active]
+                    sequence.insert(indexes[position] if position < len(indexes) else len(sequence), task)
+                ranks = [task.rank for task in sequence if task.pk not in moved_ids]
+                if ranks != sorted(set(ranks)) or '' in ranks:
+                    # Legacy ties leave no room between neighbours: respace the whole list.
+                    for task, rank in zip(sequence, spread_keys(len(sequence))):
+                        task.rank = rank
+                    respaced += [task for task in sequence if task.pk not in moved_ids]
+                    continue
+                lower, run = '', []
+                for task in sequence + [None]:
+                    if task is not None and task.pk in moved_ids:
+                        run.append(task)
+                        continue
+                    upper = task.rank if task is not None else None
+                    for moved_task, rank in zip(run, keys_between(lower, upper, len(run))):
+                        moved_task.rank = rank
+                    lower, run = upper, []
+            deltas = defaultdict(int)
+            relocated = defaultdict(list)
+            touched_boards = set()
+            for task, status, position in moves:
+                if task.status_id != status.pk:
+                    if task.is_active:
+                        deltas[task.status_id] -= 1
+                        deltas[status.pk] += 1
+                    ActivityRecorder.record(
+                        task=task,
+                        doer=doer,
+                        message=f"Task status was changed to {status.title}.",
+                        event_type=EventType.TASK_STATUS_CHANGED,
+                        payload={'status': str(status.pk), 'title': status.title}
+                        )
+                task.status = status
+                task.update_at = now
+                task._loaded_status_id = status.pk
+                if task.board_id != locations[status.pk][0]:
+                    touched_boards.add(task.board_id)
+                    task.board_id, task.work_space_id = locations[status.pk]
+                    relocated[locations[status.pk]].append(task)
+                task._loaded_board_id = task.board_id
+                touched_boards.add(task.board_id)
+                moved.append(task)
+            cls.original_objects.bulk_update(
+                moved, ['status', 'rank', 'board', 'work_space', 'update_at'], batch_size=1000
+                )
+            cls.original_objects.bulk_update(respaced, ['rank'], batch_size=1000)
+            Change.record_many(moved + respaced, ChangeAction.UPDATED)
+            TaskList.shift_tasks_count(deltas)
+            for (board_id, work_space_id), tasks in relocated.items():
+                _relocate(
+                    {model: {'task__in': tasks} for model in (Comment, Attachment, Activity)},
+                    board_id=board_id,
+                    work_space_id=work_space_id,
+                    )
+            for status_id in {task.status_id for task in moved if len(task.rank) > RANK_REBALANCE_LENGTH}:
+                targets[status_id].rebalance_ranks()
+            fragments.invalidate(board_ids=touched_boards)
+        return moved
+
+    @classmethod
+    def with_recent_relations(cls, queryset: QuerySet, names=('comments', 'attachments', 'activity'),
+                              limit: int = TASK_RECENT_LIMIT) -> QuerySet:
+        """
+        Annotates the number of comments, attachments and activities of the
+        tasks and prefetches the `limit` newest of each into recent_comments,
+        recent_attachments and recent_activity, for the relations in `names`.
+        The prefetches are windowed per task, so a task with thousands of
+        comments loads `limit` of them.
+        """
+        related = {'comments': Comment, 'attachments': Attachment, 'activity': Activity}
+        newest = ('-create_at', '-id')
+        return queryset.annotate(**{
+            f'{name}_count': _count_per_task(related[name]) for name in names
+            }).prefetch_related(*(
+            Prefetch(f'task_{name}', queryset=related[name].objects.order_by(*newest)[:limit], to_attr=f'recent_{name}')
+            for name in names
+            ))
+
     @classmethod
     def create_task(cls, doer, *args, **kwargs):
         """
         Creates a new Task object with the given parameters.
         Doer, title and status fields are required.
         """
-        order = kwargs['status'].task_count() + 1
-        
-        task = cls.objects.create(
-            *args,
-            **kwargs,
-            order=order,
-        )
+        status = kwargs['status']
+        with transaction.atomic():
+            # Reads the counter under a lock, so concurrent creations in the
+            # same list never take the same order.
+            status.tasks_count = TaskList.original_objects.select_for_update().values_list(
+                'tasks_count', flat=True
+                ).get(pk=status.pk)
+            task = cls.objects.create(
+                *args,
+                **kwargs,
+                order=status.task_count() + 1,
+            )
         message = f"Task '{kwargs['title']}' was created."
-        Activity.objects.create(
+        ActivityRecorder.record(
             task=task, 
             doer=doer, 
-            message=message
+            message=message, 
+            event_type=EventType.TASK_CREATED, 
+            payload={'title': task.title}
             )
         return task
     
@@ -354,21 +760,24 @@ class Task(BaseModel, SoftDeleteMixin):
                 self.title = title
                 message = f"Task title was changed to {self.title}."
                 messages.append(
-                    message
+                    (message, EventType.TASK_TITLE_CHANGED, {'title': self.title})
                     )
         if description := kwargs.get('description', None):
             if description != self.description:
                 self.description = description
                 message = f"Task description was changed."
                 messages.append(
-                    message
+                    (message, EventType.TASK_DESCRIPTION_CHANGED, {})
                     )
+        reranked = False
         if status := kwargs.get('status', None):
             if status != self.status:
                 self.status = status
+                self.rank = key_between(self._rank_neighbour(status))
+                reranked = True
                 message = f"Task status was changed to {self.status.title}."
                 messages.append(
-                    message
+                    (message, EventType.TASK_STATUS_CHANGED, {'status': str(status.pk), 'title': status.title})
                     )
         if order := kwargs.get('order', None):
             if order != self.order:
@@ -378,16 +787,19 @@ class Task(BaseModel, SoftDeleteMixin):
                 self.start_date = start_date
                 message = f"Task start date was changed to {self.start_date}."
                 messages.append(
-                    message
+                    (message, EventType.TASK_START_DATE_CHANGED, {'date': str(self.start_date)})
                     )
         if end_date := kwargs.get('end_date', None):
             if end_date != self.end_date:
                 self.end_date = end_date
                 message = f"Task end date was changed to {self.end_date}."
                 messages.append(
-                    message
+                    (message, EventType.TASK_END_DATE_CHANGED, {'date': str(self.end_date)})
                     )
-        self.save()
+        with transaction.atomic() if reranked else nullcontext():
+            self.save()
+            if reranked:
+                self._rebalance_long_rank()
         if labels := kwargs.get('labels', None):
             self.labels.set(
                 labels, 
@@ -403,19 +815,22 @@ class Task(BaseModel, SoftDeleteMixin):
             for user in new_assigned_to:
                 message = f"Task assined to {user}."
                 messages.append(
-                    message
+                    (message, EventType.TASK_ASSIGNED, {'user': str(user.pk)})
                     )
             for user in deleted_assigned_to:
                 message = f"{user} removed from task assigness."
                 messages.append(
-                    message
+                    (message, EventType.TASK_UNASSIGNED, {'user': str(user.pk)})
+                    )
+        with ActivityRecorder():
+            for message, event_type, payload in messages:
+                ActivityRecorder.record(
+                    task=self, 
+                    doer=doer, 
+                    message=message, 
+                    event_type=event_type, 
+                    payload=payload
                     )
-        for message in messages:
-            Activity.objects.create(
-                task=self, 
-                doer=doer, 
-                message=message
-                )
 
     def get_comment(self) -> QuerySet:
         """
@@ -479,14 +894,81 @@ class Comment(BaseModel, SoftDeleteMixin):
         null=True, 
         blank=True
         )
+    thread = models.ForeignKey(
+        'self',
+        verbose_name=_('Thread'),
+        on_delete=models.CASCADE,
+        null=True,
+        editable=False,
+        help_text='Top-level comment of the thread of the comment',
+        related_name='thread_comments'
+        )
+    depth = models.PositiveSmallIntegerField(
+        verbose_name=_('Depth'),
+        default=0,
+        editable=False,
+        help_text='Number of comments above the comment in its thread'
+        )
+    path = models.CharField(
+        verbose_name=_('Path'),
+        max_length=COMMENT_MAX_DEPTH * COMMENT_PATH_STEP,
+        default='',
+        editable=False,
+        help_text='Path of the comment in its thread, in reading order'
+        )
+    board = models.ForeignKey(
+        Board, 
+        verbose_name=_('Board'), 
+        on_delete=models.CASCADE, 
+        null=True, 
+        editable=False, 
+        help_text='Board of the task of the comment', 
+        related_name='board_comments'
+        )
+    work_space = models.ForeignKey(
+        WorkSpace, 
+        verbose_name=_('Workspace'), 
+        on_delete=models.CASCADE, 
+        null=True, 
+        editable=False, 
+        help_text='Work space of the task of the comment', 
+        related_name='work_space_comments'
+        )
 
 
     class Meta:
         verbose_name = _('Comment')
         verbose_name_plural =_('Comments')
+        indexes = [
+            models.Index(fields=['board', 'author']),
+            models.Index(fields=['task', 'create_at', 'id']),
+            models.Index(fields=['thread', 'path']),
+        ]
 
     def __str__(self) -> str:
         return f'Comment by {self.author} on task {self.task}'
+
+    def save(self, *args, **kwargs):
+        _locate_from_task(self)
+        if self._state.adding and not self.path:
+            self._place_in_thread()
+        return super().save(*args, **kwargs)
+
+    def _place_in_thread(self) -> None:
+        """
+        Sets the thread, depth and path of a new comment from its parent.
+        Each level of the path is the creation time of the comment with a
+        bit of its id, in fixed width, so paths sort replies after their
+        parent and in the order they were written. Replies below the deepest
+        level share its path prefix, which still sorts them after their parent.
+        """
+        step = comment_path_step(self.create_at or timezone.now(), self.pk)
+        if self.parent_id is None:
+            self.thread_id, self.depth, self.path = self.pk, 0, step
+        else:
+            self.thread_id = self.parent.thread_id or self.parent_id
+            self.depth = self.parent.depth + 1
+            self.path = self.parent.path[:(COMMENT_MAX_DEPTH - 1) * COMMENT_PATH_STEP] + step
     
     @classmethod
     def create_comment(cls, body: str, task: Task, author, parent=None):
@@ -502,9 +984,17 @@ class Comment(BaseModel, SoftDeleteMixin):
         # Create an Activity object to log the creation of the comment
         if parent:
             message = f"{author} replied to a comment on task {task.title}."
+            event_type = EventType.COMMENT_REPLIED
         else:
             message = f"{author} added a new comment on task {task.title}."
-        Activity.objects.create(task=task, doer=author, message=message)
+            event_type = EventType.COMMENT_CREATED
+        ActivityRecorder.record(
+            task=task, 
+            doer=author, 
+            message=message, 
+            event_type=event_type, 
+            payload={'comment': str(comment.pk)}
+            )
         return comment
    
     def update_comment(self, body: str | None =None) -> None:
@@ -515,22 +1005,26 @@ class Comment(BaseModel, SoftDeleteMixin):
             self.body = body
             self.save()
             message = f"{self.author} updated a comment on task {self.task.title}."
-            Activity.objects.create(
+            ActivityRecorder.record(
                 task=self.task, 
                 doer=self.author, 
-                message=message
+                message=message, 
+                event_type=EventType.COMMENT_UPDATED, 
+                payload={'comment': str(self.pk)}
                 )
 
-    def archive(self) -> None:
+    def archive(self) -> dict:
         """
         Soft-deletes the Comment object.
         """
         # Create an Activity object to log the deletion of the comment
         message = f"{self.author} deleted a comment on task {self.task.title}."
-        Activity.objects.create(
+        ActivityRecorder.record(
             task=self.task, 
             doer=self.author, 
-            message=message
+            message=message, 
+            event_type=EventType.COMMENT_DELETED, 
+            payload={'comment': str(self.pk)}
             )
         return super().archive()
 
@@ -541,6 +1035,36 @@ class Comment(BaseModel, SoftDeleteMixin):
         return Comment.objects.filter(
             parent=self
             )
+
+    def get_thread(self) -> QuerySet:
+        """
+        Returns the replies to the Comment object at every depth, in reading order.
+        """
+        return Comment.objects.filter(
+            thread=self.thread_id,
+            path__gt=self.path,
+            path__lt=self.path + '~',
+            ).order_by('path')
+
+    @classmethod
+    def load_threads(cls, comments: list) -> list:
+        """
+        Loads the replies of top-level comments at every depth with one
+        query, as `thread_replies` lists on each comment. Replies to archived
+        comments are left out with them.
+        """
+        loaded = {comment.pk: comment for comment in comments}
+        for comment in comments:
+            comment.thread_replies = []
+        replies = cls.objects.filter(
+            thread__in=list(loaded), depth__gt=0
+            ).select_related('author').order_by('thread', 'path')
+        for reply in replies:
+            if (parent := loaded.get(reply.parent_id)) is not None:
+                reply.thread_replies = []
+                parent.thread_replies.append(reply)
+                loaded[reply.pk] = reply
+        return comments
     
     def get_author_comments(self) -> QuerySet:
         """
@@ -548,7 +1072,7 @@ class Comment(BaseModel, SoftDeleteMixin):
         """
         return Comment.objects.filter(
             author=self.author, 
-            task__status__board=self.task.status.board
+            board_id=self.board_id
             )
     
 
@@ -558,6 +1082,13 @@ class Attachment(BaseModel , SoftDeleteMixin):
         max_length=100 ,upload_to='uploads/attachments/', 
         blank=True
         )
+    name = models.CharField(
+        verbose_name=_('Name'),
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text='Name of the file as it was uploaded'
+        )
     task = models.ForeignKey(
         Task,
         verbose_name=_('Task'), 
@@ -571,6 +1102,31 @@ class Attachment(BaseModel , SoftDeleteMixin):
         on_delete=models.DO_NOTHING, 
         related_name='owner_attachments'
         )
+    board = models.ForeignKey(
+        Board, 
+        verbose_name=_('Board'), 
+        on_delete=models.CASCADE, 
+        null=True, 
+        editable=False, 
+        help_text='Board of the task of the attachment', 
+        related_name='board_attachments'
+        )
+    work_space = models.ForeignKey(
+        WorkSpace, 
+        verbose_name=_('Workspace'), 
+        on_delete=models.CASCADE, 
+        null=True, 
+        editable=False, 
+        help_text='Work space of the task of the attachment', 
+        related_name='work_space_attachments'
+        )
+
+    def save(self, *args, **kwargs):
+        _locate_from_task(self)
+        # Stored files are named after their content; the uploaded name is kept here.
+        if self.file and (not self.file._committed or not self.name):
+            self.name = os.path.basename(self.file.name)[:255]
+        return super().save(*args, **kwargs)
 
     @classmethod
     def create(cls, file, task: Task, owner):
@@ -580,19 +1136,23 @@ class Attachment(BaseModel , SoftDeleteMixin):
             owner=owner
             )
         message = f"{owner} attached a new file."
-        Activity.objects.create(
+        ActivityRecorder.record(
             task= task, 
             doer=owner, 
-            message = message)
+            message = message, 
+            event_type=EventType.ATTACHMENT_CREATED, 
+            payload={'attachment': str(attachment.pk)})
         return attachment
     
-    def archive(self) -> None:
+    def archive(self) -> dict:
         # Create an Activity object to log the deletion of the comment
         message = f"{self.owner} deleted a attachment on task {self.task.title}."
-        Activity.objects.create(
+        ActivityRecorder.record(
             task=self.task, 
             doer=self.owner, 
-            message=message
+            message=message, 
+            event_type=EventType.ATTACHMENT_DELETED, 
+            payload={'attachment': str(self.pk)}
             )
         return super().archive()
 
@@ -602,17 +1162,121 @@ class Attachment(BaseModel , SoftDeleteMixin):
         """
         return Attachment.objects.filter(
             owner= self.owner, 
-            task__status__board = self.task.status.board
+            board_id=self.board_id
             )
 
     class Meta:
         verbose_name = _('Attachment')
         verbose_name_plural =_("Attachments")
+        indexes = [
+            models.Index(fields=['board', 'owner']),
+            models.Index(fields=['task', 'create_at', 'id']),
+        ]
 
     def __str__(self) -> str:
         return f"Attached by {self.owner}."
 
 
+class UploadSession(BaseModel):
+    task = models.ForeignKey(
+        Task,
+        verbose_name=_('Task'),
+        on_delete=models.CASCADE,
+        help_text='Task the uploaded file is attached to',
+        related_name='upload_sessions'
+        )
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name=_('Owner'),
+        on_delete=models.CASCADE,
+        related_name='upload_sessions'
+        )
+    filename = models.CharField(
+        _('Filename'),
+        max_length=100,
+        help_text='Name of the uploaded file'
+        )
+    size = models.BigIntegerField(
+        _('Size'),
+        help_text='Size of the uploaded file in bytes'
+        )
+    checksum = models.CharField(
+        _('Checksum'),
+        max_length=64,
+        help_text='SHA-256 hex digest of the uploaded file'
+        )
+    received = models.BigIntegerField(
+        _('Received'),
+        default=0,
+        help_text='Bytes received from the start of the file'
+        )
+
+    class Meta:
+        verbose_name = _('Upload session')
+        verbose_name_plural = _('Upload sessions')
+        indexes = [
+            models.Index(fields=['update_at']),
+        ]
+
+    def __str__(self) -> str:
+        return f'Upload of {self.filename} by {self.owner}'
+
+    @property
+    def path(self) -> str:
+        return uploads.partial_path(self.pk)
+
+    def chunk_length(self, offset: int) -> int:
+        """
+        Returns the length of the chunk starting at `offset`.
+        """
+        return min(uploads.UPLOAD_CHUNK_SIZE, self.size - offset)
+
+    def receive_chunk(self, offset: int, stream) -> None:
+        """
+        Writes the chunk at `offset` from `stream` to the partial file. Chunks
+        are written from the start of the file on, and written again when
+        they are retried.
+        """
+        length = self.chunk_length(offset)
+        uploads.write_chunk(self.path, offset, stream, length)
+        # Concurrent retries of a chunk must not move the offset back.
+        UploadSession.objects.filter(pk=self.pk).update(
+            received=Greatest(F('received'), offset + length), update_at=timezone.now()
+            )
+        self.refresh_from_db(fields=['received', 'update_at'])
+
+    def complete(self) -> Attachment | None:
+        """
+        Attaches the received file to the task when it matches the checksum
+        and ends the session. Files that do not match are received again.
+        """
+        if uploads.checksum(self.path) != self.checksum:
+            UploadSession.objects.filter(pk=self.pk).update(received=0, update_at=timezone.now())
+            self.received = 0
+            return None
+        with transaction.atomic():
+            with open(self.path, 'rb') as file:
+                partial_file = uploads.PartialFile(file, name=self.filename)
+                # Verified above, so content-addressed storages need not hash it again.
+                partial_file.content_hash = self.checksum
+                attachment = Attachment.create(partial_file, self.task, self.owner)
+            self.delete()
+        return attachment
+
+    @classmethod
+    def purge_expired(cls) -> int:
+        """
+        Deletes the sessions that received no chunk for UPLOAD_SESSION_TTL,
+        with their partial files and the ones of lost sessions. Returns how
+        many sessions were deleted.
+        """
+        cutoff = timezone.now() - UPLOAD_SESSION_TTL
+        deleted = cls.objects.filter(update_at__lt=cutoff).delete()[0]
+        active = {str(pk) for pk in cls.objects.values_list('pk', flat=True)}
+        uploads.sweep(active, cutoff.timestamp())
+        return deleted
+
+
 class Activity(BaseModel):
 
     doer = models.ForeignKey(
@@ -633,15 +1297,76 @@ class Activity(BaseModel):
         help_text='Task associated with the activity', 
         related_name='task_activity'
         )
-    
+    board = models.ForeignKey(
+        Board, 
+        verbose_name=_('Board'), 
+        on_delete=models.CASCADE, 
+        null=True, 
+        editable=False, 
+        help_text='Board of the task of the activity', 
+        related_name='board_activity'
+        )
+    work_space = models.ForeignKey(
+        WorkSpace, 
+        verbose_name=_('Workspace'), 
+        on_delete=models.CASCADE, 
+        null=True, 
+        editable=False, 
+        help_text='Work space of the task of the activity', 
+        related_name='work_space_activity'
+        )
+    event_type = models.CharField(
+        verbose_name=_('Event type'), 
+        max_length=32, 
+        choices=EventType.choices, 
+        default=EventType.OTHER, 
+        help_text='Type of the activity'
+        )
+    payload = models.JSONField(
+        verbose_name=_('Payload'), 
+        default=dict, 
+        blank=True, 
+        help_text='Structured details of the activity'
+        )
+
+    def save(self, *args, **kwargs):
+        Activity.fill_denormalized([self])
+        return super().save(*args, **kwargs)
+
+    @classmethod
+    def fill_denormalized(cls, activities: list) -> None:
+        """
+        Fills the board and work space of the activities and, for untyped ones,
+        the event type parsed from the message. Locations of tasks that were
+        saved before they had one are looked up with one query.
+        """
+        missing = defaultdict(list)
+        for activity in activities:
+            if activity.event_type == EventType.OTHER:
+                activity.event_type, payload = parse_message(activity.message)
+                activity.payload = activity.payload or payload
+            if activity.board_id is None:
+                if activity.task.board_id is not None:
+                    activity.board_id = activity.task.board_id
+                    activity.work_space_id = activity.task.work_space_id
+                else:
+                    missing[activity.task_id].append(activity)
+        if missing:
+            for task_id, board_id, work_space_id in Task.original_objects.filter(
+                pk__in=missing
+                ).values_list('pk', 'status__board', 'status__board__work_space'):
+                for activity in missing[task_id]:
+                    activity.board_id = board_id
+                    activity.work_space_id = work_space_id
+
     @classmethod
     def attachment_activity_on_board(cls, board: Board) -> QuerySet:
         """
         Returns attachment activity of the board.
         """
         return cls.objects.filter(
-            task__status__board= board, 
-            message__contains='attached'
+            board= board, 
+            event_type=EventType.ATTACHMENT_CREATED
             )
 
     @classmethod
@@ -650,8 +1375,8 @@ class Activity(BaseModel):
         Returns task create activity of the board.
         """
         return cls.objects.filter(
-            task__status__board= board, 
-            message__contains='new task'
+            board= board, 
+            event_type=EventType.TASK_CREATED
             )
 
     @classmethod
@@ -660,7 +1385,7 @@ class Activity(BaseModel):
         Return the activities of the selected time interval of the board.
         """
         return cls.objects.filter(
-            task__status__board= board, 
+            board= board, 
             create_at__gt=from_date, 
             create_at__lte=to_date
             )
@@ -669,13 +1394,510 @@ class Activity(BaseModel):
         """
         Return other activities of the doer.
         """
-        return self.doer.activities_on_board(self.task.status.board)
+        return self.doer.activities_on_board(self.board_id)
     
     class Meta:
         verbose_name = _('Activitie')
         verbose_name_plural =_("Activities")
         ordering = ["create_at"]
+        # The feeds page by (create_at, id) within a task, board, work space or doer.
+        indexes = [
+            models.Index(fields=['board', 'event_type', 'create_at', 'id']),
+            models.Index(fields=['board', 'create_at', 'id']),
+            models.Index(fields=['doer', 'board']),
+            models.Index(fields=['task', 'create_at', 'id']),
+            models.Index(fields=['work_space', 'create_at', 'id']),
+            models.Index(fields=['doer', 'create_at', 'id']),
+        ]
+
+
+    def __str__(self) -> str:
+        return f'Done By {self.doer}'
+
+
+class Change(models.Model):
+    """
+    One entry of the change log of a workspace.
+    The auto-incremented id orders the entries and is the cursor clients
+    sync from. Workspaces and boards are not constrained, so that deleting
+    them can still be logged.
+
+    The entries of a work space are committed in id order, so a reader of its
+    log that saw an entry has seen every entry of the work space before it:
+    transactions that log changes take the log lock of each work space before
+    inserting its entries and keep it until they end. SQLite serializes write
+    transactions on its own; PostgreSQL takes an advisory lock per work space,
+    as ids are allocated at insert time, not at commit time. Writers of
+    different work spaces never wait for each other; those of the same work
+    space commit one at a time once they logged a change.
+    """
+    id = models.BigAutoField(primary_key=True)
+    work_space = models.ForeignKey(
+        WorkSpace, 
+        verbose_name=_('Workspace'), 
+        on_delete=models.DO_NOTHING, 
+        db_constraint=False, 
+        help_text='Work space of the changed object', 
+        related_name='work_space_changes'
+        )
+    board = models.ForeignKey(
+        Board, 
+        verbose_name=_('Board'), 
+        on_delete=models.DO_NOTHING, 
+        db_constraint=False, 
+        null=True, 
+        help_text='Board of the changed object', 
+        related_name='board_changes'
+        )
+    model = models.CharField(
+        verbose_name=_('Model'), 
+        max_length=32, 
+        help_text='Model name of the changed object'
+        )
+    object_id = models.UUIDField(
+        verbose_name=_('Object id'), 
+        help_text='Id of the changed object'
+        )
+    action = models.CharField(
+        verbose_name=_('Action'), 
+        max_length=16, 
+        choices=ChangeAction.choices, 
+        help_text='What happened to the object'
+        )
+    create_at = models.DateTimeField(_("Create at"), auto_now_add=True)
 
+    class Meta:
+        verbose_name = _('Change')
+        verbose_name_plural = _('Changes')
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['work_space', 'id']),
+            models.Index(fields=['board', 'id']),
+        ]
 
     def __str__(self) -> str:
-        return f'Done By {self.doer}'
\ No newline at end of file
+        return f'{self.action} {self.model} {self.object_id}'
+
+    # Lookups of the work space and board of each logged model.
+    LOCATIONS = {
+        'workspace': ('pk', None),
+        'board': ('work_space', 'pk'),
+        'tasklist': ('board__work_space', 'board'),
+        'label': ('board__work_space', 'board'),
+        'task': ('work_space', 'board'),
+        'comment': ('work_space', 'board'),
+        'attachment': ('work_space', 'board'),
+    }
+
+    @classmethod
+    def for_instance(cls, instance, action: str) -> 'Change | None':
+        """
+        Returns the unsaved entry of `action` on the instance, or None when its
+        work space is unknown.
+        """
+        model = instance._meta.model_name
+        if isinstance(instance, WorkSpace):
+            work_space_id, board_id = instance.pk, None
+        elif isinstance(instance, Board):
+            work_space_id, board_id = instance.work_space_id, instance.pk
+        elif isinstance(instance, (TaskList, Label)):
+            board_id = instance.board_id
+            if instance.__class__.board.is_cached(instance):
+                work_space_id = instance.board.work_space_id
+            else:
+                work_space_id = Board.original_objects.filter(
+                    pk=board_id
+                    ).values_list('work_space', flat=True).first()
+        else:
+            work_space_id, board_id = instance.work_space_id, instance.board_id
+        if work_space_id is None:
+            return None
+        return cls(work_space_id=work_space_id, board_id=board_id, model=model,
+                   object_id=instance.pk, action=action)
+
+    @classmethod
+    def record(cls, instance, action: str) -> None:
+        """
+        Logs `action` on a single instance.
+        """
+        if (change := cls.for_instance(instance, action)) is not None:
+            ActivityRecorder.record_changes([change])
+
+    @classmethod
+    def record_many(cls, instances: list, action: str) -> None:
+        """
+        Logs `action` on instances whose work space and board are loaded.
+        """
+        ActivityRecorder.record_changes([
+            cls(work_space_id=instance.work_space_id, board_id=instance.board_id,
+                model=instance._meta.model_name, object_id=instance.pk, action=action)
+            for instance in instances
+            ])
+
+    @classmethod
+    def record_queryset(cls, queryset, action: str) -> int:
+        """
+        Logs `action` on every row of the queryset with one INSERT ... SELECT,
+        without loading the rows.
+        """
+        model = queryset.model._meta.model_name
+        work_space, board = cls.LOCATIONS[model]
+        rows = queryset.order_by().annotate(
+            change_work_space=F(work_space),
+            change_board=F(board) if board else Value(None, output_field=UUIDField()),
+            change_model=Value(model),
+            change_object=F('pk'),
+            change_action=Value(action),
+            change_create_at=Value(timezone.now(), output_field=models.DateTimeField()),
+            ).values_list(
+            'change_work_space', 'change_board', 'change_model', 'change_object',
+            'change_action', 'change_create_at',
+            )
+        try:
+            sql, params = rows.query.get_compiler(queryset.db).as_sql()
+        except EmptyResultSet:
+            return 0
+        connection = connections[queryset.db]
+        # Read the entries back only when a live stream can receive them.
+        returning = len(live.hub) > 0 and connection.features.can_return_rows_from_bulk_insert
+        with transaction.atomic(using=queryset.db, savepoint=False), connection.cursor() as cursor:
+            cls.lock_log(rows.values_list('change_work_space', flat=True), using=queryset.db)
+            cursor.execute(
+                f'INSERT INTO {cls._meta.db_table} '
+                f'(work_space_id, board_id, model, object_id, action, create_at) {sql}'
+                + (' RETURNING id, work_space_id, board_id, model, object_id, action' if returning else ''),
+                params,
+                )
+            if not returning:
+                return cursor.rowcount
+            to_uuid = cls._meta.get_field('object_id').to_python
+            changes = [
+                cls(id=pk, work_space_id=to_uuid(work_space_id), board_id=to_uuid(board_id),
+                    model=model, object_id=to_uuid(object_id), action=action)
+                for pk, work_space_id, board_id, model, object_id, action in cursor.fetchall()
+                ]
+        cls.publish(changes, using=queryset.db)
+        return len(changes)
+
+    @classmethod
+    def insert(cls, changes: list) -> list:
+        """
+        Inserts entries and publishes them to the live streams once committed.
+        """
+        if not changes:
+            return changes
+        with transaction.atomic(savepoint=False):
+            cls.lock_log([change.work_space_id for change in changes])
+            changes = cls.objects.bulk_create(changes, batch_size=1000)
+        cls.publish(changes)
+        return changes
+
+    @classmethod
+    def lock_log(cls, work_space_ids, using=None) -> None:
+        """
+        Takes the log locks of the work spaces until the end of the current
+        transaction. `work_space_ids` is a list of ids or a flat values_list
+        queryset of them; locks are taken in a fixed order, to avoid deadlocks.
+        """
+        connection = connections[using or cls.objects.db]
+        if connection.vendor != 'postgresql':
+            return
+        if isinstance(work_space_ids, QuerySet):
+            try:
+                sql, params = work_space_ids.query.get_compiler(using=work_space_ids.db).as_sql()
+            except EmptyResultSet:
+                return
+        else:
+            sql, params = 'SELECT unnest(%s::uuid[])', [sorted({str(pk) for pk in work_space_ids})]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s, hashtext(locked.id::text)) '
+                f'FROM (SELECT DISTINCT * FROM ({sql}) AS ids) AS locked(id) ORDER BY hashtext(locked.id::text)',
+                [CHANGE_LOG_LOCK, *params],
+                )
+
+    @classmethod
+    def publish(cls, changes: list, using=None) -> None:
+        entries = [
+            {
+                'cursor': change.id,
+                'work_space': change.work_space_id,
+                'board': change.board_id,
+                'model': change.model,
+                'object_id': change.object_id,
+                'action': change.action,
+            }
+            for change in changes
+            ]
+        transaction.on_commit(lambda: live.hub.publish(entries), using=using)
+
+    @classmethod
+    def load_objects(cls, changes: list) -> dict:
+        """
+        Returns the current rows of created, updated and restored objects keyed
+        by (model, id), with one query per model plus their many-to-many ids.
+        """
+        wanted = defaultdict(set)
+        for change in changes:
+            if change.action in (ChangeAction.CREATED, ChangeAction.UPDATED, ChangeAction.RESTORED):
+                wanted[change.model].add(change.object_id)
+        objects = {}
+        for model_name, ids in wanted.items():
+            model = cls._meta.apps.get_model('dashboards', model_name)
+            queryset = model._base_manager.filter(pk__in=ids).prefetch_related(
+                *[field.name for field in model._meta.many_to_many]
+                )
+            objects.update({(model_name, obj.pk): obj for obj in queryset})
+        return objects
+
+
+class SearchEntry(models.Model):
+    """
+    The searchable text of an active task, comment or attachment.
+    The database indexes the title and body of every entry for full-text
+    search; see the `search` module. Entries are found through their task,
+    whose workspace tells who may see them.
+    On SQLite, triggers keep the index in sync with the table, so migrations
+    that rebuild the table there must create them again.
+    """
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(
+        verbose_name=_('Model'),
+        max_length=32,
+        help_text='Model name of the indexed object'
+        )
+    object_id = models.UUIDField(
+        verbose_name=_('Object id'),
+        unique=True,
+        help_text='Id of the indexed object'
+        )
+    task = models.ForeignKey(
+        Task,
+        verbose_name=_('Task'),
+        on_delete=models.CASCADE,
+        help_text='The indexed task, or the task of the indexed object',
+        related_name='search_entries'
+        )
+    title = models.CharField(
+        verbose_name=_('Title'),
+        max_length=300,
+        blank=True,
+        help_text='Indexed title of the object'
+        )
+    body = models.TextField(
+        verbose_name=_('Body'),
+        blank=True,
+        help_text='Indexed body of the object'
+        )
+
+    # Fields whose changes are indexed.
+    INDEXED_FIELDS = frozenset({'title', 'description', 'body', 'file', 'name', 'task', 'is_active'})
+
+    class Meta:
+        verbose_name = _('Search entry')
+        verbose_name_plural = _('Search entries')
+
+    def __str__(self) -> str:
+        return f'{self.model} {self.object_id}'
+
+    @classmethod
+    def for_instance(cls, instance) -> 'SearchEntry':
+        """
+        Returns the unsaved entry of a task, comment or attachment.
+        """
+        if isinstance(instance, Task):
+            title, body, task_id = instance.title, instance.description, instance.pk
+        elif isinstance(instance, Comment):
+            title, body, task_id = '', instance.body, instance.task_id
+        else:
+            title, body, task_id = instance.name or os.path.basename(instance.file.name or ''), '', instance.task_id
+        return cls(model=instance._meta.model_name, object_id=instance.pk, task_id=task_id,
+                   title=title[:300], body=body)
+
+    @classmethod
+    def index(cls, instances) -> None:
+        """
+        Adds or refreshes the entries of the instances, with one query per batch.
+        """
+        cls.objects.bulk_create(
+            [cls.for_instance(instance) for instance in instances],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['object_id'],
+            update_fields=['task', 'title', 'body'],
+            )
+
+    @classmethod
+    def index_queryset(cls, queryset) -> int:
+        """
+        Adds or refreshes the entries of the rows of `queryset` with a DELETE
+        and an INSERT ... SELECT, without loading the rows, so the number of
+        statements does not depend on the number of rows.
+        """
+        model = queryset.model
+        if model is Task:
+            task, title, body = F('pk'), F('title'), F('description')
+        elif model is Comment:
+            task, title, body = F('task'), Value(''), F('body')
+        else:
+            # save() fills the name in, so only rows written around it fall
+            # back to the base name of the file under its upload directory.
+            upload_to = Attachment._meta.get_field('file').upload_to
+            file_name = Replace(Cast('file', models.CharField()), Value(upload_to), Value(''))
+            task, title, body = F('task'), Coalesce(NullIf('name', Value('')), file_name), Value('')
+        rows = queryset.order_by().annotate(
+            entry_model=Value(model._meta.model_name),
+            entry_object=F('pk'),
+            entry_task=task,
+            entry_title=title,
+            entry_body=body,
+            ).values_list('entry_model', 'entry_object', 'entry_task', 'entry_title', 'entry_body')
+        try:
+            sql, params = rows.query.get_compiler(queryset.db).as_sql()
+        except EmptyResultSet:
+            return 0
+        cls.unindex(queryset.values('pk'))
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f'INSERT INTO {cls._meta.db_table} (model, object_id, task_id, title, body) {sql}', params)
+            return cursor.rowcount
+
+    @classmethod
+    def unindex(cls, object_ids) -> None:
+        """
+        Drops the entries of the given ids, a list or a subquery.
+        """
+        cls.objects.filter(object_id__in=object_ids).delete()
+
+
+def _count_per_task(model) -> Coalesce:
+    """
+    Returns a correlated count of the active `model` rows of each task.
+    """
+    return Coalesce(
+        Subquery(
+            model.objects.filter(task=OuterRef('pk'))
+            .order_by().values('task')
+            .annotate(count=Count('pk')).values('count')
+            ),
+        0,
+        )
+
+
+def comment_path_step(create_at, pk) -> str:
+    """
+    Returns the level a comment adds to the path of its thread.
+    """
+    return f'{int(create_at.timestamp() * 1_000_000):013x}{pk.hex[:COMMENT_PATH_STEP - 13]}'
+
+
+def _locate_from_task(obj) -> None:
+    """
+    Copies the board and work space of the task of a comment or attachment
+    onto it when it is added or moved to another task.
+    """
+    if obj._state.adding or obj.board_id is None or obj.__class__.task.is_cached(obj):
+        obj.board_id = obj.task.board_id
+        obj.work_space_id = obj.task.work_space_id
+
+
+def _relocate(lookups: dict, **location) -> None:
+    """
+    Copies a new board and/or work space onto the rows matched by `lookups`,
+    a mapping of model to filter keyword arguments, and logs the moved rows.
+    """
+    for model, lookup in lookups.items():
+        queryset = model._base_manager.filter(**lookup)
+        queryset.update(**location)
+        if model is not Activity:
+            Change.record_queryset(queryset, ChangeAction.UPDATED)
+
+
+_current_recorder = ContextVar('activity_recorder', default=None)
+
+
+class ActivityRecorder:
+    """
+    Collects Activity and Change rows and inserts them with one bulk_create
+    per model when the outermost recorder exits without an error.
+    Nested recorders hand their rows to the outermost one, so a recorder can
+    wrap a single model method, a whole view or a transaction.
+    """
+
+    def __init__(self) -> None:
+        self.activities = []
+        self.changes = []
+        self._token = None
+
+    def __enter__(self):
+        if (outer := _current_recorder.get()) is not None:
+            return outer
+        self._token = _current_recorder.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self._token is None:
+            return
+        _current_recorder.reset(self._token)
+        self._token = None
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
+
+    def discard(self) -> None:
+        """
+        Drops the collected changes and activities, as for a rolled back transaction.
+        """
+        self.activities = []
+        self.changes = []
+
+    def flush(self) -> list:
+        """
+        Inserts the collected changes and activities.
+        """
+        activities, self.activities = self.activities, []
+        changes, self.changes = self.changes, []
+        Change.insert(changes)
+        Activity.fill_denormalized(activities)
+        fragments.invalidate(board_ids={activity.board_id for activity in activities})
+        return Activity.objects.bulk_create(activities)
+
+    @classmethod
+    def record(cls, task, doer, message: str, event_type: str = EventType.OTHER,
+               payload: dict | None = None) -> Activity:
+        """
+        Adds an activity to the current recorder, or saves it right away
+        when no recorder is active.
+        """
+        activity = Activity(
+            task=task, 
+            doer=doer, 
+            message=message, 
+            event_type=event_type, 
+            payload=payload or {}
+            )
+        if (recorder := _current_recorder.get()) is not None:
+            recorder.activities.append(activity)
+        else:
+            activity.save()
+        return activity
+
+    @classmethod
+    def flush_current(cls) -> None:
+        """
+        Inserts what the current recorder collected so far, for callers that
+        read it back before the recorder exits.
+        """
+        if (recorder := _current_recorder.get()) is not None:
+            recorder.flush()
+
+    @classmethod
+    def record_changes(cls, changes: list) -> None:
+        """
+        Adds change log entries to the current recorder, or inserts them right
+        away when no recorder is active.
+        """
+        if (recorder := _current_recorder.get()) is not None:
+            recorder.changes += changes
+        else:
+            Change.insert(changes)
@@ -0,0 +1,191 @@
+import base64
+import json
+from uuid import UUID
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+
+
+class ChangePagination(BasePagination):
+    """
+    Keyset pagination over the sequence of the change log.
+    Clients pass the `cursor` of the previous page as `since` and get the
+    entries that follow it. The cursor is returned on the last page too, so
+    it can be stored and used for the next sync. The entries of a workspace
+    are committed in cursor order (see Change), so no entry of the feed can
+    appear behind a cursor later.
+    """
+    since_query_param = 'since'
+    limit_query_param = 'limit'
+    default_limit = 100
+    max_limit = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.since = self._get_int(request, self.since_query_param, 0)
+        limit = min(self._get_int(request, self.limit_query_param, self.default_limit), self.max_limit)
+        rows = list(queryset.filter(id__gt=self.since).order_by('id')[:limit + 1])
+        self.has_more = len(rows) > limit
+        rows = rows[:limit]
+        self.cursor = rows[-1].id if rows else self.since
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'cursor': self.cursor,
+            'has_more': self.has_more,
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_next_link(self) -> str:
+        query = self.request.query_params.copy()
+        query[self.since_query_param] = self.cursor
+        return self.request.build_absolute_uri(f"{self.request.path}?{query.urlencode()}")
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'cursor': {'type': 'integer'},
+                'has_more': {'type': 'boolean'},
+                'next': {'type': 'string', 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.since_query_param, 'required': False, 'in': 'query', 'schema': {'type': 'integer'},
+             'description': 'Cursor of the last entry already seen.'},
+            {'name': self.limit_query_param, 'required': False, 'in': 'query', 'schema': {'type': 'integer'},
+             'description': 'Number of entries to return.'},
+        ]
+
+    def _get_int(self, request, name: str, default: int) -> int:
+        value = request.query_params.get(name)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValidationError({name: 'A non-negative integer is required.'})
+        if value < 0:
+            raise ValidationError({name: 'A non-negative integer is required.'})
+        return value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest first keyset pagination on (create_at, id).
+    The cursor holds the last row of the page, and the next page starts right
+    after it with an indexed range condition instead of an offset, so deep
+    pages cost the same as the first one.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by('-create_at', '-id')
+        if (cursor := request.query_params.get(self.cursor_query_param)) is not None:
+            create_at, pk = self.decode_cursor(cursor)
+            # The leading bound lets the index seek to the cursor; the OR alone would not.
+            queryset = queryset.filter(
+                Q(create_at__lt=create_at) | Q(id__lt=pk), create_at__lte=create_at
+                )
+        rows = list(queryset[:page_size + 1])
+        self.next_position = (rows[page_size - 1].create_at, rows[page_size - 1].pk) if len(rows) > page_size else None
+        return rows[:page_size]
+
+    def get_page_size(self, request) -> int:
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: 'A positive integer is required.'})
+        if value < 1:
+            raise ValidationError({self.page_size_query_param: 'A positive integer is required.'})
+        return min(value, self.max_page_size)
+
+    def encode_cursor(self, position: tuple) -> str:
+        create_at, pk = position
+        return base64.urlsafe_b64encode(json.dumps([create_at.isoformat(), str(pk)]).encode()).decode()
+
+    def decode_cursor(self, cursor: str) -> tuple:
+        try:
+            create_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            create_at, pk = parse_datetime(create_at), UUID(pk)
+        except (TypeError, ValueError):
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+        if create_at is None:
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+        return create_at, pk
+
+    def get_next_link(self) -> str | None:
+        if self.next_position is None:
+            return None
+        query = self.request.query_params.copy()
+        query[self.cursor_query_param] = self.encode_cursor(self.next_position)
+        return self.request.build_absolute_uri(f"{self.request.path}?{query.urlencode()}")
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'format': 'uri', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query', 'schema': {'type': 'string'},
+             'description': 'Cursor of the next page, taken from `next`.'},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query', 'schema': {'type': 'integer'},
+             'description': 'Number of results to return per page.'},
+        ]
+
+
+class SearchPagination(LimitOffsetPagination):
+    """
+    Pages of ranked search results. Matches are not counted, since counting
+    them costs as much as ranking them; `next` is set while more follow.
+    """
+    default_limit = 20
+    max_limit = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        # Enough for the links of LimitOffsetPagination.
+        self.count = self.offset + len(rows)
+        return rows[:self.limit]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        del schema['properties']['count']
+        return schema
@@ -1,15 +1,69 @@
 from rest_framework import permissions
+from django.db.models import Exists, OuterRef, Q
+from .acl import get_work_spaces, set_work_spaces
 from .models import TaskList, WorkSpace
 
+
+def user_work_spaces(user) -> tuple:
+    """
+    Returns the ids of the active workspaces the user owns and of those they are
+    a member of. They are loaded with one query and kept in the acl cache.
+    """
+    version, cached = get_work_spaces(user.pk)
+    if cached is not None:
+        return cached
+    memberships = WorkSpace.members.through.objects.filter(workspace=OuterRef('pk'), user=user.pk)
+    owned, membered = set(), set()
+    for pk, owner_id, is_member in WorkSpace.objects.annotate(
+        is_member=Exists(memberships)
+        ).filter(Q(owner=user.pk) | Q(is_member=True)).values_list('pk', 'owner', 'is_member'):
+        if owner_id == user.pk:
+            owned.add(pk)
+        if is_member:
+            membered.add(pk)
+    owned, membered = frozenset(owned), frozenset(membered)
+    set_work_spaces(user.pk, version, owned, membered)
+    return owned, membered
+
+
+def has_work_spaces_access(user, work_space_ids) -> bool:
+    """
+    Checks that the user owns or is a member of every given workspace.
+    """
+    owned, membered = user_work_spaces(user)
+    return set(work_space_ids) <= owned | membered
+
+
+def work_space_role(request, work_space_id) -> tuple:
+    """
+    Returns whether the requesting user is the owner and whether they are a member
+    of the workspace. The workspaces of the user come from the acl cache and are
+    memoized on the request.
+    """
+    request_state = vars(request)
+    if '_user_work_spaces' not in request_state:
+        request_state['_user_work_spaces'] = user_work_spaces(request.user)
+    owned, membered = request_state['_user_work_spaces']
+    return work_space_id in owned, work_space_id in membered
+
+
+def is_work_space_owner(request, work_space_id) -> bool:
+    return work_space_role(request, work_space_id)[0]
+
+
+def has_work_space_access(request, work_space_id) -> bool:
+    return any(work_space_role(request, work_space_id))
+
+
 class WorkspacePermissions(permissions.IsAuthenticated):
 
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
-            return request.user in obj.members.all() or request.user == obj.owner
+            return has_work_space_access(request, obj.pk)
         elif request.method in ['POST', 'DELETE', 'PUT', 'PATCH',]:
-            return request.user == obj.owner
+            return request.user.pk == obj.owner_id
         return False
-    
+
 class TaskPermissions(permissions.IsAuthenticated):
 
     # def has_permission(self, request, view):
@@ -19,8 +73,8 @@ class TaskPermissions(permissions.IsAuthenticated):
 
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS + ('POST', 'DELETE', 'PUT', 'PATCH',):
-            return request.user in obj.status.board.work_space.members.all() or request.user == obj.status.board.work_space.owner
-        
+            return has_work_space_access(request, obj.work_space_id)
+
         return False
 
 
@@ -28,17 +82,17 @@ class AttachmentPermissions(permissions.IsAuthenticated):
 
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
-            return request.user in obj.task.status.board.work_space.members.all() or request.user == obj.task.status.board.work_space.owner
+            return has_work_space_access(request, obj.work_space_id)
         elif request.method in ['POST', 'DELETE', 'PUT', 'PATCH',]:
-            return request.user == obj.owner or request.user == obj.task.status.board.work_space.owner
+            return request.user.pk == obj.owner_id or is_work_space_owner(request, obj.work_space_id)
 
 class BoardPermission(permissions.IsAuthenticated):
 
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS + ('POST', 'PUT', 'PATCH',):
-            return request.user in obj.work_space.members.all() or request.user == obj.work_space.owner
+            return has_work_space_access(request, obj.work_space_id)
         elif request.method == 'DELETE':
-            return request.user == obj.work_space.owner
+            return is_work_space_owner(request, obj.work_space_id)
         return False
 
 
@@ -46,8 +100,8 @@ class TaskListPermissions(permissions.IsAuthenticated):
 
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS + ('POST', 'DELETE', 'PUT', 'PATCH',):
-            return request.user in obj.board.work_space.members.all() or request.user == obj.board.work_space.owner
-        
+            return has_work_space_access(request, obj.board.work_space_id)
+
 
         return False
 
@@ -56,16 +110,15 @@ class LabelPermission(permissions.IsAuthenticated):
 
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS + ('POST', 'DELETE', 'PUT', 'PATCH',):
-            return request.user in obj.board.work_space.members.all() or request.user == obj.board.work_space.owner
-        
+            return has_work_space_access(request, obj.board.work_space_id)
+
         return False
 
 
 class CommentPermission(permissions.IsAuthenticated):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
-            return request.user in obj.task.status.board.work_space.members.all() or request.user == obj.task.status.board.work_space.owner
+            return has_work_space_access(request, obj.work_space_id)
         elif request.method in ['POST', 'DELETE', 'PUT', 'PATCH']:
-            return request.user == obj.author or request.user == obj.task.status.board.work_space.owner
+            return request.user.pk == obj.author_id or is_work_space_owner(request, obj.work_space_id)
         return False
-
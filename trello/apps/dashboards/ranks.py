@@ -0,0 +1,103 @@
+"""
+Fractional ordering keys for tasks.
+
+A rank is a string over DIGITS that never ends with the smallest digit, so there
+is always room for another key between two neighbours. Keys compare as plain
+strings, which lets the database order tasks by an indexed column.
+"""
+from string import ascii_lowercase, digits
+
+DIGITS = digits + ascii_lowercase
+RANK_MAX_LENGTH = 32
+RANK_REBALANCE_LENGTH = 24
+# Digits an appended key grows by once every key of its length is taken.
+RANK_APPEND_GROWTH = 2
+
+
+def key_between(before: str = '', after: str | None = None) -> str:
+    """
+    Returns a key that sorts strictly between `before` and `after`.
+    An empty `before` means the start of the list and a missing `after` its end;
+    keys after the last one are counted up by `key_after`.
+    """
+    if after is not None and not before < after:
+        raise ValueError(f'{before!r} must sort before {after!r}')
+    if after is None and before:
+        return key_after(before)
+    return _midpoint(before, after)
+
+
+def _midpoint(before: str, after: str | None) -> str:
+    if after is not None:
+        # Keep the shared prefix and find the midpoint of the remainders.
+        prefix = 0
+        while prefix < len(after) and (before[prefix] if prefix < len(before) else DIGITS[0]) == after[prefix]:
+            prefix += 1
+        if prefix:
+            return after[:prefix] + _midpoint(before[prefix:], after[prefix:])
+    low = DIGITS.index(before[0]) if before else 0
+    high = DIGITS.index(after[0]) if after is not None else len(DIGITS)
+    if high - low > 1:
+        return DIGITS[(low + high + 1) // 2]
+    if after is not None and len(after) > 1:
+        return after[:1]
+    return DIGITS[low] + _midpoint(before[1:], None)
+
+
+def key_after(before: str) -> str:
+    """
+    Returns the next key after `before` of the same length, skipping keys that
+    end with the smallest digit. Once `before` is the largest key of its length,
+    the key grows by RANK_APPEND_GROWTH digits, so appends only lengthen keys
+    every few thousand steps instead of every few halvings of the rest of the range.
+    """
+    base = len(DIGITS)
+    value = 0
+    for char in before:
+        value = value * base + DIGITS.index(char)
+    value += 1
+    if value % base == 0:
+        value += 1
+    if value >= base ** len(before):
+        return before + DIGITS[0] * (RANK_APPEND_GROWTH - 1) + DIGITS[1]
+    key = ''
+    for _ in before:
+        value, digit = divmod(value, base)
+        key = DIGITS[digit] + key
+    return key
+
+
+def keys_between(before: str = '', after: str | None = None, count: int = 1) -> list:
+    """
+    Returns `count` ascending keys between `before` and `after`, splitting the gap
+    evenly so the keys stay short. Keys after the last one are counted up.
+    """
+    if count <= 0:
+        return []
+    if after is None:
+        keys = [key_between(before)]
+        while len(keys) < count:
+            keys.append(key_after(keys[-1]))
+        return keys
+    middle = key_between(before, after)
+    half = (count - 1) // 2
+    return keys_between(before, middle, half) + [middle] + keys_between(middle, after, count - 1 - half)
+
+
+def spread_keys(count: int) -> list:
+    """
+    Returns `count` short, evenly spaced keys in ascending order.
+    """
+    width = 1
+    while len(DIGITS) ** width <= count:
+        width += 1
+    step = len(DIGITS) ** width // (count + 1)
+    keys = []
+    for position in range(1, count + 1):
+        value = step * position
+        key = ''
+        for _ in range(width):
+            value, digit = divmod(value, len(DIGITS))
+            key = DIGITS[digit] + key
+        keys.append(key.rstrip(DIGITS[0]))
+    return keys
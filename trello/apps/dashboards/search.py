@@ -0,0 +1,84 @@
+"""
+Full-text search over the tasks, comments and attachments of workspaces.
+
+Every active task, comment and attachment has a SearchEntry row with its
+title and body, kept in step by signal handlers. The inverted index over
+those rows is the database's own: an external content FTS5 table, synced by
+triggers, on SQLite, and a generated tsvector column with a GIN index on
+PostgreSQL. Both are created by the migration of SearchEntry. `search`
+matches and ranks entries the same way on either.
+"""
+import re
+from django.db import NotSupportedError, connections
+from django.db.models.expressions import RawSQL
+
+# Terms of a query that are matched; the rest are ignored.
+SEARCH_MAX_TERMS = 10
+# Text search configuration of PostgreSQL; the SQLite tokenizer stems alike.
+SEARCH_CONFIG = 'english'
+SQLITE_TOKENIZER = 'porter unicode61 remove_diacritics 2'
+# Weights of titles over bodies.
+SEARCH_TITLE_WEIGHT = 10.0
+
+_TERM = re.compile(r'\w+')
+
+
+def search_terms(query: str) -> list:
+    """
+    Returns the words of a query, which both backends match as plain tokens.
+    """
+    return _TERM.findall(query.lower())[:SEARCH_MAX_TERMS]
+
+
+class SQLiteSearch:
+    table = 'dashboards_searchentry_fts'
+
+    def match(self, terms: list) -> str:
+        # Quoted terms are matched literally; the last one as a prefix, as typed.
+        return ' '.join(f'"{term}"' for term in terms) + '*'
+
+    def filter(self, queryset, terms: list):
+        entries = queryset.model._meta.db_table
+        return queryset.extra(
+            tables=[self.table],
+            where=[f'{self.table}.rowid = {entries}.id', f'{self.table} MATCH %s'],
+            params=[self.match(terms)],
+            select={'rank': f'-bm25({self.table}, {SEARCH_TITLE_WEIGHT}, 1.0)'},
+            )
+
+
+class PostgresSearch:
+
+    def match(self, terms: list) -> str:
+        return ' & '.join(terms) + ':*'
+
+    def filter(self, queryset, terms: list):
+        document = f'{queryset.model._meta.db_table}.document'
+        query = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+        # Weights of the D, C, B (bodies) and A (titles) labels of the document.
+        weights = f"'{{0, 0, {1 / SEARCH_TITLE_WEIGHT}, 1}}'"
+        match = self.match(terms)
+        return queryset.annotate(
+            rank=RawSQL(f'ts_rank_cd({weights}, {document}, {query})', (match,))
+            ).extra(where=[f'{document} @@ {query}'], params=[match])
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearch(),
+    'postgresql': PostgresSearch(),
+}
+
+
+def search(queryset, query: str):
+    """
+    Returns the SearchEntry rows of `queryset` that hold every word of
+    `query`, the last one as a prefix, best matches first. Titles weigh
+    more than bodies.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    vendor = connections[queryset.db].vendor
+    if vendor not in BACKENDS:
+        raise NotSupportedError(f'Full-text search is not supported on {vendor}.')
+    return BACKENDS[vendor].filter(queryset, terms).order_by('-rank', 'id')
@@ -1,24 +1,66 @@
+from urllib.parse import urlencode
+from django.urls import reverse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from trello.apps.accounts.models import User
-from .models import Activity, Attachment, Board, Comment, Label, Task, TaskList, WorkSpace
+from trello.apps.core.serializers import ValuesListSerializer
+from .models import COMMENT_MAX_DEPTH, TASK_RECENT_LIMIT, Activity, Attachment, Board, Change, Comment, Label, SearchEntry, Task, TaskList, \
+    UploadSession, WorkSpace
+from . import uploads
+from .pagination import KeysetPagination
+from .permissions import user_work_spaces
 import traceback
 from rest_framework.utils import model_meta
 from rest_framework.exceptions import ValidationError
 from django.core.exceptions import ObjectDoesNotExist
 
+class SparseFieldsMixin:
+    """
+    Renders only the fields named in `fields`, when given, plus the relations
+    of Meta.expandable_fields named in `expand`. Without `fields` the fields
+    that are not expandable are rendered; without either, every field is.
+    Write-only fields are always kept, so input validates as usual.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        self.requested_fields = fields
+        self.requested_expand = expand
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.requested_fields is None and self.requested_expand is None:
+            return fields
+        readable = {name for name, field in fields.items() if not field.write_only}
+        expandable = set(self.Meta.expandable_fields)
+        errors = {}
+        if unknown := set(self.requested_fields or ()) - readable:
+            errors['fields'] = f"Unknown fields: {', '.join(sorted(unknown))}."
+        if unknown := set(self.requested_expand or ()) - expandable:
+            errors['expand'] = f"Unknown relations: {', '.join(sorted(unknown))}."
+        if errors:
+            raise ValidationError(errors)
+        selected = readable - expandable if self.requested_fields is None else set(self.requested_fields)
+        selected |= set(self.requested_expand or ())
+        return {name: field for name, field in fields.items() if name in selected or field.write_only}
+
+
 class UserListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
         fields = ['id', 'first_name', 'last_name', 'email', 'avatar', ]
+        list_serializer_class = ValuesListSerializer
 
 
 class BoardListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Board
         fields = ['id', 'title','update_at', 'create_at', ]
+        list_serializer_class = ValuesListSerializer
 
-class WorkspaceSerializer(serializers.ModelSerializer):
+class WorkspaceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     work_space_boards = BoardListSerializer(many=True, read_only=True)
     owner = UserListSerializer(read_only=True)
     members = UserListSerializer(many=True, read_only=True)
@@ -32,6 +74,7 @@ class WorkspaceSerializer(serializers.ModelSerializer):
         model = WorkSpace
         exclude = ['is_active']
         read_only_fields = ['update_at', 'create_at']
+        expandable_fields = ['work_space_boards', 'owner', 'members']
 
     def create(self, validated_data):
         validated_data['members'] = validated_data.pop("add_members")
@@ -69,7 +112,8 @@ class WorkspaceAddMemberSerializer(serializers.Serializer):
 class TaskListListSerializer(serializers.ModelSerializer):
     class Meta:
         model = TaskList
-        fields = ["id", 'title']
+        fields = ["id", 'title', 'tasks_count']
+        list_serializer_class = ValuesListSerializer
 
 class LabelListSerializer(serializers.ModelSerializer):
     class Meta:
@@ -79,7 +123,7 @@ class LabelListSerializer(serializers.ModelSerializer):
 class CommentListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
-        exclude = ['is_active']
+        exclude = ['is_active', 'path']
 
 class AttachmentListSerializer(serializers.ModelSerializer):
     class Meta:
@@ -92,21 +136,66 @@ class ActivityListSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class TaskSerializer(serializers.ModelSerializer):
+@extend_schema_field(OpenApiTypes.OBJECT)
+class RecentRelationField(serializers.Field):
+    """
+    Renders the newest rows of a task relation with their total number and a
+    link to the rest of them in the paginated list at `url_name`.
+    Reads `recent_<name>` and `<name>_count`, as set by
+    `Task.with_recent_relations`, and queries them when they are missing.
+    """
+
+    def __init__(self, child, name: str, url_name: str, **kwargs):
+        self.child = child
+        self.name = name
+        self.url_name = url_name
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.child.bind(field_name='', parent=self)
+
+    def get_attribute(self, instance):
+        # The field is named after the relation, which it reads through the task.
+        return instance
+
+    def to_representation(self, task):
+        relation = getattr(task, f'task_{self.name}')
+        rows = getattr(task, f'recent_{self.name}', None)
+        if rows is None:
+            rows = list(relation.order_by('-create_at', '-id')[:TASK_RECENT_LIMIT])
+        count = getattr(task, f'{self.name}_count', None)
+        if count is None:
+            count = relation.count()
+        return {
+            'count': count,
+            'next': self.get_next_link(task, rows) if rows and count > len(rows) else None,
+            'results': [self.child.to_representation(row) for row in rows],
+        }
+
+    def get_next_link(self, task, rows: list) -> str:
+        cursor = KeysetPagination().encode_cursor((rows[-1].create_at, rows[-1].pk))
+        url = f"{reverse(self.url_name, args=[task.pk])}?{urlencode({KeysetPagination.cursor_query_param: cursor})}"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
 
     obj_status = TaskListListSerializer(read_only=True, source='status')
     obj_labels = LabelListSerializer(many=True, read_only=True, source='labels')
     labels=serializers.PrimaryKeyRelatedField(queryset=Label.objects.all(), many=True, write_only=True)
     obj_assigned_to = UserListSerializer(many=True, read_only=True, source='assigned_to')
     assigned_to = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), many=True, write_only=True)
-    task_comments = CommentListSerializer(many=True, read_only=True)
-    task_attachments = AttachmentListSerializer(many=True, read_only=True)
-    task_activity = ActivityListSerializer(many=True, read_only=True)
+    task_comments = RecentRelationField(CommentListSerializer(), 'comments', 'dashboards:task-comments')
+    task_attachments = RecentRelationField(AttachmentListSerializer(), 'attachments', 'dashboards:task-attachments')
+    task_activity = RecentRelationField(ActivityListSerializer(), 'activity', 'dashboards:task-activities')
 
     class Meta:
         model = Task
         exclude = ['is_active']
         read_only_fields = ['update_at', 'create_at']
+        expandable_fields = [
+            'obj_status', 'obj_labels', 'obj_assigned_to', 'task_comments', 'task_attachments', 'task_activity',
+            ]
         extra_kwargs = {
             'description': {'required': False},
             'status': {'write_only':True},
@@ -244,19 +333,129 @@ class AttachmentSerializer(serializers.ModelSerializer):
         return instance
     
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for starting an upload session and reading how far it got.
+    """
+    checksum = serializers.RegexField(r'^[0-9a-f]{64}$', help_text='SHA-256 hex digest of the uploaded file')
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'task', 'filename', 'size', 'checksum', 'received', 'chunk_size', 'create_at', 'update_at']
+        read_only_fields = ['received', 'create_at', 'update_at']
+        extra_kwargs = {
+            'size': {'min_value': 1, 'max_value': uploads.UPLOAD_MAX_SIZE},
+        }
+
+    def get_chunk_size(self, session) -> int:
+        return uploads.UPLOAD_CHUNK_SIZE
+
+
+class UploadChunkSerializer(serializers.Serializer):
+    """
+    Serializer for the offset of a chunk, checked against the upload session
+    in the context. Chunks start at multiples of the chunk size, up to the
+    first byte not received yet, and fill the request body.
+    """
+    offset = serializers.IntegerField(min_value=0)
+
+    def validate_offset(self, offset):
+        session = self.context['session']
+        if offset % uploads.UPLOAD_CHUNK_SIZE or offset >= session.size:
+            raise ValidationError('Offset must be the start of a chunk of the file')
+        if offset > session.received:
+            raise ValidationError(f'Chunks must be sent in order; {session.received} bytes were received')
+        length = self.context['request'].META.get('CONTENT_LENGTH')
+        if length != str(session.chunk_length(offset)):
+            raise ValidationError(f'Chunk at this offset must be {session.chunk_length(offset)} bytes')
+        return offset
+
+
 class TaskModelListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
-        fields = ['id', 'title', 'order', 'labels', 'start_date', 'end_date', 'assigned_to', ]
+        fields = ['id', 'title', 'order', 'rank', 'labels', 'start_date', 'end_date', 'assigned_to', ]
+        list_serializer_class = ValuesListSerializer
 
 
-class TaskListSerializer(serializers.ModelSerializer):
+class TaskMoveSerializer(serializers.Serializer):
+    """
+    Serializer for moving a task between two neighbours or to the end of a task list.
+    """
+    before = serializers.PrimaryKeyRelatedField(queryset=Task.objects.all(), required=False, allow_null=True)
+    after = serializers.PrimaryKeyRelatedField(queryset=Task.objects.all(), required=False, allow_null=True)
+    status = serializers.PrimaryKeyRelatedField(queryset=TaskList.objects.all(), required=False, allow_null=True)
+
+    def validate(self, attrs):
+        task = self.context['task']
+        before = attrs.get('before', None)
+        after = attrs.get('after', None)
+        if task in (before, after):
+            raise ValidationError('Task can not be its own neighbour')
+        statuses = {obj.status_id if isinstance(obj, Task) else obj.pk
+                    for obj in (before, after, attrs.get('status', None)) if obj is not None}
+        if len(statuses) > 1:
+            raise ValidationError('Neighbours must be in the target task list')
+        if before is not None and after is not None and before.rank > after.rank:
+            raise ValidationError('Before must be ordered above after')
+        target = statuses.pop() if statuses else task.status_id
+        if not TaskList.objects.filter(pk=target, board=task.status.board_id).exists():
+            raise ValidationError('Task can only be moved inside its board')
+        return super().validate(attrs)
+
+
+class TaskBulkMoveItemSerializer(serializers.Serializer):
+    task = serializers.UUIDField()
+    status = serializers.UUIDField()
+    position = serializers.IntegerField(min_value=0)
+
+
+class TaskBulkMoveSerializer(serializers.Serializer):
+    """
+    Serializer for moving many tasks at once.
+    Tasks and task lists are resolved in bulk, so validation runs a fixed number of queries,
+    and only within the workspaces of the requesting user, so those of other workspaces
+    cannot be told apart from missing ones.
+    """
+    moves = TaskBulkMoveItemSerializer(many=True, allow_empty=False)
+
+    def validate_moves(self, value):
+        task_ids = [move['task'] for move in value]
+        if len(set(task_ids)) != len(task_ids):
+            raise ValidationError('Each task can only be moved once')
+        owned, membered = user_work_spaces(self.context['request'].user)
+        work_space_ids = owned | membered
+        tasks = Task.objects.filter(work_space__in=work_space_ids).in_bulk(task_ids)
+        statuses = TaskList.objects.select_related('board').filter(
+            board__work_space__in=work_space_ids
+            ).in_bulk({move['status'] for move in value})
+        moves = []
+        for move in value:
+            task = tasks.get(move['task'])
+            status = statuses.get(move['status'])
+            if task is None or status is None:
+                raise ValidationError('Task or task list does not exist')
+            if task.board_id != status.board_id:
+                raise ValidationError('Task can only be moved inside its board')
+            moves.append((task, status, move['position']))
+        return moves
+
+
+class TaskPositionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = ['id', 'status', 'rank', ]
+
+
+class TaskListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     list_board = BoardListSerializer(read_only=True, source='board')
     status_tasks = TaskModelListSerializer(read_only=True, many=True)
 
     class Meta:
         model = TaskList
-        fields = ['id', 'title', 'list_board', 'board', 'status_tasks', ]
+        fields = ['id', 'title', 'tasks_count', 'list_board', 'board', 'status_tasks', ]
+        expandable_fields = ['list_board', 'status_tasks']
         extra_kwargs = {
             'board':{'write_only':True}
         }
@@ -273,7 +472,7 @@ class WorkSpaceListSerializer(serializers.ModelSerializer):
             ]
 
 
-class BoardSerializer(serializers.ModelSerializer):
+class BoardSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     board_work_space = WorkSpaceListSerializer(read_only=True, source='work_space')
     board_Tasklists = TaskListListSerializer(read_only=True, many=True)
 
@@ -287,11 +486,120 @@ class BoardSerializer(serializers.ModelSerializer):
             'work_space', 
             'board_Tasklists', 
             ]
+        expandable_fields = ['board_work_space', 'board_Tasklists']
         extra_kwargs = {
             'work_space': {'write_only':True}
         }
 
 
+class TaskSnapshotSerializer(serializers.ModelSerializer):
+    assigned_to = UserListSerializer(many=True, read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)
+    attachments_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Task
+        fields = [
+            'id', 
+            'title', 
+            'rank', 
+            'start_date', 
+            'end_date', 
+            'labels', 
+            'assigned_to', 
+            'comments_count', 
+            'attachments_count', 
+            ]
+        read_only_fields = fields
+
+
+class TaskListSnapshotSerializer(serializers.ModelSerializer):
+    status_tasks = TaskSnapshotSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = TaskList
+        fields = ['id', 'title', 'tasks_count', 'status_tasks', ]
+
+
+class BoardSnapshotSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a whole board, loaded with `Board.load_snapshot`.
+    """
+    board_work_space = WorkSpaceListSerializer(read_only=True, source='work_space')
+    board_labels = LabelListSerializer(many=True, read_only=True)
+    board_Tasklists = TaskListSnapshotSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Board
+        fields = [
+            'id', 
+            'title', 
+            'background_image', 
+            'board_work_space', 
+            'board_labels', 
+            'board_Tasklists', 
+            ]
+
+
+class WorkSpaceSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WorkSpace
+        exclude = ['is_active']
+
+
+class BoardSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Board
+        exclude = ['is_active']
+
+
+class TaskListSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TaskList
+        exclude = ['is_active']
+
+
+class LabelSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Label
+        fields = '__all__'
+
+
+class TaskSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        exclude = ['is_active']
+
+
+class ChangeSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a change log entry with the current state of its object,
+    looked up in the `objects` of the context.
+    """
+    data_serializers = {
+        'workspace': WorkSpaceSyncSerializer,
+        'board': BoardSyncSerializer,
+        'tasklist': TaskListSyncSerializer,
+        'label': LabelSyncSerializer,
+        'task': TaskSyncSerializer,
+        'comment': CommentListSerializer,
+        'attachment': AttachmentListSerializer,
+    }
+    cursor = serializers.IntegerField(source='id', read_only=True)
+    data = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Change
+        fields = ['cursor', 'model', 'object_id', 'action', 'board', 'create_at', 'data', ]
+        read_only_fields = fields
+
+    def get_data(self, change) -> dict | None:
+        obj = self.context['objects'].get((change.model, change.object_id))
+        if obj is None:
+            return None
+        return self.data_serializers[change.model](obj, context=self.context).data
+
+
 class LabelSerializer(serializers.ModelSerializer):
     """
      Serializer for creating and updating labels.
@@ -310,9 +618,19 @@ class CommentSerializer(serializers.ModelSerializer):
     author = UserListSerializer(read_only=True)
     class Meta:
         model = Comment
-        exclude =('is_active',)
+        exclude =('is_active', 'path')
         read_only_fields = ['update_at', 'create_at']
 
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        parent = attrs.get('parent')
+        if parent is None or self.instance is not None:
+            return attrs
+        if parent.task_id != attrs['task'].pk:
+            raise ValidationError('Replies must be on the task of their parent')
+        if parent.depth + 1 >= COMMENT_MAX_DEPTH:
+            raise ValidationError(f'Threads can only be {COMMENT_MAX_DEPTH} comments deep')
+        return attrs
 
     def create(self, validated_data):
         """
@@ -333,3 +651,33 @@ class CommentSerializer(serializers.ModelSerializer):
         instance.update_comment(body=body)
         return instance
 
+
+class CommentThreadSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a comment with its replies nested under it, as loaded by
+    `Comment.load_threads`.
+    """
+    author = UserListSerializer(read_only=True)
+    replies = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Comment
+        exclude = ('is_active', 'path')
+
+    @extend_schema_field(serializers.ListField(child=serializers.DictField()))
+    def get_replies(self, comment) -> list:
+        return CommentThreadSerializer(comment.thread_replies, many=True, context=self.context).data
+
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a search match: the indexed object, where it lives and
+    how well it matched.
+    """
+    board = serializers.UUIDField(read_only=True)
+    work_space = serializers.UUIDField(read_only=True)
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = SearchEntry
+        fields = ['model', 'object_id', 'task', 'board', 'work_space', 'title', 'body', 'rank']
@@ -0,0 +1,230 @@
+from functools import partial
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from trello.apps.core.signals import pre_set_active
+from . import fragments, uploads
+from .acl import invalidate_work_spaces
+from .events import ChangeAction
+from .models import Activity, Attachment, Board, Change, Comment, Label, SearchEntry, Task, TaskList, UploadSession, \
+    WorkSpace
+
+LOGGED_MODELS = (WorkSpace, Board, TaskList, Label, Task, Comment, Attachment)
+INDEXED_MODELS = (Task, Comment, Attachment)
+
+
+@receiver(m2m_changed, sender=WorkSpace.members.through)
+def invalidate_members_work_spaces(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Drops the cached workspaces of users added to or removed from a workspace.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        invalidate_work_spaces([instance.pk])
+    elif action == 'pre_clear':
+        invalidate_work_spaces(instance.members.values_list('pk', flat=True))
+    else:
+        invalidate_work_spaces(pk_set)
+
+
+@receiver(post_save, sender=WorkSpace)
+def invalidate_owner_work_spaces(sender, instance, created, **kwargs):
+    """
+    Drops the cached workspaces of the owners of a new workspace, of one that
+    changed hands and of everyone in a workspace archived or restored by a save.
+    """
+    loaded_owner_id, loaded_is_active = getattr(instance, '_loaded_access', (None, None))
+    if created or loaded_owner_id != instance.owner_id:
+        invalidate_work_spaces([loaded_owner_id, instance.owner_id])
+    if loaded_is_active is not None and loaded_is_active != instance.is_active:
+        invalidate_work_spaces([instance.owner_id, *instance.members.values_list('pk', flat=True)])
+    instance._loaded_access = (instance.owner_id, instance.is_active)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_work_spaces(sender, instance, update_fields, **kwargs):
+    """
+    Drops the cached workspaces of a user archived or restored by `User.archive`.
+    """
+    if update_fields is None or 'is_active' in update_fields:
+        invalidate_work_spaces([instance.pk])
+
+
+@receiver(post_delete, sender=Task)
+def release_task_count(sender, instance, **kwargs):
+    """
+    Takes a deleted active task off the counter of its task list, as archiving does.
+    """
+    if instance.is_active:
+        TaskList.shift_tasks_count({instance.status_id: -1})
+
+
+def invalidate_fragments(sender, instance, **kwargs):
+    """
+    Drops the cached fragments of the workspace or board a saved or deleted
+    row belongs to, and of the one it was moved away from.
+    """
+    if isinstance(instance, WorkSpace):
+        fragments.invalidate(work_space_ids=[instance.pk])
+    elif isinstance(instance, Board):
+        fragments.invalidate(board_ids=[instance.pk])
+    else:
+        fragments.invalidate(board_ids=[instance.board_id, getattr(instance, '_loaded_board_id', None)])
+
+
+for model in (WorkSpace, Board, TaskList, Label, Task, Comment, Attachment, Activity):
+    post_save.connect(invalidate_fragments, sender=model)
+    post_delete.connect(invalidate_fragments, sender=model)
+
+
+@receiver(pre_set_active)
+def invalidate_archived_fragments(sender, queryset, is_active, cascaded, **kwargs):
+    """
+    Drops the cached fragments of rows archived or restored in bulk.
+    Children of a cascade live on the boards of its root, so only the root counts.
+    """
+    if cascaded:
+        return
+    if sender is WorkSpace:
+        fragments.invalidate(work_space_ids=queryset.values_list('pk', flat=True))
+    elif sender is Board:
+        fragments.invalidate(board_ids=queryset.values_list('pk', flat=True))
+    elif sender in (TaskList, Task, Comment, Attachment):
+        fragments.invalidate(board_ids=queryset.values_list('board', flat=True).distinct())
+
+
+@receiver(m2m_changed, sender=Task.labels.through)
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def invalidate_task_relations_fragments(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Drops the cached fragments of boards whose tasks got or lost labels or assignees.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse or isinstance(instance, Label):
+        fragments.invalidate(board_ids=[instance.board_id])
+    elif action == 'pre_clear':
+        fragments.invalidate(board_ids=instance.assigned_tasks.values_list('board', flat=True).distinct())
+    else:
+        fragments.invalidate(board_ids=Task.original_objects.filter(pk__in=pk_set).values_list('board', flat=True))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_fragments(sender, instance, created, update_fields, **kwargs):
+    """
+    Drops the cached fragments of the workspaces of a user whose profile changed,
+    since tasks embed their assignees. The workspaces, which embed their owner
+    and members, are touched too, since users have no `update_at` of their own
+    to change the validators of conditional retrieves.
+    """
+    if created or (update_fields is not None and not {'first_name', 'last_name', 'email', 'avatar'} & set(update_fields)):
+        return
+    work_spaces = WorkSpace.original_objects.filter(pk__in=WorkSpace.original_objects.filter(
+        Q(owner=instance) | Q(members=instance)
+        ).values('pk'))
+    fragments.invalidate(work_space_ids=work_spaces.values_list('pk', flat=True))
+    work_spaces.update(update_at=timezone.now())
+
+
+def record_saved_change(sender, instance, created, raw=False, **kwargs):
+    """
+    Logs the creation or update of a row in the change log of its workspace.
+    """
+    if not raw:
+        Change.record(instance, ChangeAction.CREATED if created else ChangeAction.UPDATED)
+
+
+def record_deleted_change(sender, instance, **kwargs):
+    """
+    Logs the deletion of a row in the change log of its workspace.
+    """
+    Change.record(instance, ChangeAction.DELETED)
+
+
+for model in LOGGED_MODELS:
+    post_save.connect(record_saved_change, sender=model)
+    post_delete.connect(record_deleted_change, sender=model)
+
+
+@receiver(pre_set_active)
+def record_archived_changes(sender, queryset, is_active, **kwargs):
+    """
+    Logs every row archived or restored in bulk, cascaded ones included.
+    """
+    if sender in LOGGED_MODELS:
+        Change.record_queryset(queryset, ChangeAction.RESTORED if is_active else ChangeAction.ARCHIVED)
+
+
+LOGGED_RELATIONS = {
+    Task.labels.through: 'labels',
+    Task.assigned_to.through: 'assigned_to',
+    WorkSpace.members.through: 'members',
+}
+
+
+def record_relations_changes(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """
+    Logs tasks whose labels or assignees and workspaces whose members changed.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        Change.record(instance, ChangeAction.UPDATED)
+        return
+    changed = model.original_objects.all()
+    if action == 'pre_clear':
+        changed = changed.filter(**{LOGGED_RELATIONS[sender]: instance})
+    else:
+        changed = changed.filter(pk__in=pk_set)
+    Change.record_queryset(changed, ChangeAction.UPDATED)
+
+
+for through in LOGGED_RELATIONS:
+    m2m_changed.connect(record_relations_changes, sender=through)
+
+
+def index_saved(sender, instance, created, update_fields, raw=False, **kwargs):
+    """
+    Indexes the text of a saved task, comment or attachment, or drops it
+    when the row was archived. Saves of other fields, like moves, are skipped.
+    """
+    if raw or (update_fields is not None and not SearchEntry.INDEXED_FIELDS & set(update_fields)):
+        return
+    if instance.is_active:
+        SearchEntry.index([instance])
+    elif not created:
+        SearchEntry.unindex([instance.pk])
+
+
+def unindex_deleted(sender, instance, **kwargs):
+    SearchEntry.unindex([instance.pk])
+
+
+for model in INDEXED_MODELS:
+    post_save.connect(index_saved, sender=model)
+    post_delete.connect(unindex_deleted, sender=model)
+
+
+@receiver(pre_set_active)
+def index_archived(sender, queryset, is_active, **kwargs):
+    """
+    Indexes rows restored in bulk and drops rows archived in bulk, cascaded ones included.
+    """
+    if sender not in INDEXED_MODELS:
+        return
+    if is_active:
+        SearchEntry.index_queryset(queryset)
+    else:
+        SearchEntry.unindex(queryset.values('pk'))
+
+
+@receiver(post_delete, sender=UploadSession)
+def discard_partial_file(sender, instance, **kwargs):
+    """
+    Removes the partial file of a finished, abandoned or cascaded session once it is gone for good.
+    """
+    transaction.on_commit(partial(uploads.discard, instance.path))
@@ -1,9 +1,43 @@
+import asyncio
+import gc
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import uuid
+from unittest import mock
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import caches
 from django.utils import timezone
-from django.test import TestCase 
+from django.utils.http import http_date
+from django.test import TestCase, TransactionTestCase, override_settings
 from datetime import datetime, timedelta
 from django.contrib.auth import get_user_model
-from trello.apps.dashboards.models import Label, Board ,WorkSpace,Task,TaskList ,Comment , Activity,Attachment
+from trello.apps.dashboards.models import Label, Board ,WorkSpace,Task,TaskList ,Comment , Activity,Attachment, ActivityRecorder, Change
+from trello.apps.dashboards.models import CHANGE_LOG_LOCK, COMMENT_MAX_DEPTH, TASK_RECENT_LIMIT, UPLOAD_SESSION_TTL, SearchEntry, \
+    UploadSession
+from trello.apps.dashboards.serializers import BoardListSerializer, TaskListListSerializer, TaskModelListSerializer, \
+    TaskSerializer, TaskSyncSerializer, UserListSerializer
+from trello.apps.core.responses import JSONStream, StreamingJSONResponse
+from trello.apps.core.serializers import ValuesListSerializer
+from trello.apps.core.storage import blob_name
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.test import AsyncRequestFactory
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+from trello.apps.dashboards.permissions import has_work_space_access, is_work_space_owner, user_work_spaces
+from trello.apps.dashboards import fragments, live, uploads
+from trello.apps.dashboards.acl import set_work_spaces
+from trello.apps.dashboards.views.event_views import board_events
+from trello.apps.dashboards.events import EventType, parse_message
+from trello.apps.dashboards.ranks import RANK_REBALANCE_LENGTH, key_after, key_between, spread_keys
 
 User = get_user_model()
 
@@ -225,6 +259,93 @@ class TaskTestCase(TestCase):
         self.assertCountEqual(activity_messages, expected_messages)
 
 
+    def test_create_task_appends_rank(self):
+        first = Task.create_task(doer=self.owner, title="First", status=self.task_list_2)
+        second = Task.create_task(doer=self.owner, title="Second", status=self.task_list_2)
+        self.assertLess(first.rank, second.rank)
+        self.assertEqual(list(self.task_list_2.status_tasks.all()), [first, second])
+
+    def test_move_writes_only_the_task_row(self):
+        first = Task.create_task(doer=self.owner, title="First", status=self.task_list)
+        second = Task.create_task(doer=self.owner, title="Second", status=self.task_list)
+        self.task.refresh_from_db()
+        # A single UPDATE and its change log INSERT inside the savepoint pair.
+        with self.assertNumQueries(4):
+            self.task.move(doer=self.owner, before=first, after=second)
+        self.assertEqual(list(self.task_list.status_tasks.all()), [first, self.task, second])
+
+        self.task.move(doer=self.owner, after=first)
+        self.assertEqual(list(self.task_list.status_tasks.all()), [self.task, first, second])
+
+    def test_move_to_other_task_list(self):
+        other = Task.create_task(doer=self.owner, title="Other", status=self.task_list_2)
+        self.task.refresh_from_db()
+        self.task.move(doer=self.owner, before=other)
+        self.task_list.refresh_from_db()
+        self.task_list_2.refresh_from_db()
+        self.assertEqual(self.task.status, self.task_list_2)
+        self.assertEqual(list(self.task_list_2.status_tasks.all()), [other, self.task])
+        self.assertEqual(self.task_list.tasks_count, 0)
+        self.assertEqual(self.task_list_2.tasks_count, 2)
+        self.assertEqual(Activity.objects.get(task=self.task).message, f"Task status was changed to {self.task_list_2.title}.")
+
+    def test_move_rebalances_long_ranks(self):
+        first = Task.create_task(doer=self.owner, title="First", status=self.task_list)
+        self.task.refresh_from_db()
+        for _ in range(200):
+            self.task.move(doer=self.owner, after=first)
+            first.move(doer=self.owner, after=self.task)
+            self.task.refresh_from_db()
+        ranks = list(self.task_list.status_tasks.values_list('rank', flat=True))
+        self.assertTrue(all(len(rank) <= RANK_REBALANCE_LENGTH for rank in ranks))
+        self.assertEqual(len(set(ranks)), 2)
+
+    def test_appends_keep_ranks_short(self):
+        with mock.patch.object(TaskList, 'rebalance_ranks') as rebalance_ranks:
+            for index in range(300):
+                Task.create_task(doer=self.owner, title=f"Task {index}", status=self.task_list)
+        rebalance_ranks.assert_not_called()
+        ranks = list(Task.objects.filter(status=self.task_list).values_list('rank', flat=True))
+        self.assertLessEqual(max(map(len, ranks)), 3)
+
+    def test_appends_rebalance_long_ranks(self):
+        appended = [Task.create_task(doer=self.owner, title=f"Task {index}", status=self.task_list) for index in range(3)]
+        Task.objects.filter(pk=appended[-1].pk).update(rank='z' * RANK_REBALANCE_LENGTH)
+        appended.append(Task.create_task(doer=self.owner, title="Task 3", status=self.task_list))
+        moved = Task.objects.create(title="Moved", status=self.task_list_2)
+        moved.update_task(doer=self.owner, status=self.task_list)
+        ranks = list(Task.objects.filter(status=self.task_list).order_by('rank').values_list('pk', 'rank'))
+        self.assertTrue(all(len(rank) <= RANK_REBALANCE_LENGTH for _, rank in ranks))
+        self.assertEqual([pk for pk, _ in ranks], [self.task.pk, *(task.pk for task in appended), moved.pk])
+
+    def test_bulk_move(self):
+        tasks = [Task.create_task(doer=self.owner, title=f"Task {i}", status=self.task_list) for i in range(4)]
+        target = Task.create_task(doer=self.owner, title="Target", status=self.task_list_2)
+        self.task.refresh_from_db()
+        Task.bulk_move(doer=self.owner, moves=[
+            (tasks[3], self.task_list, 0),
+            (tasks[0], self.task_list_2, 0),
+            (tasks[1], self.task_list_2, 5),
+        ])
+        self.assertEqual(list(self.task_list.status_tasks.all()), [tasks[3], self.task, tasks[2]])
+        self.assertEqual(list(self.task_list_2.status_tasks.all()), [tasks[0], target, tasks[1]])
+        self.task_list.refresh_from_db()
+        self.task_list_2.refresh_from_db()
+        self.assertEqual(self.task_list.tasks_count, 3)
+        self.assertEqual(self.task_list_2.tasks_count, 3)
+        self.assertEqual(Activity.objects.filter(message=f"Task status was changed to {self.task_list_2.title}.").count(), 2)
+
+    def test_bulk_move_positions_skip_archived_tasks(self):
+        archived, second, third = [
+            Task.create_task(doer=self.owner, title=title, status=self.task_list_2) for title in ('A', 'B', 'C')
+            ]
+        archived.archive()
+        self.task.refresh_from_db()
+        Task.bulk_move(doer=self.owner, moves=[(self.task, self.task_list_2, 1)])
+        self.assertEqual(list(self.task_list_2.status_tasks.all()), [second, self.task, third])
+        ranks = Task.original_objects.filter(status=self.task_list_2).order_by('rank').values_list('pk', flat=True)
+        self.assertEqual(list(ranks), [archived.pk, second.pk, self.task.pk, third.pk])
+
     def test_get_comment(self):
         comments = self.task.get_comment()
         self.assertCountEqual(comments, [self.comment1, self.comment2])
@@ -334,6 +455,58 @@ class WorkSpaceTestCase(TestCase):
         self.task_1.refresh_from_db()
         self.assertTrue(self.task_1.is_active)
 
+    def test_archive_cascades_to_comments_and_attachments(self):
+        comment = Comment.objects.create(body='Comment', task=self.task_1, author=self.user_ali)
+        attachment = Attachment.objects.create(file='file.pdf', task=self.task_1, owner=self.user_ali)
+
+        touched = self.workspace_ata.archive()
+        self.assertEqual(touched, {
+            'dashboards.WorkSpace': 1,
+            'dashboards.Board': 1,
+            'dashboards.TaskList': 1,
+            'dashboards.Task': 1,
+            'dashboards.Comment': 1,
+            'dashboards.Attachment': 1,
+        })
+        comment.refresh_from_db()
+        self.assertFalse(comment.is_active)
+        attachment.refresh_from_db()
+        self.assertFalse(attachment.is_active)
+        self.assertTrue(self.workspace_ata_2.is_active)
+
+        touched = self.workspace_ata.restore()
+        self.assertEqual(touched['dashboards.Comment'], 1)
+        comment.refresh_from_db()
+        self.assertTrue(comment.is_active)
+
+    def test_archive_statement_count_is_fixed(self):
+        for i in range(5):
+            tasklist = TaskList.objects.create(title=f'List {i}', board=self.board_ata_1_1)
+            Task.objects.create(title=f'Task {i}', description='...', status=tasklist)
+        # One UPDATE and one change log INSERT ... SELECT per model in the subtree,
+        # one search index DELETE per indexed model, the task counter
+        # SELECT/UPDATE, the SELECTs of users and boards whose cached entries
+        # are dropped and the savepoint pair.
+        with self.assertNumQueries(21):
+            touched = self.workspace_ata.archive()
+        self.assertEqual(touched['dashboards.Task'], 6)
+        self.assertEqual(touched['dashboards.TaskList'], 6)
+
+    def test_restore_statement_count_is_fixed(self):
+        for i in range(5):
+            tasklist = TaskList.objects.create(title=f'List {i}', board=self.board_ata_1_1)
+            task = Task.objects.create(title=f'Task {i}', description='...', status=tasklist)
+            Comment.objects.create(body=f'Comment {i}', task=task, author=self.user_ata)
+        self.workspace_ata.archive()
+        # As for archive, plus one search index INSERT ... SELECT per indexed
+        # model rather than one save per restored row.
+        with self.assertNumQueries(24):
+            touched = self.workspace_ata.restore()
+        self.assertEqual(touched['dashboards.Task'], 6)
+        self.assertEqual(touched['dashboards.Comment'], 5)
+        self.assertEqual(SearchEntry.objects.filter(model='comment').count(), 5)
+        self.assertEqual(SearchEntry.objects.filter(model='task').count(), 6)
+
 class BoardTestCase(TestCase):
 
     def setUp(self) -> None:
@@ -393,6 +566,34 @@ class BoardTestCase(TestCase):
         self.assertTrue(self.list_1_1_1.is_active)
         self.task_1.refresh_from_db()
         self.assertTrue(self.task_1.is_active)
+
+    def _assert_located(self, board, work_space):
+        for obj in (self.task_1, self.comment, self.activity):
+            obj.refresh_from_db()
+            self.assertEqual((obj.board_id, obj.work_space_id), (board.id, work_space.id))
+
+    def test_location_follows_moves(self):
+        self.comment = Comment.create_comment('Hi', self.task_1, self.user_ata)
+        self.activity = Activity.objects.get(task=self.task_1)
+        self._assert_located(self.board_ata_1_1, self.workspace_ata)
+
+        list_2 = self.board_ata_1_2.add_tasklist('List Two')
+        self.task_1.status = list_2
+        self.task_1.save()
+        self._assert_located(self.board_ata_1_2, self.workspace_ata)
+        self.assertQuerysetEqual(Comment.objects.get(pk=self.comment.pk).get_author_comments(), [self.comment])
+
+        list_2.board = self.board_ata_1_1
+        list_2.save()
+        self._assert_located(self.board_ata_1_1, self.workspace_ata)
+
+        other_work_space = WorkSpace.objects.create(title='Other', owner=self.user_ata)
+        self.board_ata_1_1.work_space = other_work_space
+        self.board_ata_1_1.save()
+        self._assert_located(self.board_ata_1_1, other_work_space)
+        self.assertQuerysetEqual(
+            self.user_ata.activities_on_board(self.board_ata_1_1), [self.activity]
+            )
    
 class TaskListTestCase(TestCase):
 
@@ -439,6 +640,1466 @@ class TaskListTestCase(TestCase):
         self.task_1.refresh_from_db()
         self.assertTrue(self.task_1.is_active)
 
+    def test_tasks_count_follows_create_archive_restore_and_move(self):
+        self.list_1_1_1.refresh_from_db()
+        self.assertEqual(self.list_1_1_1.tasks_count, 1)
+        task_2 = self.list_1_1_1.add_task(doer=self.user_ata, title='Task Two')
+        self.assertEqual(task_2.order, 2)
+        self.list_1_1_1.refresh_from_db()
+        self.assertEqual(self.list_1_1_1.tasks_count, 2)
+
+        task_2.archive()
+        self.list_1_1_1.refresh_from_db()
+        self.assertEqual(self.list_1_1_1.tasks_count, 1)
+        task_2.restore()
+        self.list_1_1_1.refresh_from_db()
+        self.assertEqual(self.list_1_1_1.tasks_count, 2)
+
+        task = Task.objects.get(id=self.task_1.id)
+        task.update_task(doer=self.user_ata, status=self.list_1_1_2)
+        self.list_1_1_1.refresh_from_db()
+        self.list_1_1_2.refresh_from_db()
+        self.assertEqual(self.list_1_1_1.tasks_count, 1)
+        self.assertEqual(self.list_1_1_2.tasks_count, 1)
+
+        self.board_ata_1_1.archive()
+        self.list_1_1_1.refresh_from_db()
+        self.assertEqual(self.list_1_1_1.tasks_count, 0)
+        self.board_ata_1_1.restore()
+        self.list_1_1_1.refresh_from_db()
+        self.assertEqual(self.list_1_1_1.tasks_count, 1)
+
+    def test_tasks_count_follows_stale_creates_and_deletes(self):
+        stale = TaskList.objects.get(id=self.list_1_1_1.id)
+        task_2 = self.list_1_1_1.add_task(doer=self.user_ata, title='Task Two')
+        task_3 = stale.add_task(doer=self.user_ata, title='Task Three')
+        self.assertEqual((task_2.order, task_3.order), (2, 3))
+        self.assertEqual(stale.tasks_count, 3)
+
+        task_3.delete()
+        task_2.archive()
+        Task.original_objects.get(id=task_2.id).delete()
+        self.list_1_1_1.refresh_from_db()
+        self.assertEqual(self.list_1_1_1.tasks_count, 1)
+        self.assertEqual(TaskList.repair_tasks_count(), 0)
+
+    def test_repair_tasks_count(self):
+        Task.objects.bulk_create([
+            Task(title='Bulk', description='...', status=self.list_1_1_2) for _ in range(3)
+        ])
+        TaskList.objects.filter(id=self.list_1_1_1.id).update(tasks_count=7)
+        self.assertEqual(TaskList.repair_tasks_count(), 2)
+        self.list_1_1_1.refresh_from_db()
+        self.list_1_1_2.refresh_from_db()
+        self.assertEqual(self.list_1_1_1.tasks_count, 1)
+        self.assertEqual(self.list_1_1_2.tasks_count, 3)
+        self.assertEqual(TaskList.repair_tasks_count(), 0)
+
+class TaskBulkMoveAPITestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.stranger = User.objects.create_user(email="stranger@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.task_list_2 = TaskList.objects.create(title="Done", board=self.board)
+        self.tasks = [Task.objects.create(title=f"Task {i}", status=self.task_list) for i in range(12)]
+        self.client = APIClient()
+        self.url = reverse('dashboards:task-bulk-move')
+
+    def _moves(self, tasks):
+        return {'moves': [
+            {'task': str(task.id), 'status': str(self.task_list_2.id), 'position': position}
+            for position, task in enumerate(tasks)
+        ]}
+
+    def test_bulk_move_runs_constant_queries(self):
+        self.client.force_authenticate(self.owner)
+        user_work_spaces(self.owner)
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.post(self.url, self._moves(self.tasks[:2]), format='json')
+        self.assertEqual(response.status_code, 200)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.post(self.url, self._moves(self.tasks[2:]), format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(list(self.task_list_2.status_tasks.all()), self.tasks[2:] + self.tasks[:2])
+
+    def test_bulk_move_requires_membership(self):
+        self.client.force_authenticate(self.stranger)
+        response = self.client.post(self.url, self._moves(self.tasks[:2]), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.task_list_2.status_tasks.exists())
+        # Tasks of other workspaces are reported like missing ones.
+        self.client.force_authenticate(self.owner)
+        missing = self.client.post(self.url, {'moves': [
+            {'task': str(uuid.uuid4()), 'status': str(self.task_list_2.id), 'position': 0},
+            ]}, format='json')
+        self.assertEqual(missing.status_code, 400)
+        self.assertEqual(response.data, missing.data)
+
+
+
+class PermissionQueryCountAPITestCase(TestCase):
+    """
+    Object permissions read workspace membership from the acl cache, so with a
+    warm cache retrieve, update and delete run a fixed number of queries per viewset.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.member = User.objects.create_user(email="member@example.com", password="password")
+        self.stranger = User.objects.create_user(email="stranger@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.work_space.members.add(self.member)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.task = Task.objects.create(title="Task", status=self.task_list)
+        self.label = Label.objects.create(title="Label", board=self.board)
+        self.comment = Comment.objects.create(body="Comment", task=self.task, author=self.member)
+        self.attachment = Attachment.objects.create(task=self.task, owner=self.member)
+        self.client = APIClient()
+
+    def _objects(self):
+        return {
+            'workspace': (self.work_space, {'title': 'Renamed'}),
+            'board': (self.board, {'title': 'Renamed'}),
+            'tasklist': (self.task_list, {'title': 'Renamed'}),
+            'task': (self.task, {'title': 'Renamed'}),
+            'label': (self.label, {'title': 'Renamed'}),
+            'comment': (self.comment, {'body': 'Renamed'}),
+            'attachment': (self.attachment, {}),
+        }
+
+    def _assert_queries(self, user, method, expected, status_code):
+        self.client.force_authenticate(user)
+        user_work_spaces(user)
+        # Children first, so deleting a parent does not archive the next object.
+        for basename, (obj, data) in reversed(self._objects().items()):
+            url = reverse(f'dashboards:{basename}-detail', args=[obj.pk])
+            with self.subTest(basename=basename), self.assertNumQueries(expected[basename]):
+                response = getattr(self.client, method)(url, data, format='json')
+                self.assertEqual(response.status_code, status_code)
+
+    def test_retrieve_queries(self):
+        self._assert_queries(self.member, 'get', {
+            'workspace': 4, 'board': 2, 'tasklist': 4, 'task': 6,
+            'label': 1, 'comment': 1, 'attachment': 2,
+            }, 200)
+
+    # Writes count the savepoint pair of the transaction of the request.
+    def test_update_queries(self):
+        self._assert_queries(self.owner, 'patch', {
+            'workspace': 8, 'board': 7, 'tasklist': 9, 'task': 20,
+            'label': 6, 'comment': 8, 'attachment': 8,
+            }, 200)
+
+    def test_delete_queries(self):
+        self._assert_queries(self.owner, 'delete', {
+            'workspace': 24, 'board': 21, 'tasklist': 19, 'task': 22,
+            'label': 6, 'comment': 11, 'attachment': 12,
+            }, 204)
+
+    def test_membership_is_cached_across_requests(self):
+        request = APIRequestFactory().get('/')
+        request.user = self.member
+        with self.assertNumQueries(1):
+            self.assertTrue(has_work_space_access(request, self.work_space.pk))
+            self.assertFalse(is_work_space_owner(request, self.work_space.pk))
+            self.assertTrue(has_work_space_access(request, self.board.work_space_id))
+        request = APIRequestFactory().get('/')
+        request.user = self.member
+        with self.assertNumQueries(0):
+            self.assertTrue(has_work_space_access(request, self.work_space.pk))
+
+    def test_stranger_is_denied(self):
+        # Conditional retrieves check permissions before prefetching relations.
+        self._assert_queries(self.stranger, 'get', {
+            'workspace': 1, 'board': 1, 'tasklist': 1, 'task': 1,
+            'label': 1, 'comment': 1, 'attachment': 1,
+            }, 403)
+
+
+    def test_no_stale_grant_from_a_read_during_revocation(self):
+        caches['acl'].clear()
+
+        def revoke_then_set(*args):
+            # The rows were read before the revocation committed.
+            with self.captureOnCommitCallbacks(execute=True):
+                self.work_space.members.remove(self.member)
+            set_work_spaces(*args)
+
+        with mock.patch('trello.apps.dashboards.permissions.set_work_spaces', revoke_then_set):
+            owned, membered = user_work_spaces(self.member)
+        self.assertIn(self.work_space.pk, membered)
+        owned, membered = user_work_spaces(self.member)
+        self.assertNotIn(self.work_space.pk, membered)
+        with self.assertNumQueries(0):
+            self.assertEqual(user_work_spaces(self.member), (owned, membered))
+
+    def test_no_stale_grants_after_access_changes(self):
+        rng = random.Random(0)
+        users = [self.owner, self.member, self.stranger]
+        other = WorkSpace.objects.create(title="Other WorkSpace", owner=self.member)
+        work_spaces = [self.work_space, other]
+
+        def expected(user):
+            owned = WorkSpace.objects.filter(owner=user)
+            membered = WorkSpace.objects.filter(members=user)
+            return set(owned.values_list('pk', flat=True)), set(membered.values_list('pk', flat=True))
+
+        changes = [
+            lambda work_space, user: work_space.members.add(user),
+            lambda work_space, user: work_space.members.remove(user),
+            lambda work_space, user: user.member_work_spaces.add(work_space),
+            lambda work_space, user: user.member_work_spaces.remove(work_space),
+            lambda work_space, user: work_space.members.clear(),
+            lambda work_space, user: work_space.members.set([user]),
+            lambda work_space, user: setattr(work_space, 'owner', user) or work_space.save(),
+            lambda work_space, user: work_space.archive(),
+            lambda work_space, user: work_space.restore(),
+            lambda work_space, user: user.archive(),
+            lambda work_space, user: user.restore(),
+        ]
+        for step in range(300):
+            for user in users:
+                user_work_spaces(user)
+            change = rng.randrange(len(changes))
+            work_space = WorkSpace.original_objects.get(pk=rng.choice(work_spaces).pk)
+            changes[change](work_space, rng.choice(users))
+            for user in users:
+                with self.subTest(step=step, change=change, user=user.email):
+                    self.assertEqual(tuple(map(set, user_work_spaces(user))), expected(user))
+
+
+
+class BoardSnapshotAPITestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.stranger = User.objects.create_user(email="stranger@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.label = Label.objects.create(title="Label", board=self.board)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.client = APIClient()
+        self.url = reverse('dashboards:board-snapshot', args=[self.board.pk])
+
+    def _add_tasks(self, count):
+        task_list = TaskList.objects.create(title="More", board=self.board)
+        for i in range(count):
+            task = Task.objects.create(title=f"Task {i}", status=task_list)
+            task.labels.add(self.label)
+            task.assigned_to.add(self.owner)
+            Comment.objects.create(body="Comment", task=task, author=self.owner)
+            Attachment.objects.create(task=task, owner=self.owner)
+
+    def test_snapshot(self):
+        first = Task.objects.create(title="First", status=self.task_list)
+        second = Task.objects.create(title="Second", status=self.task_list)
+        second.move(self.owner, after=first)
+        second.labels.add(self.label)
+        second.assigned_to.add(self.owner)
+        Comment.objects.create(body="Comment", task=second, author=self.owner)
+        Comment.objects.create(body="Archived", task=second, author=self.owner).archive()
+        Attachment.objects.create(task=second, owner=self.owner)
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['board_labels'], [{'id': str(self.label.id), 'title': 'Label'}])
+        [task_list] = data['board_Tasklists']
+        self.assertEqual(task_list['tasks_count'], 2)
+        tasks = task_list['status_tasks']
+        self.assertEqual([task['id'] for task in tasks], [str(second.id), str(first.id)])
+        self.assertEqual(tasks[0]['labels'], [str(self.label.id)])
+        self.assertEqual([user['email'] for user in tasks[0]['assigned_to']], [self.owner.email])
+        self.assertEqual((tasks[0]['comments_count'], tasks[0]['attachments_count']), (1, 1))
+        self.assertEqual((tasks[1]['comments_count'], tasks[1]['attachments_count']), (0, 0))
+
+    def test_snapshot_runs_constant_queries(self):
+        self.client.force_authenticate(self.owner)
+        user_work_spaces(self.owner)
+        self._add_tasks(2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+        self._add_tasks(20)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(self.url)
+        self.assertEqual(sum(len(tasks['status_tasks']) for tasks in response.data['board_Tasklists']), 22)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(large), 6)
+
+    def test_snapshot_requires_membership(self):
+        self.client.force_authenticate(self.stranger)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+
+
+class BoardExportAPITestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.member = User.objects.create_user(email="member@example.com", password="password")
+        self.stranger = User.objects.create_user(email="stranger@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.work_space.members.add(self.member)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.label = Label.objects.create(title="Label", board=self.board)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        for i in range(5):
+            task = Task.objects.create(title=f"Task {i}", status=self.task_list)
+            task.labels.add(self.label)
+            task.assigned_to.add(self.member)
+            Comment.objects.create(body="Comment", task=task, author=self.owner)
+        other = Board.objects.create(title="Other Board", work_space=self.work_space)
+        Task.objects.create(title="Other", status=TaskList.objects.create(title="Other", board=other))
+        self.client = APIClient()
+        self.url = reverse('dashboards:board-export', args=[self.board.pk])
+
+    def _content(self, response) -> bytes:
+        return b''.join(response.streaming_content)
+
+    def test_export(self):
+        self.client.force_authenticate(self.member)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        data = json.loads(self._content(response))
+        self.assertEqual(data['board']['id'], str(self.board.id))
+        self.assertEqual([user['email'] for user in data['members']], [self.member.email, self.owner.email])
+        self.assertEqual([task_list['title'] for task_list in data['task_lists']], ['Todo'])
+        self.assertEqual([(label['id'], label['board']) for label in data['labels']], [(str(self.label.id), str(self.board.id))])
+        expected = TaskSyncSerializer(Task.objects.filter(board=self.board).order_by('rank'), many=True).data
+        self.assertEqual(data['tasks'], json.loads(JSONRenderer().render(expected)))
+        self.assertEqual(len(data['comments']), 5)
+        self.assertEqual(len(data['activities']), Activity.objects.filter(board=self.board).count())
+
+    def test_export_requires_membership(self):
+        self.client.force_authenticate(self.stranger)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_streams_run_constant_queries_per_chunk(self):
+        tasks = Task.objects.filter(board=self.board).order_by('rank')
+        expected = json.loads(JSONRenderer().render(TaskSyncSerializer(tasks, many=True).data))
+        for chunk_size, chunks in ((2, 3), (5, 1), (10, 1)):
+            with self.subTest(chunk_size=chunk_size):
+                stream = JSONStream(ValuesListSerializer(child=TaskSyncSerializer()), tasks, chunk_size=chunk_size)
+                response = StreamingJSONResponse({'tasks': stream, 'empty': JSONStream(stream.serializer, tasks.none())})
+                # The rows, then the labels and the assignees of every chunk.
+                with self.assertNumQueries(1 + chunks * 2):
+                    content = self._content(response)
+                self.assertEqual(json.loads(content), {'tasks': expected, 'empty': []})
+
+    def test_asgi_requests_are_streamed_asynchronously(self):
+        request = AsyncRequestFactory().get(self.url)
+        stream = JSONStream(ValuesListSerializer(child=TaskSyncSerializer()), Task.objects.all(), chunk_size=2)
+        response = StreamingJSONResponse({'tasks': stream}, request=request)
+        self.assertTrue(response.is_async)
+
+        async def consume():
+            return [chunk async for chunk in response]
+        content = b''.join(async_to_sync(consume)())
+        self.assertEqual(len(json.loads(content)['tasks']), 6)
+
+class ConditionalRetrieveAPITestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.task = Task.objects.create(title="Task", status=self.task_list)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        user_work_spaces(self.owner)
+
+    def _urls(self):
+        return {
+            'workspace': reverse('dashboards:workspace-detail', args=[self.work_space.pk]),
+            'board': reverse('dashboards:board-detail', args=[self.board.pk]),
+            'tasklist': reverse('dashboards:tasklist-detail', args=[self.task_list.pk]),
+            'task': reverse('dashboards:task-detail', args=[self.task.pk]),
+            'user': reverse('accounts:user-detail', args=[self.owner.pk]),
+        }
+
+    def test_not_modified_skips_serialization(self):
+        for name, url in self._urls().items():
+            with self.subTest(name=name):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                with self.assertNumQueries(1):
+                    cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached['ETag'], response['ETag'])
+                if 'Last-Modified' in response:
+                    cached = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                    self.assertEqual(cached.status_code, 304)
+
+    def test_child_changes_change_the_etag(self):
+        etags = {name: self.client.get(url)['ETag'] for name, url in self._urls().items()}
+        Comment.create_comment('Hi', self.task, self.owner)
+        self.assertNotEqual(self.client.get(self._urls()['task'])['ETag'], etags['task'])
+
+        Task.objects.create(title="Second", status=self.task_list)
+        for name in ('board', 'tasklist'):
+            response = self.client.get(self._urls()[name], HTTP_IF_NONE_MATCH=etags[name])
+            self.assertEqual(response.status_code, 200)
+
+        self.board.title = 'Renamed'
+        self.board.save()
+        for name in ('workspace', 'board'):
+            self.assertNotEqual(self.client.get(self._urls()[name])['ETag'], etags[name])
+
+        self.work_space.title = 'Renamed'
+        self.work_space.save()
+        self.assertNotEqual(self.client.get(self._urls()['user'])['ETag'], etags['user'])
+
+        self.task.archive()
+        response = self.client.get(self._urls()['tasklist'])
+        self.assertEqual(response.data['status_tasks'][0]['title'], 'Second')
+
+    def test_removed_members_are_not_served_as_not_modified_since(self):
+        member = User.objects.create_user(email="member@example.com", password="password")
+        self.work_space.members.add(member)
+        url = self._urls()['workspace']
+        response = self.client.get(url)
+        # Removals move no update_at, so relation counts rule out Last-Modified.
+        self.assertNotIn('Last-Modified', response)
+        since = http_date(timezone.now().timestamp() + 60)
+        self.work_space.members.remove(member)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['members'], [])
+        # Selections without relations are validated by the row alone.
+        sparse = self.client.get(url, {'fields': 'id,title'})
+        self.assertIn('Last-Modified', sparse)
+        self.assertEqual(
+            self.client.get(url, {'fields': 'id,title'}, HTTP_IF_MODIFIED_SINCE=sparse['Last-Modified']).status_code,
+            304,
+            )
+
+    def test_member_changes_change_the_etag(self):
+        member = User.objects.create_user(email="member@example.com", password="password")
+        names = ('workspace', 'user')
+        etags = {name: self.client.get(self._urls()[name])['ETag'] for name in names}
+        self.work_space.members.add(member)
+        for name in names:
+            response = self.client.get(self._urls()[name], HTTP_IF_NONE_MATCH=etags[name])
+            self.assertEqual(response.status_code, 200)
+            etags[name] = response['ETag']
+
+        member.first_name = 'Renamed'
+        member.save()
+        for name in names:
+            response = self.client.get(self._urls()[name], HTTP_IF_NONE_MATCH=etags[name])
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['owner_work_spaces'][0]['members'][0]['first_name'], 'Renamed')
+        etags['workspace'] = self.client.get(self._urls()['workspace'])['ETag']
+        member.last_login = timezone.now()
+        member.save(update_fields=['last_login'])
+        self.assertEqual(
+            self.client.get(self._urls()['workspace'], HTTP_IF_NONE_MATCH=etags['workspace']).status_code, 304
+            )
+
+
+class FragmentCacheAPITestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.other_board = Board.objects.create(title="Other Board", work_space=self.work_space)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.task = Task.objects.create(title="Task", status=self.task_list)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        user_work_spaces(self.owner)
+
+    def _urls(self):
+        return {
+            'board': reverse('dashboards:board-detail', args=[self.board.pk]),
+            'tasklist': reverse('dashboards:tasklist-detail', args=[self.task_list.pk]),
+            'task': reverse('dashboards:task-detail', args=[self.task.pk]),
+        }
+
+    def _assert_cached(self, cached: bool):
+        for name, url in self._urls().items():
+            with self.subTest(name=name):
+                hits, misses = fragments.stats['hits'], fragments.stats['misses']
+                self.client.get(url)
+                self.assertEqual(fragments.stats['hits'] - hits, int(cached))
+                self.assertEqual(fragments.stats['misses'] - misses, int(not cached))
+
+    def test_second_read_is_a_hit(self):
+        first = {name: self.client.get(url).data for name, url in self._urls().items()}
+        self._assert_cached(True)
+        for name, url in self._urls().items():
+            self.assertEqual(self.client.get(url).data, first[name])
+
+    def test_writes_on_the_board_invalidate(self):
+        label = Label.objects.create(title='Bug', board=self.board)
+        self._assert_cached(False)
+        self._assert_cached(True)
+        self.task.labels.add(label)
+        self._assert_cached(False)
+        Comment.create_comment('Hi', self.task, self.owner)
+        self._assert_cached(False)
+        self.task.assigned_to.add(self.owner)
+        self._assert_cached(False)
+        self.owner.first_name = 'Renamed'
+        self.owner.save()
+        self._assert_cached(False)
+        response = self.client.get(self._urls()['task'])
+        self.assertEqual(response.data['obj_assigned_to'][0]['first_name'], 'Renamed')
+
+    def test_writes_elsewhere_keep_the_fragments(self):
+        self._assert_cached(False)
+        other_list = TaskList.objects.create(title="Other", board=self.other_board)
+        Task.objects.create(title="Elsewhere", status=other_list)
+        self._assert_cached(True)
+
+    def test_moves_and_archives_invalidate(self):
+        other_list = TaskList.objects.create(title="Other", board=self.other_board)
+        self._assert_cached(False)
+        Task.bulk_move(self.owner, [(self.task, other_list, 0)])
+        self.assertEqual(self.client.get(self._urls()['task']).data['obj_status']['id'], str(other_list.pk))
+        self.assertEqual(self.client.get(self._urls()['tasklist']).data['status_tasks'], [])
+
+        self.task = Task.objects.create(title="Second", status=self.task_list)
+        self._assert_cached(False)
+        Task.objects.filter(pk=self.task.pk).set_active(False)
+        self.assertEqual(self.client.get(self._urls()['tasklist']).data['status_tasks'], [])
+
+        self.task.restore()
+        self._assert_cached(False)
+        self.work_space.archive()
+        self.work_space.restore()
+        self._assert_cached(False)
+
+
+class FragmentCoalescingTestCase(TransactionTestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        for i in range(3):
+            task_list = TaskList.objects.create(title=f"List {i}", board=self.board)
+            for j in range(5):
+                Task.objects.create(title=f"Task {j}", status=task_list)
+        user_work_spaces(self.owner)
+
+    def test_concurrent_misses_build_once(self):
+        url = reverse('dashboards:board-detail', args=[self.board.pk])
+        threads_count = 16
+        barrier = threading.Barrier(threads_count)
+        payloads, errors = [], []
+
+        def fetch():
+            client = APIClient()
+            client.force_authenticate(self.owner)
+            try:
+                barrier.wait()
+                response = client.get(url)
+                payloads.append((response.status_code, response.content))
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        self.client.force_authenticate(self.owner)
+        self.client.get(url)
+        fragments.invalidate(board_ids=[self.board.pk])
+        before = dict(fragments.stats)
+        threads = [threading.Thread(target=fetch) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual({status for status, _ in payloads}, {200})
+        self.assertEqual(len({content for _, content in payloads}), 1)
+        self.assertEqual(fragments.stats['misses'] - before['misses'], 1)
+        self.assertEqual(
+            fragments.stats['hits'] - before['hits'] + fragments.stats['coalesced'] - before['coalesced'],
+            threads_count - 1,
+            )
+
+    def test_waits_for_another_worker(self):
+        cache = caches[fragments.FRAGMENT_CACHE_ALIAS]
+        key = f'test:{self.board.pk}'
+        cache.add(f'lock:{key}', 1)
+        threading.Timer(0.1, cache.set, args=(key, 'built elsewhere')).start()
+        self.assertEqual(fragments.get_or_build(key, lambda: 'built here'), 'built elsewhere')
+
+        key = f'test:{self.work_space.pk}'
+        cache.add(f'lock:{key}', 1)
+        self.assertEqual(fragments.get_or_build(key, lambda: 'built here', wait=0.1), 'built here')
+        self.assertEqual(cache.get(key), 'built here')
+
+
+class ChangeFeedAPITestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.stranger = User.objects.create_user(email="stranger@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.task = Task.objects.create(title="Task", status=self.task_list)
+        self.url = reverse('dashboards:workspace-changes', args=[self.work_space.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.cursor = self.client.get(self.url).data['cursor']
+
+    def _changes(self, **params):
+        response = self.client.get(self.url, {'since': self.cursor, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def _summary(self, results):
+        return [(change['model'], str(change['object_id']), change['action']) for change in results]
+
+    def test_initial_sync_lists_everything(self):
+        response = self.client.get(self.url)
+        self.assertEqual(self._summary(response.data['results']), [
+            ('workspace', str(self.work_space.pk), 'created'),
+            ('board', str(self.board.pk), 'created'),
+            ('tasklist', str(self.task_list.pk), 'created'),
+            ('task', str(self.task.pk), 'created'),
+            ])
+        self.assertFalse(response.data['has_more'])
+        self.assertEqual(response.data['results'][-1]['data']['title'], 'Task')
+
+    def test_only_changes_after_the_cursor(self):
+        self.assertEqual(self._changes()['results'], [])
+        self.task.title = 'Renamed'
+        self.task.save()
+        label = Label.objects.create(title='Bug', board=self.board)
+        data = self._changes()
+        self.assertEqual(self._summary(data['results']), [
+            ('task', str(self.task.pk), 'updated'),
+            ('label', str(label.pk), 'created'),
+            ])
+        self.assertEqual(data['results'][0]['data']['title'], 'Renamed')
+
+        self.cursor = data['cursor']
+        self.task.labels.add(label)
+        label_pk = label.pk
+        label.delete()
+        data = self._changes()
+        self.assertEqual(self._summary(data['results']), [
+            ('task', str(self.task.pk), 'updated'),
+            ('label', str(label_pk), 'deleted'),
+            ])
+        self.assertEqual(data['results'][0]['data']['labels'], [])
+        self.assertIsNone(data['results'][1]['data'])
+
+    def test_log_inserts_hold_the_log_lock_of_their_workspace(self):
+        other = WorkSpace.objects.create(title="Other WorkSpace", owner=self.owner)
+        statements, locks = [], []
+
+        def lock_on_postgresql(execute, sql, params, many, context):
+            # The locks are PostgreSQL's: they are recorded, not run.
+            statements.append(sql.replace('"', '').split('(')[0].strip())
+            if 'pg_advisory_xact_lock' not in sql:
+                return execute(sql, params, many, context)
+            self.assertEqual(params[0], CHANGE_LOG_LOCK)
+            if isinstance(params[1], list):
+                locks.append({uuid.UUID(pk) for pk in params[1]})
+                return
+            # Queryset locks select the work spaces of the logged rows, which SQLite can run.
+            execute(sql[sql.index('FROM (SELECT DISTINCT * FROM (') + 30:sql.rindex(') AS ids)')], params[1:], many, context)
+            locks.append({uuid.UUID(str(pk)) for pk, in context['cursor'].fetchall()})
+
+        with mock.patch.object(connection, 'vendor', 'postgresql'), connection.execute_wrapper(lock_on_postgresql):
+            self.task.title = 'Renamed'
+            self.task.save()
+            Task.objects.filter(pk=self.task.pk).cascade_archive()
+            other.title = 'Renamed'
+            other.save()
+        inserts = [index for index, sql in enumerate(statements) if sql == 'INSERT INTO dashboards_change']
+        # The saved task, the archived task and its attachments and comments, then the other workspace.
+        self.assertEqual(len(inserts), 5)
+        for index in inserts:
+            self.assertEqual(statements[index - 1], 'SELECT pg_advisory_xact_lock')
+        # Cascades log the attachments and comments of the task, which has none.
+        self.assertEqual(locks, [{self.work_space.pk}, set(), set(), {self.work_space.pk}, {other.pk}])
+        self.assertEqual(self._summary(self._changes()['results']), [('task', str(self.task.pk), 'archived')])
+
+    def test_keyset_pages(self):
+        tasks = [Task.objects.create(title=f'Task {i}', status=self.task_list) for i in range(5)]
+        seen = []
+        while True:
+            data = self._changes(limit=2)
+            seen += [str(change['object_id']) for change in data['results']]
+            self.cursor = data['cursor']
+            if not data['has_more']:
+                break
+        self.assertEqual(seen, [str(task.pk) for task in tasks])
+        self.assertEqual(self._changes()['results'], [])
+        self.assertEqual(self._changes()['cursor'], self.cursor)
+
+    def test_cascades_moves_and_board_filter(self):
+        other_board = Board.objects.create(title="Other Board", work_space=self.work_space)
+        other_list = TaskList.objects.create(title="Other", board=other_board)
+        comment = Comment.create_comment('Hi', self.task, self.owner)
+        self.cursor = self._changes()['cursor']
+
+        Task.bulk_move(self.owner, [(self.task, other_list, 0)])
+        data = self._changes(board=other_board.pk)
+        self.assertCountEqual(self._summary(data['results']), [
+            ('task', str(self.task.pk), 'updated'),
+            ('comment', str(comment.pk), 'updated'),
+            ])
+        self.assertTrue(all(change['data']['board'] == other_board.pk for change in data['results']))
+        self.cursor = data['cursor']
+
+        other_board.archive()
+        self.assertCountEqual(self._summary(self._changes()['results']), [
+            ('board', str(other_board.pk), 'archived'),
+            ('tasklist', str(other_list.pk), 'archived'),
+            ('task', str(self.task.pk), 'archived'),
+            ('comment', str(comment.pk), 'archived'),
+            ])
+        self.assertEqual(self._changes(board=self.board.pk)['results'], [])
+
+    def test_access_and_validation(self):
+        self.assertEqual(self.client.get(self.url, {'since': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'board': 'x'}).status_code, 400)
+        self.client.force_authenticate(self.stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class LiveEventsTestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.stranger = User.objects.create_user(email="stranger@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.other_board = Board.objects.create(title="Other Board", work_space=self.work_space)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.task = Task.objects.create(title="Task", status=self.task_list)
+        self.baseline = len(live.hub)
+
+    async def _open(self, board=None, user=None, **headers):
+        request = AsyncRequestFactory().get(
+            f'/dashboards/boards/{(board or self.board).pk}/events/',
+            headers={'Authorization': f'Bearer {AccessToken.for_user(user or self.owner)}', **headers},
+            )
+        response = await board_events(request, pk=(board or self.board).pk)
+        self.assertEqual(response.status_code, 200)
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        return stream
+
+    async def _next_event(self, stream) -> tuple:
+        chunk = await asyncio.wait_for(anext(stream), timeout=5)
+        fields = dict(line.split(': ', 1) for line in chunk.decode().strip().split('\n'))
+        return fields['event'], json.loads(fields['data'])
+
+    async def _close(self, *streams):
+        for stream in streams:
+            await stream.aclose()
+        del streams
+        gc.collect()
+        # Abandoned generators are closed by tasks of the loop.
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+    def _save_committed(self, instance):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    async def test_pushes_committed_changes_of_the_board(self):
+        stream = await self._open()
+        self.task.title = 'Renamed'
+        await sync_to_async(self._save_committed)(self.task)
+        self.other_board.title = 'Renamed'
+        await sync_to_async(self._save_committed)(self.other_board)
+        self.work_space.title = 'Renamed'
+        await sync_to_async(self._save_committed)(self.work_space)
+
+        event, data = await self._next_event(stream)
+        self.assertEqual((event, data['model'], data['object_id'], data['action']),
+                         ('change', 'task', str(self.task.pk), 'updated'))
+        event, data = await self._next_event(stream)
+        self.assertEqual((event, data['model'], data['board']), ('change', 'workspace', None))
+        await self._close(stream)
+        self.assertEqual(len(live.hub), self.baseline)
+
+    async def test_slow_client_gets_resync(self):
+        subscription = live.hub.subscribe(self.work_space.pk, self.board.pk, size=3)
+        entries = [
+            {'cursor': i, 'work_space': self.work_space.pk, 'board': self.board.pk,
+             'model': 'task', 'object_id': self.task.pk, 'action': 'updated'}
+            for i in range(5)
+            ]
+        live.hub.publish(entries)
+        await asyncio.sleep(0)
+        self.assertIs(await subscription.get(), live.RESYNC)
+        self.assertTrue(subscription.queue.empty())
+        live.hub.publish(entries[:1])
+        await asyncio.sleep(0)
+        self.assertEqual(await subscription.get(), entries[0])
+        live.hub.unsubscribe(subscription)
+
+    async def test_replays_after_last_event_id(self):
+        last_event_id = await Change.objects.filter(board=self.board).order_by('id').values_list('id', flat=True).alast()
+        self.task.title = 'Renamed'
+        await sync_to_async(self.task.save)()
+        stream = await self._open(**{'Last-Event-ID': str(last_event_id)})
+        event, data = await self._next_event(stream)
+        self.assertEqual((event, data['object_id'], data['action']), ('change', str(self.task.pk), 'updated'))
+        self.assertGreater(data['cursor'], last_event_id)
+
+        replaying = await self._open(**{'Last-Event-ID': '0'})
+        replayed = [await self._next_event(replaying) for _ in range(4)]
+        self.assertEqual(
+            [(data['model'], data['action']) for _, data in replayed],
+            [('board', 'created'), ('tasklist', 'created'), ('task', 'created'), ('task', 'updated')],
+            )
+        await self._close(stream, replaying)
+
+    async def test_rejects_anonymous_and_strangers(self):
+        request = AsyncRequestFactory().get(f'/dashboards/boards/{self.board.pk}/events/')
+        response = await board_events(request, pk=self.board.pk)
+        self.assertEqual(response.status_code, 401)
+        request = AsyncRequestFactory().get(
+            f'/dashboards/boards/{self.board.pk}/events/', {'token': str(AccessToken.for_user(self.stranger))}
+            )
+        response = await board_events(request, pk=self.board.pk)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_thousand_idle_connections_share_the_loop(self):
+        threads = threading.active_count()
+        streams = await asyncio.gather(*[self._open() for _ in range(1000)])
+        self.assertEqual(len(live.hub), self.baseline + 1000)
+        self.assertLess(threading.active_count() - threads, 5)
+        self.task.title = 'Renamed'
+        await sync_to_async(self._save_committed)(self.task)
+        events = await asyncio.gather(*[self._next_event(stream) for stream in streams])
+        self.assertEqual({(event, data['object_id']) for event, data in events}, {('change', str(self.task.pk))})
+        await self._close(*streams)
+        self.assertEqual(len(live.hub), self.baseline)
+
+
+class ActivityFeedAPITestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.member = User.objects.create_user(email="member@example.com", password="password")
+        self.stranger = User.objects.create_user(email="stranger@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.work_space.members.add(self.member)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.task = Task.objects.create(title="Task", status=self.task_list)
+        self.other_task = Task.objects.create(title="Other", status=self.task_list)
+        self.hidden_work_space = WorkSpace.objects.create(title="Hidden", owner=self.stranger)
+        hidden_board = Board.objects.create(title="Hidden Board", work_space=self.hidden_work_space)
+        self.hidden_task = Task.objects.create(
+            title="Hidden", status=TaskList.objects.create(title="Todo", board=hidden_board)
+            )
+        with ActivityRecorder():
+            for i in range(7):
+                ActivityRecorder.record(
+                    task=self.task if i % 2 else self.other_task,
+                    doer=self.member if i % 3 else self.owner,
+                    message=f'Task title was changed to {i}.',
+                    )
+            ActivityRecorder.record(task=self.hidden_task, doer=self.member, message='Task description was changed.')
+        # Ties on create_at must still page without gaps or duplicates.
+        Activity.objects.filter(task=self.task).update(create_at=timezone.now())
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        user_work_spaces(self.owner)
+
+    def _walk(self, url, **params):
+        ids, response = [], self.client.get(url, {'page_size': 2, **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [activity['id'] for activity in response.data['results']]
+            if response.data['next'] is None:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def _expected(self, activities):
+        return [str(pk) for pk in activities.order_by('-create_at', '-id').values_list('pk', flat=True)]
+
+    def test_feeds_page_through_every_activity(self):
+        feeds = {
+            reverse('dashboards:task-activities', args=[self.task.pk]): Activity.objects.filter(task=self.task),
+            reverse('dashboards:board-activities', args=[self.board.pk]): Activity.objects.filter(board=self.board),
+            reverse('dashboards:workspace-activities', args=[self.work_space.pk]):
+                Activity.objects.filter(work_space=self.work_space),
+            reverse('dashboards:user-activities', args=[self.member.pk]):
+                Activity.objects.filter(doer=self.member, work_space=self.work_space),
+        }
+        for url, activities in feeds.items():
+            with self.subTest(url=url):
+                self.assertEqual(self._walk(url), self._expected(activities))
+
+    def test_filters(self):
+        url = reverse('dashboards:board-activities', args=[self.board.pk])
+        self.assertEqual(
+            self._walk(url, doer=self.member.pk),
+            self._expected(Activity.objects.filter(board=self.board, doer=self.member)),
+            )
+        Activity.objects.filter(task=self.other_task).update(event_type=EventType.TASK_ASSIGNED)
+        self.assertEqual(
+            self._walk(url, event=[EventType.TASK_ASSIGNED, EventType.TASK_UNASSIGNED]),
+            self._expected(Activity.objects.filter(task=self.other_task)),
+            )
+        middle = Activity.objects.filter(board=self.board).order_by('create_at', 'id')[3].create_at
+        self.assertEqual(
+            self._walk(url, from_date=middle.isoformat()),
+            self._expected(Activity.objects.filter(board=self.board, create_at__gt=middle)),
+            )
+        self.assertEqual(
+            self._walk(url, to_date=middle.isoformat()),
+            self._expected(Activity.objects.filter(board=self.board, create_at__lte=middle)),
+            )
+
+    def test_deep_pages_use_the_keyset(self):
+        url = reverse('dashboards:board-activities', args=[self.board.pk])
+        first = self.client.get(url, {'page_size': 1})
+        response = self.client.get(first.data['next'])
+        response = self.client.get(response.data['next'])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(response.data['next'])
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('OFFSET', queries[-1]['sql'].upper())
+        self.assertEqual(self.client.get(url, {'cursor': 'x'}).status_code, 400)
+
+    def test_access(self):
+        self.client.force_authenticate(self.stranger)
+        for name, pk in (('task-activities', self.task.pk), ('board-activities', self.board.pk),
+                         ('workspace-activities', self.work_space.pk)):
+            with self.subTest(name=name):
+                self.assertEqual(self.client.get(reverse(f'dashboards:{name}', args=[pk])).status_code, 404)
+        response = self.client.get(reverse('dashboards:user-activities', args=[self.member.pk]))
+        self.assertEqual([activity['task'] for activity in response.data['results']], [self.hidden_task.pk])
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(reverse('dashboards:user-activities', args=[self.member.pk])).status_code, 401)
+
+
+class TaskRecentRelationsAPITestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.stranger = User.objects.create_user(email="stranger@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.task = Task.objects.create(title="Task", status=self.task_list)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        user_work_spaces(self.owner)
+
+    def _comment(self, count):
+        Comment.objects.bulk_create(
+            [Comment(body=f'Comment {i}', task=self.task, author=self.owner) for i in range(count)]
+            )
+        # Ties on create_at must still page without gaps or duplicates.
+        Comment.objects.filter(task=self.task).update(create_at=timezone.now())
+
+    def _expected(self, rows):
+        return [str(pk) for pk in rows.order_by('-create_at', '-id').values_list('pk', flat=True)]
+
+    def test_relations_are_capped_and_continue_in_their_lists(self):
+        self._comment(TASK_RECENT_LIMIT + 5)
+        Attachment.objects.create(task=self.task, owner=self.owner)
+        Comment.objects.create(body='Archived', task=self.task, author=self.owner).archive()
+        response = self.client.get(reverse('dashboards:task-detail', args=[self.task.pk]))
+        comments = response.data['task_comments']
+        self.assertEqual(comments['count'], TASK_RECENT_LIMIT + 5)
+        self.assertEqual(len(comments['results']), TASK_RECENT_LIMIT)
+        ids = [str(comment['id']) for comment in comments['results']]
+        rest = self.client.get(comments['next'])
+        self.assertEqual(rest.status_code, 200)
+        self.assertIsNone(rest.data['next'])
+        ids += [str(comment['id']) for comment in rest.data['results']]
+        self.assertEqual(ids, self._expected(Comment.objects.filter(task=self.task)))
+        attachments = response.data['task_attachments']
+        self.assertEqual((attachments['count'], len(attachments['results']), attachments['next']), (1, 1, None))
+        activity = response.data['task_activity']
+        self.assertEqual((activity['count'], len(activity['results']), activity['next']), (1, 1, None))
+
+    def test_prefetch_is_bounded(self):
+        url = reverse('dashboards:task-detail', args=[self.task.pk])
+        self._comment(TASK_RECENT_LIMIT)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        self._comment(TASK_RECENT_LIMIT * 5)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(response.data['task_comments']['count'], TASK_RECENT_LIMIT * 6)
+        self.assertTrue(any('ROW_NUMBER' in query['sql'] for query in many))
+
+    def test_write_payloads_are_current(self):
+        response = self.client.patch(
+            reverse('dashboards:task-detail', args=[self.task.pk]), {'title': 'Renamed'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['task_activity']['count'], 1)
+        self.assertEqual(
+            [activity['message'] for activity in response.data['task_activity']['results']],
+            ['Task title was changed to Renamed.'],
+            )
+
+    def test_lists_require_access(self):
+        self.client.force_authenticate(self.stranger)
+        for name in ('task-comments', 'task-attachments'):
+            with self.subTest(name=name):
+                self.assertEqual(self.client.get(reverse(f'dashboards:{name}', args=[self.task.pk])).status_code, 404)
+
+
+class CommentThreadAPITestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.task = Task.objects.create(title="Task", status=self.task_list)
+        self.url = reverse('dashboards:task-threads', args=[self.task.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        user_work_spaces(self.owner)
+
+    def _comment(self, body, parent=None):
+        return Comment.objects.create(body=body, task=self.task, author=self.owner, parent=parent)
+
+    def _bodies(self, comments):
+        return [(comment['body'], self._bodies(comment['replies'])) for comment in comments]
+
+    def test_threads_nest_replies_in_reading_order(self):
+        first = self._comment('first')
+        second = self._comment('second')
+        reply = self._comment('reply', first)
+        self._comment('second reply', first)
+        self._comment('nested', reply)
+        self._comment('other reply', second)
+        self._comment('archived', reply).archive()
+        self.assertEqual(list(first.get_thread().values_list('body', flat=True)),
+                         ['reply', 'nested', 'second reply'])
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._bodies(response.data['results']), [
+            ('second', [('other reply', [])]),
+            ('first', [('reply', [('nested', [])]), ('second reply', [])]),
+            ])
+        self.assertEqual(response.data['results'][1]['replies'][0]['replies'][0]['depth'], 2)
+
+    def test_replies_are_loaded_with_one_query(self):
+        for _ in range(3):
+            parent = self._comment('root')
+            for depth in range(3):
+                parent = self._comment('reply', parent)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+        for _ in range(5):
+            parent = self._comment('root')
+            for depth in range(COMMENT_MAX_DEPTH - 1):
+                parent = self._comment('reply', parent)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(self.url)
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(len(response.data['results']), 8)
+
+    def test_top_level_comments_are_paginated(self):
+        roots = [self._comment(f'root {index}') for index in range(5)]
+        for root in roots:
+            self._comment('reply', root)
+        response = self.client.get(self.url, {'page_size': 3})
+        ids = [comment['id'] for comment in response.data['results']]
+        response = self.client.get(response.data['next'])
+        self.assertIsNone(response.data['next'])
+        ids += [comment['id'] for comment in response.data['results']]
+        self.assertEqual(ids, [str(root.pk) for root in reversed(roots)])
+        self.assertTrue(all(len(comment['replies']) == 1 for comment in response.data['results']))
+
+    def test_replies_are_validated(self):
+        other_task = Task.objects.create(title="Other", status=self.task_list)
+        parent = self._comment('root')
+        for depth in range(COMMENT_MAX_DEPTH - 1):
+            parent = self._comment('reply', parent)
+        url = reverse('dashboards:comment-list')
+        response = self.client.post(url, {'body': 'deep', 'task': self.task.pk, 'parent': parent.pk})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {'body': 'elsewhere', 'task': other_task.pk, 'parent': parent.parent_id})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {'body': 'reply', 'task': self.task.pk, 'parent': parent.parent_id})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['depth'], COMMENT_MAX_DEPTH - 1)
+
+    def test_threads_require_access(self):
+        self.client.force_authenticate(User.objects.create_user(email="stranger@example.com", password="password"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class UploadSessionAPITestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.stranger = User.objects.create_user(email="stranger@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.task = Task.objects.create(title="Task", status=self.task_list)
+        self.content = b'0123456789abcdefghij'
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        user_work_spaces(self.owner)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            FILE_UPLOAD_TEMP_DIR=os.path.join(directory.name, 'tmp'), MEDIA_ROOT=os.path.join(directory.name, 'media')
+            )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        os.makedirs(settings.options['FILE_UPLOAD_TEMP_DIR'])
+        chunk_size = mock.patch('trello.apps.dashboards.uploads.UPLOAD_CHUNK_SIZE', 8)
+        chunk_size.start()
+        self.addCleanup(chunk_size.stop)
+
+    def _start(self, content=None, **data):
+        content = self.content if content is None else content
+        data = {'task': self.task.pk, 'filename': 'report.pdf', 'size': len(content),
+                'checksum': hashlib.sha256(content).hexdigest(), **data}
+        return self.client.post(reverse('dashboards:uploadsession-list'), data)
+
+    def _put(self, session_id, offset, chunk):
+        url = reverse('dashboards:uploadsession-chunk', args=[session_id])
+        return self.client.put(f'{url}?offset={offset}', chunk, content_type='application/octet-stream')
+
+    def _complete(self, session_id):
+        return self.client.post(reverse('dashboards:uploadsession-complete', args=[session_id]))
+
+    def test_chunks_are_resumed_and_attached(self):
+        response = self._start()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['received'], response.data['chunk_size']), (0, 8))
+        session_id = response.data['id']
+        self.assertEqual(self._put(session_id, 8, self.content[8:16]).status_code, 400)
+        self.assertEqual(self._put(session_id, 0, self.content[:8]).data['received'], 8)
+        self.assertEqual(self._put(session_id, 8, self.content[8:16]).data['received'], 16)
+        # A retried chunk is written again without moving the offset back.
+        self.assertEqual(self._put(session_id, 8, self.content[8:16]).data['received'], 16)
+        self.assertEqual(self._complete(session_id).status_code, 400)
+        retrieved = self.client.get(reverse('dashboards:uploadsession-detail', args=[session_id]))
+        self.assertEqual(retrieved.data['received'], 16)
+        self.assertEqual(self._put(session_id, 16, self.content[16:]).data['received'], 20)
+        path = uploads.partial_path(session_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._complete(session_id)
+        self.assertEqual(response.status_code, 201)
+        attachment = Attachment.objects.get(pk=response.data['id'])
+        self.assertEqual((attachment.task, attachment.owner), (self.task, self.owner))
+        with attachment.file.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
+        self.assertEqual(attachment.name, 'report.pdf')
+        self.assertEqual(attachment.file.name, blob_name(hashlib.sha256(self.content).hexdigest(), 'report.pdf'))
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(Activity.objects.filter(task=self.task, event_type=EventType.ATTACHMENT_CREATED).exists())
+
+    def test_chunks_are_validated(self):
+        session_id = self._start().data['id']
+        for offset, chunk in [(3, self.content[3:11]), (0, self.content[:5]), (24, b'x'), ('a', b'')]:
+            with self.subTest(offset=offset):
+                self.assertEqual(self._put(session_id, offset, chunk).status_code, 400)
+        self.assertEqual(UploadSession.objects.get(pk=session_id).received, 0)
+        self.assertEqual(self._start(size=0).status_code, 400)
+        self.assertEqual(self._start(checksum='not a checksum').status_code, 400)
+
+    def test_mismatched_file_is_received_again(self):
+        session_id = self._start().data['id']
+        for offset in range(0, len(self.content), 8):
+            self._put(session_id, offset, b'-' * len(self.content[offset:offset + 8]))
+        response = self._complete(session_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get(pk=session_id).received, 0)
+        self.assertFalse(Attachment.objects.exists())
+
+    def test_sessions_require_access(self):
+        session_id = self._start().data['id']
+        self.client.force_authenticate(self.stranger)
+        self.assertEqual(self._start().status_code, 403)
+        self.assertEqual(self._put(session_id, 0, self.content[:8]).status_code, 404)
+        self.assertEqual(self._complete(session_id).status_code, 404)
+
+    def test_abandoned_sessions_are_purged(self):
+        stale, fresh = self._start().data['id'], self._start().data['id']
+        for session_id in (stale, fresh):
+            self._put(session_id, 0, self.content[:8])
+        orphan = uploads.partial_path('orphan')
+        with open(orphan, 'wb'):
+            pass
+        expired = (timezone.now() - UPLOAD_SESSION_TTL - timedelta(minutes=1)).timestamp()
+        for path in (orphan, uploads.partial_path(stale)):
+            os.utime(path, (expired, expired))
+        UploadSession.objects.filter(pk=stale).update(update_at=timezone.now() - UPLOAD_SESSION_TTL * 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(UploadSession.purge_expired(), 1)
+        self.assertEqual([str(pk) for pk in UploadSession.objects.values_list('pk', flat=True)], [fresh])
+        self.assertEqual(os.listdir(uploads.upload_directory()), [f'{fresh}.part'])
+
+
+class SparseFieldsAPITestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.task = Task.objects.create(title="Task", description="Long description", status=self.task_list)
+        self.task.labels.add(Label.objects.create(title="Label", board=self.board))
+        self.task.assigned_to.add(self.owner)
+        Comment.objects.create(body="Comment", task=self.task, author=self.owner)
+        self.url = reverse('dashboards:task-detail', args=[self.task.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        user_work_spaces(self.owner)
+
+    def test_fields_trim_the_payload_and_the_queries(self):
+        with CaptureQueriesContext(connection) as full:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as sparse:
+            response = self.client.get(self.url, {'fields': 'id,title,order'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {'id', 'title', 'order'})
+        self.assertLess(len(sparse), len(full))
+        self.assertEqual(len(sparse), 1, [query['sql'] for query in sparse])
+        self.assertNotIn('"description"', sparse[0]['sql'])
+        self.assertNotIn('dashboards_tasklist', sparse[0]['sql'])
+
+    def test_expand_adds_relations_to_the_plain_fields(self):
+        response = self.client.get(self.url, {'expand': 'obj_labels'})
+        self.assertIn('description', response.data)
+        self.assertEqual([label['title'] for label in response.data['obj_labels']], ['Label'])
+        self.assertNotIn('task_comments', response.data)
+        response = self.client.get(self.url, {'fields': 'id', 'expand': 'task_comments,obj_status'})
+        self.assertEqual(set(response.data), {'id', 'task_comments', 'obj_status'})
+        self.assertEqual(response.data['task_comments']['count'], 1)
+        self.assertEqual(response.data['obj_status']['title'], 'Todo')
+        self.assertEqual(set(self.client.get(self.url, {'expand': ''}).data), set(
+            self.client.get(self.url).data) - set(TaskSerializer.Meta.expandable_fields))
+
+    def test_unknown_names_are_rejected(self):
+        response = self.client.get(self.url, {'fields': 'id,secret', 'expand': 'title'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'fields', 'expand'})
+        self.assertEqual(self.client.get(self.url, {'fields': 'labels'}).status_code, 400)
+
+    def test_each_selection_has_its_own_etag(self):
+        full = self.client.get(self.url)
+        sparse = self.client.get(self.url, {'fields': 'id,title'})
+        self.assertNotEqual(full['ETag'], sparse['ETag'])
+        self.assertEqual(
+            self.client.get(self.url, {'fields': 'title,id'}, HTTP_IF_NONE_MATCH=sparse['ETag']).status_code, 304
+            )
+        self.assertEqual(set(self.client.get(self.url).data), set(full.data))
+
+    def test_other_viewsets(self):
+        urls = {
+            reverse('dashboards:tasklist-detail', args=[self.task_list.pk]): 'status_tasks',
+            reverse('dashboards:board-detail', args=[self.board.pk]): 'board_Tasklists',
+            reverse('dashboards:workspace-detail', args=[self.work_space.pk]): 'work_space_boards',
+        }
+        for url, relation in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, {'fields': 'id,title'})
+                self.assertEqual(response.data, {'id': response.data['id'], 'title': response.data['title']})
+                self.assertEqual(len(self.client.get(url, {'expand': relation}).data[relation]), 1)
+
+
+class ValuesListSerializerTestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.member = User.objects.create_user(email="member@example.com", password="password", avatar=None)
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.work_space.members.add(self.member)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        Board.objects.create(title="Other Board", work_space=self.work_space)
+        labels = [Label.objects.create(title=f"Label {i}", board=self.board) for i in range(3)]
+        for i in range(3):
+            task_list = TaskList.objects.create(title=f"List {i}", board=self.board)
+            for j in range(4):
+                task = Task.objects.create(
+                    title=f"Task {j}", status=task_list, start_date=timezone.now() if j % 2 else None,
+                    )
+                task.labels.add(*labels[:j])
+                task.assigned_to.add(*[self.owner, self.member][:j % 3])
+        self.request = APIRequestFactory().get('/')
+
+    def _render(self, serializer):
+        return JSONRenderer().render(serializer.data)
+
+    def test_output_matches_the_model_serializers(self):
+        sources = {
+            UserListSerializer: User.objects.order_by('email'),
+            BoardListSerializer: Board.objects.order_by('title'),
+            TaskListListSerializer: TaskList.objects.order_by('title'),
+            TaskModelListSerializer: Task.objects.order_by('status__title', 'rank'),
+        }
+        for serializer_class, queryset in sources.items():
+            expected = self._render(serializers.ListSerializer(
+                child=serializer_class(), instance=queryset, context={'request': self.request}
+                ))
+            for data in (queryset.all(), list(queryset.all()), list(queryset.all().prefetch_related(
+                    *[field for field in ('labels', 'assigned_to') if field in serializer_class.Meta.fields]
+                    ))):
+                with self.subTest(serializer=serializer_class.__name__, data=type(data).__name__):
+                    serializer = serializer_class(data, many=True, context={'request': self.request})
+                    self.assertIsInstance(serializer, ValuesListSerializer)
+                    self.assertEqual(self._render(serializer), expected)
+
+    def test_many_to_many_keys_are_loaded_per_list(self):
+        tasks = Task.objects.all()
+        with self.assertNumQueries(3):
+            TaskModelListSerializer(tasks, many=True).data
+        loaded = list(tasks.all())
+        with self.assertNumQueries(2):
+            TaskModelListSerializer(loaded, many=True).data
+
+    def test_nested_lists(self):
+        task_list = TaskList.objects.order_by('title').last()
+        response = APIClient()
+        response.force_authenticate(self.owner)
+        user_work_spaces(self.owner)
+        data = response.get(reverse('dashboards:tasklist-detail', args=[task_list.pk])).data
+        self.assertEqual(
+            [(task['title'], len(task['labels']), len(task['assigned_to'])) for task in data['status_tasks']],
+            [(f'Task {j}', j, j % 3) for j in range(4)],
+            )
+
+
+class SearchAPITestCase(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@example.com", password="password")
+        self.stranger = User.objects.create_user(email="stranger@example.com", password="password")
+        self.work_space = WorkSpace.objects.create(title="Test WorkSpace", owner=self.owner)
+        self.board = Board.objects.create(title="Test Board", work_space=self.work_space)
+        self.task_list = TaskList.objects.create(title="Todo", board=self.board)
+        self.task = Task.objects.create(title="Design the login page", description="Forms", status=self.task_list)
+        self.other = Task.objects.create(title="Release", description="Ship the redesigned pages", status=self.task_list)
+        self.comment = Comment.objects.create(body="The design needs a review", task=self.other, author=self.owner)
+        self.attachment = Attachment.objects.create(task=self.task, owner=self.owner, file='uploads/attachments/mockups.png')
+        strange_space = WorkSpace.objects.create(title="Other WorkSpace", owner=self.stranger)
+        strange_list = TaskList.objects.create(
+            title="Todo", board=Board.objects.create(title="Other Board", work_space=strange_space)
+            )
+        Task.objects.create(title="Design elsewhere", status=strange_list)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = reverse('dashboards:search')
+
+    def _search(self, q, **params) -> list:
+        response = self.client.get(self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(result['model'], result['object_id']) for result in response.data['results']]
+
+    def test_search(self):
+        response = self.client.get(self.url, {'q': 'design'})
+        self.assertIsNone(response.data['next'])
+        first, second = response.data['results']
+        # Titles weigh more than bodies.
+        self.assertEqual((first['model'], first['object_id']), ('task', str(self.task.id)))
+        self.assertEqual((first['board'], first['work_space']), (str(self.board.id), str(self.work_space.id)))
+        self.assertEqual((second['model'], second['task']), ('comment', self.other.id))
+        self.assertGreater(first['rank'], second['rank'])
+
+    def test_pages_are_not_counted(self):
+        response = self.client.get(self.url, {'q': 'design', 'limit': 1})
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 1)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.data['results'][0]['object_id'], str(self.comment.id))
+        self.assertIsNone(response.data['next'])
+
+    def test_words_are_matched_as_typed(self):
+        self.assertEqual(self._search('login design'), [('task', str(self.task.id))])
+        self.assertEqual(self._search('ship redesig'), [('task', str(self.other.id))])
+        self.assertEqual(self._search('mockups'), [('attachment', str(self.attachment.id))])
+        self.assertEqual(self._search('design -review OR "page*'), [])
+        self.assertEqual(self._search('"*"'), [])
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    def test_filters(self):
+        self.assertEqual(self._search('design', model='comment'), [('comment', str(self.comment.id))])
+        self.assertEqual(len(self._search('design', board=self.board.id)), 2)
+        self.assertEqual(self._search('design', work_space=self.stranger.owner_work_spaces.get().id), [])
+
+    def test_index_follows_writes(self):
+        self.task.update_task(self.owner, title="Sketch the login page")
+        self.assertEqual(self._search('sketch'), [('task', str(self.task.id))])
+        self.assertEqual(self._search('design'), [('comment', str(self.comment.id))])
+        self.comment.update_comment(body="Looks fine")
+        self.assertEqual(self._search('design'), [])
+        self.comment.archive()
+        self.assertEqual(self._search('fine'), [])
+        self.comment.restore()
+        self.assertEqual(self._search('fine'), [('comment', str(self.comment.id))])
+        self.board.archive()
+        self.assertEqual(self._search('login'), [])
+        self.board.restore()
+        self.assertEqual(len(self._search('login')), 1)
+        self.comment.delete()
+        self.other.delete()
+        self.assertEqual(SearchEntry.objects.count(), 3)
+
+    def test_moves_are_not_indexed(self):
+        second_list = TaskList.objects.create(title="Done", board=self.board)
+        with CaptureQueriesContext(connection) as queries:
+            self.task.move(self.owner, status=second_list)
+        self.assertFalse([query for query in queries if 'searchentry' in query['sql']])
+
+
+class RankTestCase(TestCase):
+
+    def test_key_between(self):
+        self.assertLess('', key_between())
+        self.assertLess('i', key_between('i'))
+        self.assertEqual(key_between('a', 'b'), 'ai')
+        keys = [key_between()]
+        for _ in range(50):
+            keys.insert(1, key_between(keys[0], keys[1] if len(keys) > 1 else None))
+            keys.insert(0, key_between('', keys[0]))
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+        with self.assertRaises(ValueError):
+            key_between('b', 'a')
+
+    def test_key_after(self):
+        keys = ['i']
+        for _ in range(3000):
+            keys.append(key_between(keys[-1]))
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+        self.assertFalse(any(key.endswith('0') for key in keys))
+        self.assertEqual((key_after('j'), key_after('iz'), key_after('z')), ('k', 'j1', 'z01'))
+        self.assertLessEqual(max(map(len, keys)), 7)
+
+    def test_spread_keys(self):
+        keys = spread_keys(2000)
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), 2000)
+        self.assertFalse(any(key.endswith('0') for key in keys))
+
+
 class ActivityTestCase(TestCase):
     def setUp(self):
         self.user = User.objects.create(email="test@example.com", password="password")
@@ -464,8 +2125,28 @@ class ActivityTestCase(TestCase):
         message = f"{self.user} created a new task."
         task_create_activity = Activity.objects.create(task=self.task, doer=self.user, message=message)
         activities = Activity.task_create_activity_on_board(self.board)
-        self.assertEqual(activities.count(), 1)  
-        self.assertEqual(activities.first(), task_create_activity)  
+        # The Task.create_task call in setUp is a task create activity too.
+        self.assertEqual(activities.count(), 2)  
+        self.assertEqual(activities.last(), task_create_activity)  
+
+    def test_producers_write_event_type_and_board(self):
+        activity = Activity.objects.get(task=self.task, event_type=EventType.TASK_CREATED)
+        self.assertEqual(activity.board, self.board)
+        self.assertEqual(activity.payload, {'title': 'Test Task'})
+        self.task.update_task(doer=self.user, title='New title', assigned_to=[self.user])
+        self.assertEqual(
+            set(self.task.task_activity.values_list('event_type', flat=True)),
+            {EventType.TASK_CREATED, EventType.OTHER, EventType.TASK_TITLE_CHANGED, EventType.TASK_ASSIGNED},
+        )
+        assigned = self.task.task_activity.get(event_type=EventType.TASK_ASSIGNED)
+        self.assertEqual(assigned.payload, {'user': str(self.user.id)})
+
+    def test_parse_message(self):
+        self.assertEqual(parse_message("Task 'Cards' was created."), (EventType.TASK_CREATED, {'title': 'Cards'}))
+        self.assertEqual(parse_message("Task status was changed to Done."), (EventType.TASK_STATUS_CHANGED, {'title': 'Done'}))
+        self.assertEqual(parse_message("ali removed from task assigness."), (EventType.TASK_UNASSIGNED, {'user': 'ali'}))
+        self.assertEqual(parse_message("ali deleted a attachment on task Cards."), (EventType.ATTACHMENT_DELETED, {}))
+        self.assertEqual(parse_message("something else"), (EventType.OTHER, {}))
 
     def test_from_to_date_on_board(self):
         from_date = datetime(2023, 1, 1)
@@ -501,6 +2182,88 @@ class ActivityTestCase(TestCase):
 
 
 
+class ActivityRecorderTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="test@example.com", password="password")
+        self.other_user = User.objects.create(email="other@example.com", password="password")
+        self.workspace = WorkSpace.objects.create(title='Test Workspace' , owner=self.user)
+        self.board = Board.objects.create(title='Test Board' , work_space=self.workspace)
+        self.tasklist = TaskList.objects.create(title='Test Task List' , board=self.board)
+        self.task = Task.objects.create(title='Test Task', description='Test Description', status=self.tasklist)
+
+    def _activity_inserts(self, queries):
+        return [query for query in queries if query['sql'].startswith(f'INSERT INTO "{Activity._meta.db_table}"')]
+
+    def test_update_task_inserts_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.task.update_task(
+                doer=self.user,
+                title='New title',
+                description='New description',
+                start_date=timezone.now(),
+                end_date=timezone.now(),
+                assigned_to=[self.user, self.other_user],
+            )
+        self.assertEqual(len(self._activity_inserts(queries)), 1)
+        self.assertEqual(self.task.task_activity.count(), 6)
+
+    def test_nested_recorders_flush_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            with ActivityRecorder() as recorder:
+                comment = Comment.create_comment(body='Body', task=self.task, author=self.user)
+                comment.update_comment(body='Other body')
+                Attachment.create(file='file.pdf', task=self.task, owner=self.user)
+                self.assertEqual(len(recorder.activities), 3)
+                self.assertFalse(self.task.task_activity.exists())
+        self.assertEqual(len(self._activity_inserts(queries)), 1)
+        self.assertEqual(self.task.task_activity.count(), 3)
+
+    def test_request_inserts_once(self):
+        label = Label.objects.create(title='Bug', board=self.board)
+        other_list = TaskList.objects.create(title='Done', board=self.board)
+        self.workspace.members.add(self.other_user)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.patch(reverse('dashboards:task-detail', args=[self.task.pk]), {
+                'title': 'New title',
+                'status': other_list.pk,
+                'labels': [label.pk],
+                'assigned_to': [self.other_user.pk],
+                }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self._activity_inserts(queries)), 1)
+        change_inserts = [query for query in queries if query['sql'].startswith(f'INSERT INTO "{Change._meta.db_table}"')]
+        self.assertEqual(len(change_inserts), 1)
+        self.assertEqual(self.task.task_activity.count(), 3)
+        self.assertEqual(len(response.data['task_activity']), 3)
+
+    def test_error_responses_roll_back(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        def archive(task):
+            ActivityRecorder.record(task=task, doer=self.user, message='lost')
+            Task.objects.filter(pk=task.pk).update(title='lost')
+            raise serializers.ValidationError('Task cannot be archived.')
+
+        with mock.patch.object(Task, 'archive', archive):
+            response = client.delete(reverse('dashboards:task-detail', args=[self.task.pk]))
+        self.assertEqual(response.status_code, 400)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.title, 'Test Task')
+        self.assertFalse(self.task.task_activity.exists())
+
+    def test_recorder_discards_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with ActivityRecorder():
+                ActivityRecorder.record(task=self.task, doer=self.user, message='lost')
+                raise RuntimeError
+        self.assertFalse(self.task.task_activity.exists())
+        ActivityRecorder.record(task=self.task, doer=self.user, message='saved')
+        self.assertTrue(self.task.task_activity.filter(message='saved').exists())
+
+
 class AttachmentTestCase(TestCase):
     def setUp(self):
         self.user = User.objects.create(email="test@example.com", password="password")
@@ -0,0 +1,99 @@
+"""
+Files of upload sessions, which receive an attachment in chunks.
+
+Each session writes to its own partial file, one chunk per request, read
+from the request body in blocks and written at the offset of the chunk, so
+neither a chunk nor the file is held in memory. Partial files live in
+FILE_UPLOAD_TEMP_DIR, or the temporary directory of the system, and are
+removed with their session.
+"""
+import hashlib
+import os
+import tempfile
+from django.conf import settings
+from django.core.files import File
+
+# Bytes of every chunk but the last; below the body size limit of nginx.
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Largest file a session accepts.
+UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024
+# Bytes read from a request or a partial file at a time.
+UPLOAD_BLOCK_SIZE = 64 * 1024
+
+
+class IncompleteChunk(Exception):
+    """
+    The request body ended before the chunk did.
+    """
+
+
+class PartialFile(File):
+    """
+    A finished partial file, which storages move instead of copying.
+    """
+
+    def temporary_file_path(self) -> str:
+        return self.file.name
+
+
+def upload_directory() -> str:
+    return os.path.join(settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir(), 'trello-uploads')
+
+
+def partial_path(session_id) -> str:
+    return os.path.join(upload_directory(), f'{session_id}.part')
+
+
+def write_chunk(path: str, offset: int, stream, length: int) -> None:
+    """
+    Writes `length` bytes of `stream` to the file at `path` from `offset`.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Opened without truncating, as chunks of the file may be written concurrently.
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT, 0o600)
+    with os.fdopen(descriptor, 'wb') as file:
+        file.seek(offset)
+        remaining = length
+        while remaining:
+            block = stream.read(min(UPLOAD_BLOCK_SIZE, remaining))
+            if not block:
+                raise IncompleteChunk(f'Chunk ended {remaining} bytes early')
+            file.write(block)
+            remaining -= len(block)
+
+
+def checksum(path: str) -> str:
+    """
+    Returns the SHA-256 hex digest of the file at `path`.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while block := file.read(UPLOAD_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def discard(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def sweep(keep: set, before: float) -> int:
+    """
+    Removes the partial files last written before the timestamp `before`
+    whose session ids are not in `keep`, as left behind by crashes.
+    Returns how many were removed.
+    """
+    removed = 0
+    try:
+        entries = list(os.scandir(upload_directory()))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        name, extension = os.path.splitext(entry.name)
+        if extension == '.part' and name not in keep and entry.stat().st_mtime < before:
+            discard(entry.path)
+            removed += 1
+    return removed
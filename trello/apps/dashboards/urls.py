@@ -1,15 +1,35 @@
+from django.urls import path
 from rest_framework import routers
 from trello.apps.dashboards.views import workspace_views, tasklist_views, task_views, board_views,\
-      attachment_views, label_views, comment_views
+      attachment_views, label_views, comment_views, event_views, activity_views, search_views, \
+      upload_views
 
 
 app_name = 'dashboards'
-urlpatterns = []
+urlpatterns = [
+    path('boards/<uuid:pk>/events/', event_views.board_events, name='board-events'),
+    path('tasks/<uuid:pk>/activities/', activity_views.ActivityFeedView.as_view(scope='task'),
+         name='task-activities'),
+    path('tasks/<uuid:pk>/comments/', comment_views.TaskCommentListView.as_view(scope='task'),
+         name='task-comments'),
+    path('tasks/<uuid:pk>/threads/', comment_views.TaskThreadListView.as_view(scope='task'),
+         name='task-threads'),
+    path('tasks/<uuid:pk>/attachments/', attachment_views.TaskAttachmentListView.as_view(scope='task'),
+         name='task-attachments'),
+    path('boards/<uuid:pk>/activities/', activity_views.ActivityFeedView.as_view(scope='board'),
+         name='board-activities'),
+    path('workspaces/<uuid:pk>/activities/', activity_views.ActivityFeedView.as_view(scope='work_space'),
+         name='workspace-activities'),
+    path('users/<uuid:pk>/activities/', activity_views.ActivityFeedView.as_view(scope='doer'),
+         name='user-activities'),
+    path('search/', search_views.SearchView.as_view(), name='search'),
+]
 
 router = routers.DefaultRouter()
 router.register(prefix='comments' ,viewset=comment_views.CommentViewSet)
 router.register(prefix='labels' ,viewset=label_views.LabelViewSet)
 router.register(prefix='attachment' ,viewset=attachment_views.AttachmentViewSet)
+router.register(prefix='uploads', viewset=upload_views.UploadSessionViewSet)
 router.register(prefix='boards', viewset=board_views.BoardModelViewSet)
 router.register(prefix='workspaces' ,viewset=workspace_views.WorkspaceViewSet)
 router.register(prefix='tasks' ,viewset=task_views.TaskViewSet)
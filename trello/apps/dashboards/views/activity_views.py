@@ -0,0 +1,23 @@
+from rest_framework import generics
+from ..filters import ActivityFilter
+from ..models import Activity
+from ..permissions import user_work_spaces
+from ..serializers import ActivityListSerializer
+from .mixins import ScopedFeedMixin
+
+
+class ActivityFeedView(ScopedFeedMixin, generics.ListAPIView):
+    """
+    Lists the activities of a task, board, workspace or doer, newest first.
+    `scope` names the Activity field matched against the id in the url.
+    Doer feeds only hold activities of workspaces the requesting user can access.
+    """
+    model = Activity
+    serializer_class = ActivityListSerializer
+    filterset_class = ActivityFilter
+
+    def get_queryset(self):
+        if self.scope != 'doer' or getattr(self, 'swagger_fake_view', False):
+            return super().get_queryset()
+        owned, membered = user_work_spaces(self.request.user)
+        return Activity.objects.filter(doer=self.kwargs['pk'], work_space__in=owned | membered)
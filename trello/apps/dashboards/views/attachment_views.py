@@ -1,10 +1,12 @@
-from rest_framework import viewsets, mixins
+from rest_framework import generics, viewsets, mixins
 from trello.apps.dashboards.models import Attachment
-from trello.apps.dashboards.serializers import AttachmentSerializer
+from trello.apps.dashboards.serializers import AttachmentListSerializer, AttachmentSerializer
 from trello.apps.dashboards.permissions import AttachmentPermissions
+from .mixins import RecordedActivityMixin, ScopedFeedMixin
 
 
-class AttachmentViewSet(mixins.CreateModelMixin,
+class AttachmentViewSet(RecordedActivityMixin,
+                        mixins.CreateModelMixin,
                         mixins.RetrieveModelMixin,
                         mixins.UpdateModelMixin,
                         mixins.DestroyModelMixin,
@@ -21,4 +23,11 @@ class AttachmentViewSet(mixins.CreateModelMixin,
 
     def perform_destroy(self, instance):
         return instance.archive()
-    
\ No newline at end of file
+
+
+class TaskAttachmentListView(ScopedFeedMixin, generics.ListAPIView):
+    """
+    Lists the attachments of a task, newest first.
+    """
+    model = Attachment
+    serializer_class = AttachmentListSerializer
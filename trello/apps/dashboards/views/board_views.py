@@ -1,11 +1,22 @@
 from rest_framework.viewsets import GenericViewSet, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db.models import Q
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from trello.apps.accounts.models import User
+from trello.apps.core.responses import JSONStream, StreamingJSONResponse
+from trello.apps.core.serializers import ValuesListSerializer
+from .mixins import CachedRetrieveMixin, RecordedActivityMixin, SparseFieldsMixin
 from ..permissions import BoardPermission
-from ..serializers import BoardSerializer
-from ..models import Board, TaskList, Label
+from ..serializers import ActivityListSerializer, BoardSerializer, BoardSnapshotSerializer, BoardSyncSerializer, \
+    CommentListSerializer, LabelSyncSerializer, TaskListSyncSerializer, TaskSyncSerializer, UserListSerializer
+from ..models import Activity, Board, Comment, Task, TaskList, Label
 
-class BoardModelViewSet(mixins.CreateModelMixin,
+class BoardModelViewSet(RecordedActivityMixin,
+                        SparseFieldsMixin,
+                        CachedRetrieveMixin,
+                        mixins.CreateModelMixin,
                         mixins.RetrieveModelMixin,
                         mixins.UpdateModelMixin,
                         mixins.DestroyModelMixin,
@@ -14,7 +25,17 @@ class BoardModelViewSet(mixins.CreateModelMixin,
     serializer_class = BoardSerializer
     queryset = Board.objects.all().select_related('work_space').prefetch_related('board_Tasklists')
     permission_classes = [BoardPermission]
-    
+    conditional_relations = ('work_space', 'board_Tasklists', 'board_tasks')
+
+    def get_fragment_scope(self, instance) -> tuple:
+        return instance.work_space_id, instance.pk
+
+    def get_queryset(self):
+        if self.action in ('snapshot', 'export'):
+            # These load their own relations once permissions pass.
+            return Board.objects.all().select_related('work_space')
+        return super().get_queryset()
+
     def perform_destroy(self, instance):
         return instance.archive()
 
@@ -30,4 +51,35 @@ class BoardModelViewSet(mixins.CreateModelMixin,
         board = self.get_object()
         query = Label.objects.filter(board=board)
         serializer = self.get_serializer(query, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+    @extend_schema(responses=BoardSnapshotSerializer)
+    @action(detail=True)
+    def snapshot(self, request, pk=None):
+        board = self.get_object().load_snapshot()
+        serializer = BoardSnapshotSerializer(board, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    @action(detail=True)
+    def export(self, request, pk=None):
+        """
+        Streams the board with its members, task lists, labels, tasks,
+        comments and activities. Rows are read and encoded in chunks, so
+        boards of any size are exported in constant memory.
+        """
+        board = self.get_object()
+        context = self.get_serializer_context()
+        stream = lambda serializer, queryset: JSONStream(ValuesListSerializer(child=serializer, context=context), queryset)
+        members = User.objects.filter(Q(pk=board.work_space.owner_id) | Q(member_work_spaces=board.work_space_id))
+        return StreamingJSONResponse({
+            'board': BoardSyncSerializer(board, context=context).data,
+            'members': stream(UserListSerializer(), members.distinct().order_by('email')),
+            'task_lists': stream(TaskListSyncSerializer(), TaskList.objects.filter(board=board).order_by('create_at')),
+            'labels': stream(LabelSyncSerializer(), Label.objects.filter(board=board).order_by('create_at')),
+            'tasks': stream(TaskSyncSerializer(), Task.objects.filter(board=board).order_by('status', 'rank')),
+            'comments': stream(CommentListSerializer(), Comment.objects.filter(board=board).order_by('create_at', 'id')),
+            'activities': stream(
+                ActivityListSerializer(), Activity.objects.filter(board=board).order_by('create_at', 'id')
+                ),
+            }, request=request)
@@ -1,10 +1,13 @@
+from rest_framework import generics
 from rest_framework.viewsets import mixins, GenericViewSet
 from trello.apps.dashboards.models import Comment
-from trello.apps.dashboards.serializers import CommentSerializer
+from trello.apps.dashboards.serializers import CommentListSerializer, CommentSerializer, CommentThreadSerializer
 from trello.apps.dashboards.permissions import CommentPermission
+from .mixins import RecordedActivityMixin, ScopedFeedMixin
 
 
-class CommentViewSet(mixins.CreateModelMixin,
+class CommentViewSet(RecordedActivityMixin,
+                   mixins.CreateModelMixin,
                    mixins.RetrieveModelMixin,
                    mixins.UpdateModelMixin,
                    mixins.DestroyModelMixin,
@@ -19,4 +22,28 @@ class CommentViewSet(mixins.CreateModelMixin,
     permission_classes = [CommentPermission]
 
     def perform_destroy(self, instance):
-        return instance.archive()
\ No newline at end of file
+        return instance.archive()
+
+
+class TaskCommentListView(ScopedFeedMixin, generics.ListAPIView):
+    """
+    Lists the comments of a task, newest first.
+    """
+    model = Comment
+    serializer_class = CommentListSerializer
+
+
+class TaskThreadListView(ScopedFeedMixin, generics.ListAPIView):
+    """
+    Lists the top-level comments of a task, newest first, each with its
+    replies nested in the order they were written. The replies of a page
+    are loaded with one query.
+    """
+    model = Comment
+    serializer_class = CommentThreadSerializer
+
+    def get_queryset(self):
+        return super().get_queryset().filter(parent=None).select_related('author')
+
+    def paginate_queryset(self, queryset):
+        return Comment.load_threads(super().paginate_queryset(queryset))
@@ -0,0 +1,126 @@
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .. import live
+from ..models import Board, Change
+from ..permissions import has_work_spaces_access
+
+# Seconds between comments that keep idle connections open through proxies.
+LIVE_KEEPALIVE = 15
+# Seconds after which a stream ends; the client reconnects with Last-Event-ID,
+# so streams of clients that went away are not kept forever.
+LIVE_MAX_DURATION = 300
+# Entries replayed to a reconnecting client before it is told to resync.
+LIVE_REPLAY_LIMIT = 100
+# Milliseconds browsers wait before reconnecting.
+LIVE_RETRY = 3000
+
+
+def _authenticate(request):
+    """
+    Returns the user of the JWT in the Authorization header or, since
+    EventSource cannot send headers, in the `token` query parameter, falling
+    back to the session.
+    """
+    authentication = JWTAuthentication()
+    try:
+        if result := authentication.authenticate(request):
+            return result[0]
+        if token := request.GET.get('token'):
+            return authentication.get_user(authentication.get_validated_token(token))
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+
+def _board_work_space(user, board_id):
+    """
+    Returns the workspace id of the board, or None when it does not exist or
+    the user has no access to it.
+    """
+    work_space_id = Board.objects.filter(pk=board_id).values_list('work_space', flat=True).first()
+    if work_space_id is None or not has_work_spaces_access(user, [work_space_id]):
+        return None
+    return work_space_id
+
+
+def _replay(board_id, last_event_id) -> list:
+    """
+    Returns the entries of the board after the last event the client got,
+    or a resync event when there are too many of them. The entries of a
+    workspace, and so of its boards, commit in id order (see Change), so none
+    can be skipped by the id of the last event.
+    """
+    rows = list(
+        Change.objects.filter(board=board_id, id__gt=last_event_id)
+        .order_by('id').values('id', 'work_space', 'board', 'model', 'object_id', 'action')[:LIVE_REPLAY_LIMIT + 1]
+        )
+    if len(rows) > LIVE_REPLAY_LIMIT:
+        return [live.RESYNC]
+    return [{'cursor': row.pop('id'), **row} for row in rows]
+
+
+def _format(entry: dict) -> str:
+    if entry is live.RESYNC:
+        return 'event: resync\ndata: {}\n\n'
+    data = json.dumps({key: value for key, value in entry.items() if key != 'work_space'}, cls=DjangoJSONEncoder)
+    # Databases that do not return ids from bulk inserts leave the cursor unknown.
+    event_id = f"id: {entry['cursor']}\n" if entry['cursor'] is not None else ''
+    return f"{event_id}event: change\ndata: {data}\n\n"
+
+
+async def _stream(work_space_id, board_id, last_event_id: int | None):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LIVE_MAX_DURATION
+    last_cursor = 0
+    # Subscribe before the replay is read, so that nothing falls in between.
+    subscription = live.hub.subscribe(work_space_id, board_id)
+    try:
+        yield f'retry: {LIVE_RETRY}\n\n'
+        replayed = [] if last_event_id is None else await sync_to_async(_replay)(board_id, last_event_id)
+        for entry in replayed:
+            last_cursor = entry.get('cursor', last_cursor)
+            yield _format(entry)
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                entry = await asyncio.wait_for(subscription.get(), timeout=min(LIVE_KEEPALIVE, remaining))
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if entry is not live.RESYNC:
+                # Entries published while the replay was read arrive twice.
+                if entry['cursor'] is not None and entry['cursor'] <= last_cursor:
+                    continue
+                last_cursor = entry['cursor'] or last_cursor
+            yield _format(entry)
+    finally:
+        live.hub.unsubscribe(subscription)
+
+
+async def board_events(request, pk):
+    """
+    Streams the change log entries of a board as Server-Sent Events.
+    Entries are `change` events whose id is the change feed cursor; a
+    `resync` event tells the client to read the change feed from its last
+    cursor. Reconnecting clients get the entries after Last-Event-ID first.
+    """
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    work_space_id = await sync_to_async(_board_work_space)(user, pk)
+    if work_space_id is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    last_event_id = int(last_event_id) if last_event_id.isdigit() else None
+    response = StreamingHttpResponse(
+        _stream(work_space_id, pk, last_event_id), content_type='text/event-stream'
+        )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
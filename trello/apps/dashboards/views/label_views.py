@@ -2,9 +2,11 @@ from rest_framework.viewsets import GenericViewSet, mixins
 from trello.apps.dashboards.serializers import LabelSerializer
 from trello.apps.dashboards.models import Label
 from trello.apps.dashboards.permissions import LabelPermission
+from .mixins import RecordedActivityMixin
 
 
-class LabelViewSet(mixins.CreateModelMixin,
+class LabelViewSet(RecordedActivityMixin,
+                   mixins.CreateModelMixin,
                    mixins.RetrieveModelMixin,
                    mixins.UpdateModelMixin,
                    mixins.DestroyModelMixin,
@@ -15,5 +17,5 @@ class LabelViewSet(mixins.CreateModelMixin,
     """
  
     serializer_class = LabelSerializer
-    queryset = Label.objects.all()
+    queryset = Label.objects.all().select_related('board')
     permission_classes = [LabelPermission]
\ No newline at end of file
@@ -0,0 +1,167 @@
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from trello.apps.core.views import ConditionalRetrieveMixin
+from .. import fragments
+from ..models import ActivityRecorder, Board, Task
+from ..pagination import KeysetPagination
+from ..permissions import has_work_space_access
+
+
+class RecordedActivityMixin:
+    """
+    Handles unsafe requests in a transaction with one ActivityRecorder, so the
+    activities and change log entries of all the writes of a request are
+    inserted with one statement per table, right before it commits.
+    Error responses roll the request back, recorded rows included.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with transaction.atomic(), ActivityRecorder() as recorder:
+            response = super().dispatch(request, *args, **kwargs)
+            if getattr(response, 'exception', False):
+                recorder.discard()
+                transaction.set_rollback(True)
+            return response
+
+
+class CachedRetrieveMixin(ConditionalRetrieveMixin):
+    """
+    Serves retrieve payloads from the fragment cache.
+    Keys combine the ETag of the object with the version of its workspace and
+    board, so both changes to the object and signal invalidation miss the cache.
+    """
+
+    def get_fragment_scope(self, instance) -> tuple:
+        """
+        Returns the ids of the workspace and board the object belongs to.
+        """
+        return instance.work_space_id, instance.board_id
+
+    def get_retrieve_data(self, instance, queryset, etag: str):
+        version = fragments.scope_version(*self.get_fragment_scope(instance))
+        key = f'{instance._meta.label}:{instance.pk}:{etag}:{version}:{self.request.get_host()}'
+        build = super().get_retrieve_data
+        return fragments.get_or_build(key, lambda: build(instance, queryset, etag))
+
+
+class ScopedFeedMixin:
+    """
+    Lists the rows of `model` that belong to a task, board or workspace,
+    newest first. `scope` names the field matched against the id in the url;
+    users without access to its workspace get 404.
+    """
+    pagination_class = KeysetPagination
+    permission_classes = [IsAuthenticated]
+    model = None
+    scope = None
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return self.model.objects.none()
+        pk = self.kwargs['pk']
+        work_space_id = self.get_work_space_id(pk)
+        if work_space_id is None or not has_work_space_access(self.request, work_space_id):
+            raise NotFound()
+        return self.model.objects.filter(**{self.scope: pk})
+
+    def get_work_space_id(self, pk):
+        """
+        Returns the workspace of the task, board or workspace of the feed.
+        """
+        match self.scope:
+            case 'task':
+                return Task.objects.filter(pk=pk).values_list('work_space', flat=True).first()
+            case 'board':
+                return Board.objects.filter(pk=pk).values_list('work_space', flat=True).first()
+        return pk
+
+
+class SparseFieldsMixin:
+    """
+    Lets reads select what they render with `?fields=` and `?expand=`, comma
+    separated, as understood by the SparseFieldsMixin serializers. The
+    queryset is pruned to match: relations nothing renders are neither
+    joined nor prefetched, and columns nothing renders are deferred.
+    Relations in `required_relations` are kept for permission checks.
+    """
+    sparse_actions = ('retrieve', 'list')
+    required_relations = ()
+
+    def get_field_selection(self) -> dict:
+        """
+        Returns the `fields` and `expand` lists of the request, when it selects.
+        """
+        if self.action not in self.sparse_actions or self.request.method not in SAFE_METHODS:
+            return {}
+        selection = {}
+        for param in ('fields', 'expand'):
+            if (value := self.request.query_params.get(param)) is not None:
+                selection[param] = [name for name in value.split(',') if name]
+        return selection
+
+    def get_variant(self) -> str:
+        selection = self.get_field_selection()
+        return ';'.join(f"{param}={','.join(sorted(names))}" for param, names in sorted(selection.items()))
+
+    def get_serializer(self, *args, **kwargs):
+        return super().get_serializer(*args, **self.get_field_selection(), **kwargs)
+
+    def get_conditional_relations(self) -> tuple:
+        sources = self.get_rendered_sources()
+        relations = super().get_conditional_relations()
+        return relations if sources is None else tuple(
+            relation for relation in relations if relation.split('__')[0] in sources
+            )
+
+    def get_rendered_sources(self) -> set | None:
+        """
+        Returns the model attributes the rendered fields read, or None when
+        every field is rendered.
+        """
+        if not self.get_field_selection():
+            return None
+        if not hasattr(self, '_rendered_sources'):
+            fields = self.get_serializer().fields.values()
+            self._rendered_sources = {
+                field.source.split('.')[0] for field in fields if not field.write_only
+                } | set(self.required_relations)
+        return self._rendered_sources
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        sources = self.get_rendered_sources()
+        return queryset if sources is None else self.prune_queryset(queryset, sources)
+
+    def prune_queryset(self, queryset, sources: set):
+        """
+        Keeps the lookups and columns of `sources`.
+        """
+        prefetches = [
+            lookup for lookup in queryset._prefetch_related_lookups
+            if (lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup).split('__')[0] in sources
+            ]
+        queryset = queryset.prefetch_related(None).prefetch_related(*prefetches)
+        if isinstance(queryset.query.select_related, dict):
+            joins = [path for path in _paths(queryset.query.select_related) if path.split('__')[0] in sources]
+            queryset = queryset.select_related(None)
+            if joins:
+                queryset = queryset.select_related(*joins)
+        # Keys stay loaded for permissions and update_at for Last-Modified.
+        return queryset.only(*(
+            field.name for field in queryset.model._meta.concrete_fields
+            if field.name in sources or field.is_relation or field.primary_key or field.name == 'update_at'
+            ))
+
+
+def _paths(select_related: dict, prefix: str = '') -> list:
+    """
+    Returns the lookups of a `select_related` tree, deepest ones only.
+    """
+    paths = []
+    for name, children in select_related.items():
+        paths += _paths(children, f'{prefix}{name}__') if children else [f'{prefix}{name}']
+    return paths
@@ -0,0 +1,28 @@
+from django.db.models import F
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+from ..filters import SearchFilter
+from ..models import SearchEntry
+from ..pagination import SearchPagination
+from ..permissions import user_work_spaces
+from ..serializers import SearchResultSerializer
+
+
+class SearchView(generics.ListAPIView):
+    """
+    Searches the tasks, comments and attachments of the workspaces the
+    requesting user can access, best matches first. Every word of `q` must
+    match; the last one may be the start of a word.
+    """
+    serializer_class = SearchResultSerializer
+    filterset_class = SearchFilter
+    pagination_class = SearchPagination
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return SearchEntry.objects.none()
+        owned, membered = user_work_spaces(self.request.user)
+        return SearchEntry.objects.filter(task__work_space__in=owned | membered).annotate(
+            board=F('task__board'), work_space=F('task__work_space'),
+            )
@@ -1,22 +1,66 @@
 from rest_framework.viewsets import mixins, GenericViewSet
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework import status
+from drf_spectacular.utils import extend_schema
+from .mixins import CachedRetrieveMixin, RecordedActivityMixin, SparseFieldsMixin
 from ..permissions import TaskPermissions
-from ..serializers import TaskSerializer
-from ..models import Task
+from ..serializers import TaskSerializer, TaskMoveSerializer, TaskModelListSerializer, TaskBulkMoveSerializer, \
+    TaskPositionSerializer
+from ..models import ActivityRecorder, Task
 
 
 
-class TaskViewSet(mixins.CreateModelMixin,
+class TaskViewSet(RecordedActivityMixin,
+                  SparseFieldsMixin,
+                  CachedRetrieveMixin,
+                   mixins.CreateModelMixin,
                    mixins.RetrieveModelMixin,
                    mixins.UpdateModelMixin,
                    mixins.DestroyModelMixin,
                    GenericViewSet):
     
     permission_classes = [TaskPermissions,]
-    queryset =  Task.objects.all().select_related('status').prefetch_related('labels')\
-        .prefetch_related('assigned_to').prefetch_related('task_comments').prefetch_related('task_attachments')\
-        .prefetch_related('task_activity')
+    conditional_relations = ('status', 'labels', 'assigned_to', 'task_comments', 'task_attachments', 'task_activity')
+    queryset = Task.objects.all().select_related('status').prefetch_related('labels').prefetch_related('assigned_to')
     
     serializer_class = TaskSerializer
 
+    def get_queryset(self):
+        sources = self.get_rendered_sources()
+        return Task.with_recent_relations(super().get_queryset(), names=[
+            name for name in ('comments', 'attachments', 'activity') if sources is None or f'task_{name}' in sources
+            ])
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        # The update logs activities, so the prefetched ones are stale and
+        # the recorded ones are inserted before they are read back.
+        ActivityRecorder.flush_current()
+        del serializer.instance.recent_activity, serializer.instance.activity_count
+
     def perform_destroy(self, instance):
-        return instance.archive()
\ No newline at end of file
+        return instance.archive()
+
+    @extend_schema(request=TaskMoveSerializer, responses=TaskModelListSerializer)
+    @action(methods=['post'], detail=True)
+    def move(self, request, *args, **kwargs):
+        task = self.get_object()
+        serializer = TaskMoveSerializer(data=request.data, context={'task': task})
+        if serializer.is_valid():
+            task.move(doer=request.user, **serializer.validated_data)
+            return Response(TaskModelListSerializer(task).data, status=status.HTTP_200_OK)
+        else:
+            return Response(serializer.errors,
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(request=TaskBulkMoveSerializer, responses=TaskPositionSerializer(many=True))
+    @action(methods=['post'], detail=False, url_path='bulk-move')
+    def bulk_move(self, request, *args, **kwargs):
+        serializer = TaskBulkMoveSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            moved = Task.bulk_move(doer=request.user, moves=serializer.validated_data['moves'])
+            return Response(TaskPositionSerializer(moved, many=True).data, status=status.HTTP_200_OK)
+        else:
+            return Response(serializer.errors,
+                            status=status.HTTP_400_BAD_REQUEST)
@@ -1,9 +1,13 @@
 from rest_framework.viewsets import GenericViewSet, mixins
+from .mixins import CachedRetrieveMixin, RecordedActivityMixin, SparseFieldsMixin
 from ..serializers import TaskListSerializer
 from ..models import TaskList
 from ..permissions import TaskListPermissions
 
-class TaskListModelViewSet(mixins.CreateModelMixin,
+class TaskListModelViewSet(RecordedActivityMixin,
+                        SparseFieldsMixin,
+                        CachedRetrieveMixin,
+                        mixins.CreateModelMixin,
                         mixins.RetrieveModelMixin,
                         mixins.UpdateModelMixin,
                         mixins.DestroyModelMixin,
@@ -12,6 +16,11 @@ class TaskListModelViewSet(mixins.CreateModelMixin,
     serializer_class = TaskListSerializer
     queryset = TaskList.objects.all().select_related('board').prefetch_related('status_tasks')
     permission_classes = [TaskListPermissions]
+    conditional_relations = ('board', 'status_tasks')
+    required_relations = ('board',)
+
+    def get_fragment_scope(self, instance) -> tuple:
+        return instance.board.work_space_id, instance.board_id
     
     def perform_destroy(self, instance):
         return instance.archive()
\ No newline at end of file
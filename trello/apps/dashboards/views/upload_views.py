@@ -0,0 +1,78 @@
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import BaseParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from trello.apps.dashboards.models import UploadSession
+from trello.apps.dashboards.permissions import has_work_space_access
+from trello.apps.dashboards.serializers import AttachmentSerializer, UploadChunkSerializer, UploadSessionSerializer
+from trello.apps.dashboards.uploads import IncompleteChunk
+
+
+class ChunkParser(BaseParser):
+    """
+    Hands the request body over unread, to be streamed to disk.
+    """
+    media_type = 'application/octet-stream'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Uploads attachments in chunks. A session is started with the name, size
+    and SHA-256 checksum of the file; its chunks are then PUT as raw bodies at
+    their offsets, retried or resumed from `received`, and the file becomes an
+    attachment of the task once it is completed and matches its checksum.
+    Sessions are only visible to the user who started them.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return UploadSession.objects.none()
+        return UploadSession.objects.filter(owner=self.request.user)
+
+    def perform_create(self, serializer):
+        if not has_work_space_access(self.request, serializer.validated_data['task'].work_space_id):
+            raise PermissionDenied()
+        serializer.save(owner=self.request.user)
+
+    @extend_schema(
+        request={'application/octet-stream': OpenApiTypes.BINARY},
+        parameters=[OpenApiParameter('offset', int, required=True)],
+        responses=UploadSessionSerializer,
+        )
+    @action(detail=True, methods=['put'], parser_classes=[ChunkParser])
+    def chunk(self, request, pk=None):
+        session = self.get_object()
+        chunk = UploadChunkSerializer(data=request.query_params, context={'request': request, 'session': session})
+        chunk.is_valid(raise_exception=True)
+        try:
+            session.receive_chunk(chunk.validated_data['offset'], request.data)
+        except IncompleteChunk as error:
+            raise ValidationError(str(error))
+        return Response(self.get_serializer(session).data)
+
+    @extend_schema(request=None, responses={201: AttachmentSerializer})
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        session = self.get_object()
+        if session.received < session.size:
+            raise ValidationError(f'{session.size - session.received} bytes of the file were not received')
+        if not has_work_space_access(request, session.task.work_space_id):
+            raise PermissionDenied()
+        attachment = session.complete()
+        if attachment is None:
+            raise ValidationError('File does not match its checksum and must be sent again')
+        return Response(AttachmentSerializer(attachment, context=self.get_serializer_context()).data,
+                        status=status.HTTP_201_CREATED)
@@ -1,27 +1,62 @@
 from rest_framework.viewsets import mixins, GenericViewSet
+from trello.apps.core.views import ConditionalRetrieveMixin
+from .mixins import RecordedActivityMixin, SparseFieldsMixin
+from ..pagination import ChangePagination
 from ..permissions import WorkspacePermissions
-from ..serializers import WorkspaceAddMemberSerializer, WorkspaceSerializer
-from ..models import WorkSpace
+from ..serializers import ChangeSerializer, WorkspaceAddMemberSerializer, WorkspaceSerializer
+from ..models import Change, WorkSpace
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework import status
-from drf_spectacular.utils import extend_schema
+from rest_framework import serializers, status
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 
 
 
-class WorkspaceViewSet(mixins.CreateModelMixin,
+class WorkspaceViewSet(RecordedActivityMixin,
+                   SparseFieldsMixin,
+                   ConditionalRetrieveMixin,
+                   mixins.CreateModelMixin,
                    mixins.RetrieveModelMixin,
                    mixins.UpdateModelMixin,
                    mixins.DestroyModelMixin,
                    GenericViewSet):
     
     permission_classes = [WorkspacePermissions]
+    conditional_relations = ('work_space_boards', 'owner', 'members')
     queryset = WorkSpace.objects.all().prefetch_related('work_space_boards')
     serializer_class = WorkspaceSerializer
 
+    def get_queryset(self):
+        if self.action == 'changes':
+            return WorkSpace.objects.all()
+        return super().get_queryset()
+
     def perform_destroy(self, instance):
         return instance.archive()
 
+    @extend_schema(
+        parameters=[OpenApiParameter('board', str, description='Only the changes of this board.')],
+        responses=ChangeSerializer(many=True),
+        )
+    @action(methods=['get'], detail=True, pagination_class=ChangePagination)
+    def changes(self, request, *args, **kwargs):
+        """
+        Returns the entities created, updated, archived, restored or deleted
+        in the workspace after the `since` cursor, oldest first. Each object
+        appears once per page, with its latest change and current state.
+        """
+        work_space = self.get_object()
+        changes = Change.objects.filter(work_space=work_space)
+        if board := request.query_params.get('board'):
+            board = serializers.UUIDField().run_validation(board)
+            changes = changes.filter(board=board)
+        page = self.paginate_queryset(changes)
+        latest = list({(change.model, change.object_id): change for change in page}.values())
+        latest.sort(key=lambda change: change.id)
+        context = {**self.get_serializer_context(), 'objects': Change.load_objects(latest)}
+        serializer = ChangeSerializer(latest, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
     @extend_schema(request=WorkspaceAddMemberSerializer, responses=WorkspaceAddMemberSerializer)
     @action(methods=['post'],detail=True, url_path='add-members')
     def add_members(self, request, *args, **kwargs):
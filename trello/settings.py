@@ -137,6 +137,37 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The acl and fragments caches are invalidated by signals, so point them at a
+# shared backend (e.g. redis, files or the database) when running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'acl': {
+        'BACKEND': os.environ.get('ACL_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('ACL_CACHE_LOCATION', 'acl'),
+        'TIMEOUT': int(os.environ.get('ACL_CACHE_TIMEOUT', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('ACL_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+    # Serialized boards, task lists and tasks. Any backend works, e.g.
+    # django.core.cache.backends.filebased.FileBasedCache with a directory as
+    # location, or django.core.cache.backends.db.DatabaseCache with a table name.
+    'fragments': {
+        'BACKEND': os.environ.get('FRAGMENT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('FRAGMENT_CACHE_LOCATION', 'fragments'),
+        'TIMEOUT': int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', 600)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 5000)),
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -179,6 +210,20 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media/'
 
+# Uploaded files are stored once per content, under its hash.
+STORAGES = {
+    'default': {
+        'BACKEND': 'trello.apps.core.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+FILE_UPLOAD_HANDLERS = [
+    'trello.apps.core.uploadhandlers.HashingMemoryFileUploadHandler',
+    'trello.apps.core.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
 CSRF_TRUSTED_ORIGINS = os.environ.get("CSRF_TRUSTED_ORIGINS").split(" ")
 
 # Default primary key field type